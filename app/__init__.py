@@ -134,7 +134,10 @@ def create_app(application):
     register_blueprint(application)
     register_v2_blueprints(application)
 
-    # avoid circular imports by importing this file later
+    # avoid circular imports by importing these files later
+    from app.dao.notification_status_counts_dao import count_notification_statuses
+    count_notification_statuses(db.session)
+
     from app.commands import setup_commands
     setup_commands(application)
 
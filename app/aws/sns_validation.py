@@ -0,0 +1,97 @@
+"""
+Validation of messages delivered by SNS to our HTTP callback endpoints.
+
+Signing certificates are shared between processes through redis, so a fresh worker does
+not need to download them again, and the parsed certificate is memoised per URL. SNS
+certificate URLs are content addressed, so a URL always points at the same certificate.
+A download is only cached once it parses as a certificate, and a cached copy that does
+not parse is discarded and downloaded again.
+"""
+from functools import lru_cache
+
+import oscrypto.asymmetric
+import oscrypto.errors
+import requests
+import validatesns
+from cachelib import SimpleCache
+from flask import current_app
+
+from app import redis_store
+
+CERTIFICATE_DOWNLOAD_TIMEOUT = 5  # seconds
+
+# what oscrypto raises for bytes that are not a certificate
+INVALID_CERTIFICATE_ERRORS = (ValueError, TypeError, oscrypto.errors.AsymmetricKeyError)
+
+certificate_cache = SimpleCache()
+
+
+def sns_certificate_cache_key(url):
+    return 'sns-signing-certificate-{}'.format(url)
+
+
+def get_cached_certificate(url):
+    certificate = certificate_cache.get(url)
+    if certificate is None:
+        certificate = redis_store.get(sns_certificate_cache_key(url))
+    return certificate
+
+
+def discard_cached_certificate(url):
+    certificate_cache.delete(url)
+    redis_store.delete(sns_certificate_cache_key(url))
+
+
+def download_certificate(url):
+    response = requests.get(url, timeout=CERTIFICATE_DOWNLOAD_TIMEOUT)
+    response.raise_for_status()
+    current_app.logger.info("Downloaded SNS signing certificate {}".format(url))
+    return response.content
+
+
+@lru_cache(maxsize=16)
+def load_certificate(url):
+    cached = get_cached_certificate(url)
+    if cached is not None:
+        try:
+            certificate = oscrypto.asymmetric.load_certificate(cached)
+            certificate_cache.set(url, cached, timeout=60 * 60)  # 60 minutes
+            return certificate
+        except INVALID_CERTIFICATE_ERRORS:
+            current_app.logger.warning("Discarding cached SNS signing certificate {} that does not parse".format(url))
+            discard_cached_certificate(url)
+
+    downloaded = download_certificate(url)
+    # raises before the download is cached if it is not a certificate, such as an error page
+    certificate = oscrypto.asymmetric.load_certificate(downloaded)
+    redis_store.set(sns_certificate_cache_key(url), downloaded, ex=current_app.config['EXPIRE_CACHE_EIGHT_DAYS'])
+    certificate_cache.set(url, downloaded, timeout=60 * 60)  # 60 minutes
+    return certificate
+
+
+class LoadedCertificateSignatureValidator(validatesns.SignatureValidator):
+    """
+    Checks the signature against an already loaded certificate instead of parsing the PEM for every message.
+    """
+
+    def _validate_signature(self, signature, content):
+        try:
+            oscrypto.asymmetric.rsa_pkcs1v15_verify(self.certificate, signature, content.encode(), "sha1")
+        except oscrypto.errors.SignatureError:
+            raise validatesns.ValidationError("Invalid signature")
+
+
+def validate_sns_message(message):
+    """
+    Same checks as `validatesns.validate`: certificate URL, message age and signature.
+    Raises `validatesns.ValidationError` if the message is not valid.
+    """
+    validatesns.SigningCertURLValidator().validate(message)
+    validatesns.MessageAgeValidator().validate(message)
+
+    try:
+        certificate = load_certificate(message["SigningCertURL"])
+    except (requests.RequestException, OSError) + INVALID_CERTIFICATE_ERRORS as e:
+        raise validatesns.ValidationError("Could not load signing certificate: {}".format(e))
+
+    LoadedCertificateSignatureValidator(certificate).validate(message)
@@ -1,4 +1,4 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request
 
 from app.billing.billing_schemas import (
     create_or_update_free_sms_fragment_limit_schema,
@@ -18,6 +18,7 @@ from app.dao.fact_billing_dao import (
 
 from app.errors import InvalidRequest
 from app.errors import register_errors
+from app.reporting_cache import get_cached_report
 from app.schema_validation import validate
 
 billing_blueprint = Blueprint(
@@ -50,9 +51,18 @@ def get_yearly_billing_usage_summary_from_ft_billing(service_id):
     except TypeError:
         return jsonify(result='error', message='No valid year provided'), 400
 
-    billing_data = fetch_billing_totals_for_year(service_id, year)
-    data = serialize_ft_billing_yearly_totals(billing_data)
-    return jsonify(data)
+    # the current year changes as create-billing-for-today runs, past years only when nightly billing is rerun
+    if year >= get_current_financial_year_start_year():
+        ttl = current_app.config['REPORTING_CACHE_TODAY_TTL']
+    else:
+        ttl = current_app.config['REPORTING_CACHE_TTL']
+
+    return get_cached_report(
+        'billing-totals-for-year',
+        {'service_id': service_id, 'year': year},
+        lambda: jsonify(serialize_ft_billing_yearly_totals(fetch_billing_totals_for_year(service_id, year))),
+        ttl=ttl
+    )
 
 
 @billing_blueprint.route('/free-sms-fragment-limit', methods=["GET"])
@@ -0,0 +1,227 @@
+"""
+Circuit breaker for service callback destinations, keyed by callback host.
+
+State lives in redis so that every celery worker sees the same breaker:
+
+- closed: callbacks are attempted as normal
+- open: the host failed too often, callbacks are parked in a per-service backlog
+- half-open: the cool down has passed, a single probe callback is let through
+
+When a probe succeeds the breaker closes and the parked callbacks are drained at a
+controlled rate by the `drain-callback-backlog` task.
+"""
+import json
+from urllib.parse import urlparse
+
+from flask import current_app
+
+from app import redis_store
+
+CIRCUIT_CLOSED = 'closed'
+CIRCUIT_OPEN = 'open'
+CIRCUIT_HALF_OPEN = 'half-open'
+
+CIRCUIT_BREAKER_HOSTS_KEY = 'callback-circuit-breaker-hosts'
+
+
+def circuit_breaker_failures_key(host):
+    return 'callback-circuit-breaker-{}-failures'.format(host)
+
+
+def circuit_breaker_open_key(host):
+    return 'callback-circuit-breaker-{}-open'.format(host)
+
+
+def circuit_breaker_tripped_key(host):
+    return 'callback-circuit-breaker-{}-tripped'.format(host)
+
+
+def circuit_breaker_probe_key(host):
+    return 'callback-circuit-breaker-{}-probe'.format(host)
+
+
+def circuit_breaker_services_key(host):
+    return 'callback-circuit-breaker-{}-services'.format(host)
+
+
+def callback_backlog_key(service_id):
+    return 'callback-backlog-{}'.format(service_id)
+
+
+def callback_backlog_drain_key(service_id):
+    return 'callback-backlog-{}-draining'.format(service_id)
+
+
+def callback_host(url):
+    return (urlparse(url).hostname or '').lower()
+
+
+def get_circuit_state(host):
+    if not redis_store.active:
+        return CIRCUIT_CLOSED
+    if redis_store.get(circuit_breaker_open_key(host)):
+        return CIRCUIT_OPEN
+    if redis_store.get(circuit_breaker_tripped_key(host)):
+        return CIRCUIT_HALF_OPEN
+    return CIRCUIT_CLOSED
+
+
+def allow_callback_request(host):
+    state = get_circuit_state(host)
+    if state == CIRCUIT_CLOSED:
+        return True
+    if state == CIRCUIT_OPEN:
+        return False
+    # half-open: only one probe at a time is let through to the host
+    return bool(redis_store.set(
+        circuit_breaker_probe_key(host),
+        1,
+        ex=current_app.config['CALLBACK_CIRCUIT_BREAKER_COOLDOWN'],
+        nx=True
+    ))
+
+
+def record_callback_failure(host):
+    """
+    Count a failed callback against the host. Returns True if the breaker is open after this failure.
+    """
+    if not redis_store.active:
+        return False
+
+    state = get_circuit_state(host)
+    if state == CIRCUIT_OPEN:
+        return True
+
+    failures_key = circuit_breaker_failures_key(host)
+    failures = redis_store.incr(failures_key)
+    if failures == 1:
+        redis_store.expire(failures_key, current_app.config['CALLBACK_CIRCUIT_BREAKER_FAILURE_WINDOW'])
+
+    if state == CIRCUIT_HALF_OPEN or (failures or 0) >= current_app.config['CALLBACK_CIRCUIT_BREAKER_THRESHOLD']:
+        _open_circuit(host)
+        return True
+    return False
+
+
+def record_callback_success(host):
+    """
+    Close the breaker if it had tripped. Returns True if this call closed it.
+    """
+    if not redis_store.active or not redis_store.get(circuit_breaker_tripped_key(host)):
+        return False
+
+    redis_store.delete(
+        circuit_breaker_open_key(host),
+        circuit_breaker_tripped_key(host),
+        circuit_breaker_probe_key(host),
+        circuit_breaker_failures_key(host),
+    )
+    current_app.logger.info("Callback circuit breaker closed for host {}".format(host))
+    return True
+
+
+def _open_circuit(host):
+    redis_store.set(
+        circuit_breaker_open_key(host), 1, ex=current_app.config['CALLBACK_CIRCUIT_BREAKER_COOLDOWN']
+    )
+    redis_store.set(
+        circuit_breaker_tripped_key(host), 1, ex=current_app.config['EXPIRE_CACHE_EIGHT_DAYS']
+    )
+    redis_store.delete(circuit_breaker_probe_key(host), circuit_breaker_failures_key(host))
+    _raw('sadd', CIRCUIT_BREAKER_HOSTS_KEY, host)
+    current_app.logger.warning("Callback circuit breaker opened for host {}".format(host))
+
+
+def park_callback(host, service_id, task_name, task_args):
+    """
+    Store a callback task in the service backlog so it can be replayed once the host recovers.
+    """
+    backlog_key = callback_backlog_key(service_id)
+    size = _raw('rpush', backlog_key, json.dumps({'task': task_name, 'args': task_args}))
+    _raw('sadd', circuit_breaker_services_key(host), str(service_id))
+    _raw('sadd', CIRCUIT_BREAKER_HOSTS_KEY, host)
+
+    max_size = current_app.config['CALLBACK_BACKLOG_MAX_SIZE']
+    if size and size > max_size:
+        _raw('ltrim', backlog_key, -max_size, -1)
+        current_app.logger.warning(
+            "Callback backlog for service {} is over {} items, oldest callbacks dropped".format(service_id, max_size)
+        )
+
+
+def pop_parked_callbacks(service_id, count):
+    if not redis_store.active:
+        return []
+    backlog_key = callback_backlog_key(service_id)
+    try:
+        pipe = redis_store.redis_store.pipeline()
+        pipe.lrange(backlog_key, 0, count - 1)
+        pipe.ltrim(backlog_key, count, -1)
+        parked, _ = pipe.execute()
+    except Exception:
+        current_app.logger.exception("Redis error popping callback backlog for service {}".format(service_id))
+        return []
+    return [json.loads(item) for item in parked]
+
+
+def callback_backlog_size(service_id):
+    return _raw('llen', callback_backlog_key(service_id)) or 0
+
+
+def get_tracked_hosts():
+    return sorted(_decode(member) for member in (_raw('smembers', CIRCUIT_BREAKER_HOSTS_KEY) or []))
+
+
+def get_services_with_backlog(host):
+    return sorted(_decode(member) for member in (_raw('smembers', circuit_breaker_services_key(host)) or []))
+
+
+def forget_service_backlog(host, service_id):
+    _raw('srem', circuit_breaker_services_key(host), str(service_id))
+
+
+def forget_host(host):
+    _raw('srem', CIRCUIT_BREAKER_HOSTS_KEY, host)
+
+
+def claim_backlog_drain(service_id):
+    return bool(redis_store.set(
+        callback_backlog_drain_key(service_id),
+        1,
+        ex=current_app.config['CALLBACK_CIRCUIT_BREAKER_COOLDOWN'],
+        nx=True
+    ))
+
+
+def extend_backlog_drain(service_id):
+    redis_store.set(
+        callback_backlog_drain_key(service_id), 1, ex=current_app.config['CALLBACK_CIRCUIT_BREAKER_COOLDOWN']
+    )
+
+
+def release_backlog_drain(service_id):
+    redis_store.delete(callback_backlog_drain_key(service_id))
+
+
+def get_circuit_breaker_status(url, service_id):
+    host = callback_host(url)
+    return {
+        'host': host,
+        'state': get_circuit_state(host),
+        'recent_failures': int(redis_store.get(circuit_breaker_failures_key(host)) or 0),
+        'parked_callbacks': callback_backlog_size(service_id),
+    }
+
+
+def _raw(command, *args):
+    if not redis_store.active:
+        return None
+    try:
+        return getattr(redis_store.redis_store, command)(*args)
+    except Exception:
+        current_app.logger.exception("Redis error performing {} on {}".format(command, args[0]))
+        return None
+
+
+def _decode(value):
+    return value.decode('utf-8') if isinstance(value, bytes) else value
@@ -1,8 +1,12 @@
 import time
 
+import psycopg2
 from celery import Celery, Task
-from celery.signals import worker_process_shutdown
+from celery.signals import worker_init, worker_process_shutdown
+from eventlet import patcher
+from eventlet.hubs import trampoline
 from flask import current_app
+from psycopg2 import extensions
 
 
 @worker_process_shutdown.connect
@@ -10,6 +14,27 @@ def worker_process_shutdown(sender, signal, pid, exitcode, **kwargs):
     current_app.logger.info('worker shutdown: PID: {} Exitcode: {}'.format(pid, exitcode))
 
 
+@worker_init.connect
+def use_green_database_connections(**kwargs):
+    # with the eventlet pool (scripts/run_celery_delivery.sh), a query waiting on the database must let the
+    # other green threads run instead of blocking the whole worker
+    if patcher.is_monkey_patched('socket'):
+        extensions.set_wait_callback(eventlet_wait_callback)
+
+
+def eventlet_wait_callback(conn, timeout=None):
+    while True:
+        state = conn.poll()
+        if state == extensions.POLL_OK:
+            return
+        elif state == extensions.POLL_READ:
+            trampoline(conn.fileno(), read=True)
+        elif state == extensions.POLL_WRITE:
+            trampoline(conn.fileno(), write=True)
+        else:
+            raise psycopg2.OperationalError("Bad result from poll: {}".format(state))
+
+
 def make_task(app):
     class NotifyTask(Task):
         abstract = True
@@ -47,3 +72,14 @@ class NotifyCelery(Celery):
         )
 
         self.conf.update(app.config)
+
+    def apply_async_many(self, task, args_list, queue):
+        """
+        Publish one message per entry of args_list, reusing a single producer (and broker
+        connection) for the whole batch instead of acquiring one for every message.
+        """
+        if not args_list:
+            return
+        with self.producer_or_acquire() as producer:
+            for args in args_list:
+                task.apply_async(args, queue=queue, producer=producer)
@@ -1,3 +1,4 @@
+from collections import defaultdict
 from datetime import (
     datetime,
     timedelta
@@ -22,7 +23,7 @@ from app.dao.jobs_dao import (
     dao_archive_job
 )
 from app.dao.notifications_dao import (
-    dao_timeout_notifications,
+    dao_timeout_notifications_in_chunks,
     delete_notifications_older_than_retention_by_type,
 )
 from app.dao.service_callback_api_dao import get_service_delivery_status_callback_api_for_service
@@ -30,6 +31,7 @@ from app.exceptions import NotificationTechnicalFailureException
 from app.models import (
     Notification,
     NOTIFICATION_SENDING,
+    NOTIFICATION_TECHNICAL_FAILURE,
     EMAIL_TYPE,
     SMS_TYPE,
     LETTER_TYPE,
@@ -126,27 +128,56 @@ def delete_letter_notifications_older_than_retention():
 @cronitor('timeout-sending-notifications')
 @statsd(namespace="tasks")
 def timeout_notifications():
-    technical_failure_notifications, temporary_failure_notifications = \
-        dao_timeout_notifications(current_app.config.get('SENDING_NOTIFICATIONS_TIMEOUT_PERIOD'))
-
-    notifications = technical_failure_notifications + temporary_failure_notifications
-    for notification in notifications:
-        # queue callback task only if the service_callback_api exists
-        service_callback_api = get_service_delivery_status_callback_api_for_service(service_id=notification.service_id)
-        if service_callback_api:
-            encrypted_notification = create_delivery_status_callback_data(notification, service_callback_api)
-            send_delivery_status_to_service.apply_async([str(notification.id), encrypted_notification],
-                                                        queue=QueueNames.CALLBACKS)
+    technical_failure_ids = []
+    total_timed_out = 0
+    callback_apis = {}
+
+    for new_status, notifications in dao_timeout_notifications_in_chunks(
+        current_app.config.get('SENDING_NOTIFICATIONS_TIMEOUT_PERIOD'),
+        current_app.config.get('TIMEOUT_NOTIFICATIONS_CHUNK_SIZE')
+    ):
+        total_timed_out += len(notifications)
+        if new_status == NOTIFICATION_TECHNICAL_FAILURE:
+            technical_failure_ids.extend(str(notification.id) for notification in notifications)
+        _queue_timeout_callbacks(notifications, callback_apis)
 
     current_app.logger.info(
-        "Timeout period reached for {} notifications, status has been updated.".format(len(notifications)))
-    if technical_failure_notifications:
+        "Timeout period reached for {} notifications, status has been updated.".format(total_timed_out))
+    if technical_failure_ids:
         message = "{} notifications have been updated to technical-failure because they " \
                   "have timed out and are still in created.Notification ids: {}".format(
-                      len(technical_failure_notifications), [str(x.id) for x in technical_failure_notifications])
+                      len(technical_failure_ids), technical_failure_ids[:100])
         raise NotificationTechnicalFailureException(message)
 
 
+def _queue_timeout_callbacks(notifications, callback_apis):
+    """
+    Queue delivery status callbacks for timed out notifications. The callback config is looked
+    up once per service (callback_apis is shared between chunks) and each service's callbacks
+    are published as one batch.
+    """
+    notifications_by_service = defaultdict(list)
+    for notification in notifications:
+        notifications_by_service[notification.service_id].append(notification)
+
+    for service_id, service_notifications in notifications_by_service.items():
+        if service_id not in callback_apis:
+            callback_apis[service_id] = get_service_delivery_status_callback_api_for_service(service_id=service_id)
+        service_callback_api = callback_apis[service_id]
+        # queue callback task only if the service_callback_api exists
+        if not service_callback_api:
+            continue
+
+        notify_celery.apply_async_many(
+            send_delivery_status_to_service,
+            [
+                [str(notification.id), create_delivery_status_callback_data(notification, service_callback_api)]
+                for notification in service_notifications
+            ],
+            queue=QueueNames.CALLBACKS
+        )
+
+
 @notify_celery.task(name='send-daily-performance-platform-stats')
 @cronitor('send-daily-performance-platform-stats')
 @statsd(namespace="tasks")
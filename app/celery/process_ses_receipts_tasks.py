@@ -14,12 +14,14 @@ from sqlalchemy.orm.exc import NoResultFound
 import enum
 import requests
 from app import notify_celery, statsd_client
+from app.aws.sns_validation import validate_sns_message
 from app.config import QueueNames
 from app.clients.email.aws_ses import get_aws_responses
 from app.dao import notifications_dao, services_dao, templates_dao
 from app.models import NOTIFICATION_SENDING, NOTIFICATION_PENDING, EMAIL_TYPE, KEY_TYPE_NORMAL
 from json import decoder
 from app.notifications import process_notifications
+from app.notifications.latency import record_receipt
 from app.notifications.notifications_ses_callback import (
     determine_notification_bounce_type,
     handle_complaint,
@@ -32,7 +34,6 @@ from app.errors import (
     register_errors,
     InvalidRequest
 )
-from cachelib import SimpleCache
 import validatesns
 
 ses_callback_blueprint = Blueprint('notifications_ses_callback', __name__)
@@ -59,17 +60,6 @@ def verify_message_type(message_type: str):
         raise InvalidMessageTypeException(f'{message_type} is not a valid message type.')
 
 
-certificate_cache = SimpleCache()
-
-
-def get_certificate(url):
-    res = certificate_cache.get(url)
-    if res is not None:
-        return res
-    res = requests.get(url).content
-    certificate_cache.set(url, res, timeout=60 * 60)  # 60 minutes
-    return res
-
 # 400 counts as a permanent failure so SNS will not retry.
 # 500 counts as a failed delivery attempt so SNS will retry.
 # See https://docs.aws.amazon.com/sns/latest/dg/DeliveryPolicies.html#DeliveryPolicies
@@ -90,7 +80,7 @@ def sns_callback_handler():
         raise InvalidRequest("SES-SNS callback failed: invalid JSON given", 400)
 
     try:
-        validatesns.validate(message, get_certificate=get_certificate)
+        validate_sns_message(message)
     except validatesns.ValidationError:
         raise InvalidRequest("SES-SNS callback failed: validation failed", 400)
 
@@ -128,7 +118,7 @@ def sns_smtp_callback_handler():
         raise InvalidRequest("SES-SNS SMTP callback failed: invalid JSON given", 400)
 
     try:
-        validatesns.validate(message, get_certificate=get_certificate)
+        validate_sns_message(message)
     except validatesns.ValidationError:
         raise InvalidRequest("SES-SNS SMTP callback failed: validation failed", 400)
 
@@ -203,6 +193,7 @@ def process_ses_results(self, response):
 
         if notification.sent_at:
             statsd_client.timing_with_dates('callback.ses.elapsed-time', datetime.utcnow(), notification.sent_at)
+        record_receipt(notification)
 
         _check_and_queue_callback_task(notification)
 
@@ -4,12 +4,23 @@ from notifications_utils.statsd_decorators import statsd
 from sqlalchemy.orm.exc import NoResultFound
 
 from app import notify_celery
+from app.clients.mlwr.mlwr import (
+    MLWR_MAX_CHECK_FAILURES,
+    check_mlwr_score,
+    drop_pending_mlwr_scan,
+    get_pending_mlwr_sids,
+    has_notifications_waiting_for_mlwr_scan,
+    is_completed,
+    pop_notifications_waiting_for_mlwr_scan,
+    record_mlwr_check_failure,
+)
 from app.config import QueueNames
 from app.dao import notifications_dao
 from app.dao.notifications_dao import update_notification_status_by_id
 from app.delivery import send_to_providers
 from app.exceptions import NotificationTechnicalFailureException, MalwarePendingException
 from app.models import NOTIFICATION_TECHNICAL_FAILURE
+from app.notifications.latency import record_dequeue
 
 
 @notify_celery.task(
@@ -22,9 +33,12 @@ from app.models import NOTIFICATION_TECHNICAL_FAILURE
 def deliver_sms(self, notification_id):
     try:
         current_app.logger.info("Start sending SMS for notification id: {}".format(notification_id))
-        notification = notifications_dao.get_notification_by_id(notification_id)
+        notification = notifications_dao.dao_get_notification_for_delivery(notification_id)
         if not notification:
             raise NoResultFound()
+        # retries also wait for their countdown, only the first attempt measures the queue
+        if self.request.retries == 0:
+            record_dequeue(notification)
         send_to_providers.send_sms_to_provider(notification)
     except Exception:
         try:
@@ -47,9 +61,11 @@ def deliver_sms(self, notification_id):
 def deliver_email(self, notification_id):
     try:
         current_app.logger.info("Start sending email for notification id: {}".format(notification_id))
-        notification = notifications_dao.get_notification_by_id(notification_id)
+        notification = notifications_dao.dao_get_notification_for_delivery(notification_id)
         if not notification:
             raise NoResultFound()
+        if self.request.retries == 0:
+            record_dequeue(notification)
         send_to_providers.send_email_to_provider(notification)
     except InvalidEmailError as e:
         current_app.logger.exception(e)
@@ -57,7 +73,8 @@ def deliver_email(self, notification_id):
     except MalwarePendingException:
         current_app.logger.info(
             "RETRY: Email notification {} is pending malware scans".format(notification_id))
-        self.retry(queue=QueueNames.RETRY, countdown=60)
+        # check-pending-mlwr-scans requeues the notification when the scan completes, this retry is a fallback
+        self.retry(queue=QueueNames.RETRY, countdown=current_app.config['MLWR_PENDING_RETRY_DELAY'])
     except Exception:
         try:
             current_app.logger.exception(
@@ -70,3 +87,49 @@ def deliver_email(self, notification_id):
                       "Notification has been updated to technical-failure".format(notification_id)
             update_notification_status_by_id(notification_id, NOTIFICATION_TECHNICAL_FAILURE)
             raise NotificationTechnicalFailureException(message)
+
+
+@notify_celery.task(name="deliver-email-batch")
+@statsd(namespace="tasks")
+def deliver_email_batch(notification_ids):
+    try:
+        notifications = notifications_dao.dao_get_notifications_for_delivery(notification_ids)
+        for notification in notifications:
+            record_dequeue(notification)
+        singles = [str(notification.id) for notification in send_to_providers.send_emails_to_provider(notifications)]
+    except Exception:
+        current_app.logger.exception("Bulk delivery of {} emails failed".format(len(notification_ids)))
+        # deliver_email skips the notifications that were sent
+        singles = notification_ids
+
+    notify_celery.apply_async_many(
+        deliver_email, [[notification_id] for notification_id in singles], QueueNames.SEND_EMAIL
+    )
+
+
+@notify_celery.task(name="check-pending-mlwr-scans")
+@statsd(namespace="tasks")
+def check_pending_mlwr_scans():
+    for sid in get_pending_mlwr_sids():
+        if not has_notifications_waiting_for_mlwr_scan(sid):
+            drop_pending_mlwr_scan(sid)
+            continue
+
+        try:
+            submission = check_mlwr_score(sid)
+        except Exception:
+            current_app.logger.exception("Could not check mlwr scan {}".format(sid))
+            if record_mlwr_check_failure(sid) >= MLWR_MAX_CHECK_FAILURES:
+                # its emails are left to the retries of deliver_email
+                current_app.logger.warning("Dropping mlwr scan {} after repeated failed checks".format(sid))
+                drop_pending_mlwr_scan(sid)
+            continue
+
+        if is_completed(submission):
+            notification_ids = pop_notifications_waiting_for_mlwr_scan(sid)
+            notify_celery.apply_async_many(
+                deliver_email, [[notification_id] for notification_id in notification_ids], QueueNames.RETRY
+            )
+            current_app.logger.info(
+                "Malware scan {} completed, {} email notifications requeued".format(sid, len(notification_ids))
+            )
@@ -9,9 +9,22 @@ from app.config import QueueNames
 from app.cronitor import cronitor
 from app.dao.fact_billing_dao import (
     fetch_billing_data_for_day,
-    update_fact_billing
+    update_fact_billing,
+    update_fact_billing_sms_cumulative_for_year,
 )
-from app.dao.fact_notification_status_dao import fetch_notification_status_for_day, update_fact_notification_status
+from app.dao.fact_notification_status_dao import (
+    fetch_notification_status_for_day,
+    update_fact_notification_status,
+    update_fact_notification_status_for_month,
+)
+from app.dao.notification_status_counts_dao import (
+    delete_notification_status_counts_older_than,
+    fold_notification_status_count_deltas,
+    get_local_today,
+    get_service_ids_with_notifications_on,
+    reconcile_notification_status_counts,
+)
+from app.reporting_cache import invalidate_reporting_cache
 
 
 @notify_celery.task(name="create-nightly-billing")
@@ -50,6 +63,8 @@ def create_nightly_billing_for_day(process_day):
 
     for data in transit_data:
         update_fact_billing(data, process_day)
+    update_fact_billing_sms_cumulative_for_year(process_day)
+    invalidate_reporting_cache()
 
     current_app.logger.info(
         "create-nightly-billing-for-day task complete. {} rows updated for day: {}".format(
@@ -59,6 +74,21 @@ def create_nightly_billing_for_day(process_day):
     )
 
 
+@notify_celery.task(name="create-billing-for-today")
+@statsd(namespace="tasks")
+def create_billing_for_today():
+    # ft_billing for today, for the services that have sent something, so the billing endpoints only read facts
+    today = get_local_today()
+    service_ids = get_service_ids_with_notifications_on(today)
+    for service_id in service_ids:
+        for data in fetch_billing_data_for_day(process_day=today, service_id=service_id):
+            update_fact_billing(data, today)
+
+    current_app.logger.info(
+        "create-billing-for-today task complete for {}. {} services updated".format(today, len(service_ids))
+    )
+
+
 @notify_celery.task(name="create-nightly-notification-status")
 @cronitor("create-nightly-notification-status")
 @statsd(namespace="tasks")
@@ -93,9 +123,33 @@ def create_nightly_notification_status_for_day(process_day):
     )
 
     update_fact_notification_status(transit_data, process_day)
+    update_fact_notification_status_for_month(process_day)
+    invalidate_reporting_cache()
 
     current_app.logger.info(
         "create-nightly-notification-status-for-day task complete: {} rows updated for day: {}".format(
             len(transit_data), process_day
         )
     )
+
+
+@notify_celery.task(name="reconcile-notification-status-counts")
+@cronitor("reconcile-notification-status-counts")
+@statsd(namespace="tasks")
+def reconcile_notification_status_counts_task():
+    # the counts are only read for today, yesterday is recounted once it is over
+    today = get_local_today()
+    for process_day in (today - timedelta(days=1), today):
+        reconcile_notification_status_counts(process_day)
+
+    deleted = delete_notification_status_counts_older_than(today - timedelta(days=1))
+    current_app.logger.info(
+        "reconcile-notification-status-counts task complete for {}. {} old rows deleted".format(today, deleted)
+    )
+
+
+@notify_celery.task(name="fold-notification-status-count-deltas")
+@statsd(namespace="tasks")
+def fold_notification_status_count_deltas_task():
+    folded = fold_notification_status_count_deltas()
+    current_app.logger.info("fold-notification-status-count-deltas task complete. {} deltas folded".format(folded))
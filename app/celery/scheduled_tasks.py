@@ -8,7 +8,18 @@ from notifications_utils.statsd_decorators import statsd
 from sqlalchemy import and_
 from sqlalchemy.exc import SQLAlchemyError
 
-from app import notify_celery, zendesk_client
+from app import aws_ses_client, notify_celery, zendesk_client
+from app.callback_circuit_breaker import (
+    CIRCUIT_HALF_OPEN,
+    CIRCUIT_OPEN,
+    callback_backlog_size,
+    forget_host,
+    forget_service_backlog,
+    get_circuit_state,
+    get_services_with_backlog,
+    get_tracked_hosts,
+)
+from app.celery.service_callback_tasks import replay_parked_callbacks, start_callback_backlog_drains
 from app.celery.tasks import process_job
 from app.config import QueueNames, TaskNames
 from app.dao.invited_org_user_dao import delete_org_invitations_created_more_than_two_days_ago
@@ -17,9 +28,9 @@ from app.dao.jobs_dao import dao_set_scheduled_jobs_to_pending
 from app.dao.jobs_dao import dao_update_job
 from app.dao.notifications_dao import (
     is_delivery_slow_for_provider,
-    dao_get_scheduled_notifications,
-    set_scheduled_notification_to_processed,
-    notifications_not_yet_sent,
+    dao_claim_scheduled_notifications,
+    set_scheduled_notifications_to_processed,
+    notifications_not_yet_sent_in_pages,
     dao_precompiled_letters_still_pending_virus_check,
     dao_old_letters_with_created_status,
 )
@@ -28,6 +39,7 @@ from app.dao.provider_details_dao import (
     dao_toggle_sms_provider
 )
 from app.dao.users_dao import delete_codes_older_created_more_than_a_day_ago
+from app.delivery.ses_templates import delete_unused_ses_templates
 from app.models import (
     Job,
     JOB_STATUS_IN_PROGRESS,
@@ -35,7 +47,9 @@ from app.models import (
     SMS_TYPE,
     EMAIL_TYPE,
 )
-from app.notifications.process_notifications import send_notification_to_queue
+from app.notifications.process_notifications import send_notifications_to_queue_in_bulk
+from app.provider_details import load_balancing
+from app.provider_details.load_balancing import sms_load_balancing_enabled
 from app.v2.errors import JobIncompleteError
 
 
@@ -43,9 +57,14 @@ from app.v2.errors import JobIncompleteError
 @statsd(namespace="tasks")
 def run_scheduled_jobs():
     try:
-        for job in dao_set_scheduled_jobs_to_pending():
-            process_job.apply_async([str(job.id)], queue=QueueNames.JOBS)
-            current_app.logger.info("Job ID {} added to process job queue".format(job.id))
+        batch_size = current_app.config['SCHEDULED_JOBS_BATCH_SIZE']
+        while True:
+            jobs = dao_set_scheduled_jobs_to_pending(limit=batch_size)
+            for job in jobs:
+                process_job.apply_async([str(job.id)], queue=QueueNames.JOBS)
+                current_app.logger.info("Job ID {} added to process job queue".format(job.id))
+            if len(jobs) < batch_size:
+                break
     except SQLAlchemyError:
         current_app.logger.exception("Failed to run scheduled jobs")
         raise
@@ -55,12 +74,18 @@ def run_scheduled_jobs():
 @statsd(namespace="tasks")
 def send_scheduled_notifications():
     try:
-        scheduled_notifications = dao_get_scheduled_notifications()
-        for notification in scheduled_notifications:
-            send_notification_to_queue(notification, notification.service.research_mode)
-            set_scheduled_notification_to_processed(notification.id)
+        batch_size = current_app.config['BULK_REQUEUE_PAGE_SIZE']
+        sent = 0
+        while True:
+            notifications = dao_claim_scheduled_notifications(batch_size)
+            if notifications:
+                send_notifications_to_queue_in_bulk(notifications)
+                set_scheduled_notifications_to_processed([notification.id for notification in notifications])
+                sent += len(notifications)
+            if len(notifications) < batch_size:
+                break
         current_app.logger.info(
-            "Sent {} scheduled notifications to the provider queue".format(len(scheduled_notifications)))
+            "Sent {} scheduled notifications to the provider queue".format(sent))
     except SQLAlchemyError:
         current_app.logger.exception("Failed to send scheduled notifications")
         raise
@@ -101,7 +126,11 @@ def switch_current_sms_provider_on_slow_delivery():
     """
     Switch providers if at least 30% of notifications took more than four minutes to be delivered
     in the last ten minutes. Search from the time we last switched to the current provider.
+
+    Not used when sms is load balanced: the weights are adjusted instead, see adjust-sms-provider-weights.
     """
+    if sms_load_balancing_enabled():
+        return
     current_provider = get_current_provider('sms')
     if current_provider.updated_at > datetime.utcnow() - timedelta(minutes=10):
         current_app.logger.info("Slow delivery notifications provider switched less than 10 minutes ago.")
@@ -123,6 +152,21 @@ def switch_current_sms_provider_on_slow_delivery():
         dao_toggle_sms_provider(current_provider.identifier)
 
 
+@notify_celery.task(name='adjust-sms-provider-weights')
+@statsd(namespace="tasks")
+def adjust_sms_provider_weights():
+    if sms_load_balancing_enabled():
+        load_balancing.adjust_sms_provider_weights()
+
+
+@notify_celery.task(name='delete-unused-ses-templates')
+@statsd(namespace="tasks")
+def delete_unused_ses_templates_task():
+    deleted = delete_unused_ses_templates(aws_ses_client)
+    if deleted:
+        current_app.logger.info("Deleted {} unused SES templates".format(len(deleted)))
+
+
 @notify_celery.task(name='check-job-status')
 @statsd(namespace="tasks")
 def check_job_status():
@@ -168,18 +212,47 @@ def replay_created_notifications():
     # if the notification has not be send after 4 hours + 15 minutes, then try to resend.
     resend_created_notifications_older_than = (60 * 60 * 4) + (60 * 15)
     for notification_type in (EMAIL_TYPE, SMS_TYPE):
-        notifications_to_resend = notifications_not_yet_sent(
+        resent = 0
+        for notifications_to_resend in notifications_not_yet_sent_in_pages(
             resend_created_notifications_older_than,
-            notification_type
-        )
-
-        if len(notifications_to_resend) > 0:
-            current_app.logger.info("Sending {} {} notifications "
+            notification_type,
+            current_app.config['BULK_REQUEUE_PAGE_SIZE']
+        ):
+            send_notifications_to_queue_in_bulk(notifications_to_resend)
+            resent += len(notifications_to_resend)
+
+        if resent > 0:
+            current_app.logger.info("Sent {} {} notifications "
                                     "to the delivery queue because the notification "
-                                    "status was created.".format(len(notifications_to_resend), notification_type))
+                                    "status was created.".format(resent, notification_type))
+
 
-        for n in notifications_to_resend:
-            send_notification_to_queue(notification=n, research_mode=n.service.research_mode)
+@notify_celery.task(name='check-callback-circuit-breakers')
+@statsd(namespace="tasks")
+def check_callback_circuit_breakers():
+    """
+    Hosts that recover without receiving new callbacks would never close their breaker, so probe
+    half-open hosts with one parked callback and drain the backlogs of hosts that have closed.
+    """
+    for host in get_tracked_hosts():
+        state = get_circuit_state(host)
+        if state == CIRCUIT_OPEN:
+            continue
+
+        services_with_backlog = []
+        for service_id in get_services_with_backlog(host):
+            if callback_backlog_size(service_id):
+                services_with_backlog.append(service_id)
+            else:
+                forget_service_backlog(host, service_id)
+
+        if not services_with_backlog:
+            if state != CIRCUIT_HALF_OPEN:
+                forget_host(host)
+        elif state == CIRCUIT_HALF_OPEN:
+            replay_parked_callbacks(services_with_backlog[0], 1)
+        else:
+            start_callback_backlog_drains(host)
 
 
 @notify_celery.task(name='check-precompiled-letter-state')
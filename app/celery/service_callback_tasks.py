@@ -20,6 +20,19 @@ from app import (
     DATETIME_FORMAT
 )
 from app.config import QueueNames
+from app.callback_circuit_breaker import (
+    allow_callback_request,
+    callback_backlog_size,
+    callback_host,
+    claim_backlog_drain,
+    extend_backlog_drain,
+    get_services_with_backlog,
+    park_callback,
+    pop_parked_callbacks,
+    record_callback_failure,
+    record_callback_success,
+    release_backlog_drain,
+)
 
 
 @notify_celery.task(bind=True, name="send-delivery-status", max_retries=5, default_retry_delay=300)
@@ -44,7 +57,9 @@ def send_delivery_status_to_service(
         data,
         status_update['service_callback_api_url'],
         status_update['service_callback_api_bearer_token'],
-        'send_delivery_status_to_service'
+        'send_delivery_status_to_service',
+        service_id=status_update.get('service_id'),
+        task_args=[str(notification_id), encrypted_status_update]
     )
 
 
@@ -58,9 +73,11 @@ def send_keyword_status_to_service(self, encrypted_status_update):
                              'arrêt' in status_update['inbound_sms_keyword_content'].lower()) else None
 
     if status_stop:
+        # only the most recent notification sent to the number is reported
         notifications = dao_get_notifications_by_to_field(status_update['service_callback_api_service_id'],
                                                           status_update['inbound_sms_keyword_user_number'],
-                                                          SMS_TYPE)
+                                                          SMS_TYPE,
+                                                          page_size=1)
         if notifications:
             data = {
                 "id": str(notifications[0].id),
@@ -77,7 +94,9 @@ def send_keyword_status_to_service(self, encrypted_status_update):
                 data,
                 status_update['service_callback_api_url'],
                 status_update['service_callback_api_bearer_token'],
-                'send_delivery_status_to_service'
+                'send_delivery_status_to_service',
+                service_id=status_update['service_callback_api_service_id'],
+                task_args=[encrypted_status_update]
             )
 
 
@@ -99,12 +118,67 @@ def send_complaint_to_service(self, complaint_data):
         data,
         complaint['service_callback_api_url'],
         complaint['service_callback_api_bearer_token'],
-        'send_complaint_to_service'
+        'send_complaint_to_service',
+        service_id=complaint.get('service_id'),
+        task_args=[complaint_data]
     )
 
 
-def _send_data_to_service_callback_api(self, data, service_callback_url, token, function_name):
+@notify_celery.task(name="drain-callback-backlog")
+@statsd(namespace="tasks")
+def drain_callback_backlog(service_id):
+    """
+    Replay callbacks parked while a circuit breaker was open, at no more than
+    CALLBACK_BACKLOG_DRAIN_RATE callbacks per second. If the host fails again the breaker
+    re-opens and the remaining callbacks are parked again instead of being attempted.
+    """
+    rate = current_app.config['CALLBACK_BACKLOG_DRAIN_RATE']
+    replayed = replay_parked_callbacks(service_id, current_app.config['CALLBACK_BACKLOG_DRAIN_BATCH_SIZE'])
+
+    if callback_backlog_size(service_id):
+        extend_backlog_drain(service_id)
+        drain_callback_backlog.apply_async([service_id], queue=QueueNames.CALLBACKS, countdown=replayed / rate)
+    else:
+        release_backlog_drain(service_id)
+
+    current_app.logger.info("Replayed {} parked callbacks for service {}".format(replayed, service_id))
+
+
+def replay_parked_callbacks(service_id, count):
+    rate = current_app.config['CALLBACK_BACKLOG_DRAIN_RATE']
+    parked = pop_parked_callbacks(service_id, count)
+    for position, callback in enumerate(parked):
+        notify_celery.send_task(
+            name=callback['task'],
+            args=callback['args'],
+            queue=QueueNames.CALLBACKS,
+            countdown=position / rate
+        )
+    return len(parked)
+
+
+def start_callback_backlog_drains(host):
+    for service_id in get_services_with_backlog(host):
+        if claim_backlog_drain(service_id):
+            drain_callback_backlog.apply_async([service_id], queue=QueueNames.CALLBACKS)
+
+
+def _send_data_to_service_callback_api(
+    self, data, service_callback_url, token, function_name, service_id=None, task_args=None
+):
     notification_id = (data["notification_id"] if "notification_id" in data else data["id"])
+    host = callback_host(service_callback_url)
+    if not allow_callback_request(host):
+        park_callback(host, service_id, self.name, task_args)
+        current_app.logger.info(
+            "{} parked callback for notification_id: {}, circuit breaker open for host {}".format(
+                function_name,
+                notification_id,
+                host
+            )
+        )
+        return
+
     try:
         response = request(
             method="POST",
@@ -123,6 +197,8 @@ def _send_data_to_service_callback_api(self, data, service_callback_url, token,
             response.status_code
         ))
         response.raise_for_status()
+        if record_callback_success(host):
+            start_callback_backlog_drains(host)
     except RequestException as e:
         current_app.logger.warning(
             "{} request failed for notification_id: {} and url: {}. exc: {}".format(
@@ -133,6 +209,9 @@ def _send_data_to_service_callback_api(self, data, service_callback_url, token,
             )
         )
         if not isinstance(e, HTTPError) or e.response.status_code >= 500:
+            if record_callback_failure(host):
+                park_callback(host, service_id, self.name, task_args)
+                return
             try:
                 self.retry(queue=QueueNames.RETRY)
             except self.MaxRetriesExceededError:
@@ -157,6 +236,7 @@ def create_delivery_status_callback_data(notification, service_callback_api):
             notification.updated_at.strftime(DATETIME_FORMAT) if notification.updated_at else None,
         "notification_sent_at": notification.sent_at.strftime(DATETIME_FORMAT) if notification.sent_at else None,
         "notification_type": notification.notification_type,
+        "service_id": str(notification.service_id),
         "service_callback_api_url": service_callback_api.url,
         "service_callback_api_bearer_token": service_callback_api.bearer_token,
     }
@@ -184,6 +264,7 @@ def create_complaint_callback_data(complaint, notification, service_callback_api
         "reference": notification.client_reference,
         "to": recipient,
         "complaint_date": complaint.complaint_date.strftime(DATETIME_FORMAT),
+        "service_id": str(notification.service_id),
         "service_callback_api_url": service_callback_api.url,
         "service_callback_api_bearer_token": service_callback_api.bearer_token,
     }
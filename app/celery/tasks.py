@@ -67,6 +67,7 @@ from app.models import (
     SMS_TYPE,
     DailySortedLetter,
 )
+from app.notifications.latency import ENQUEUE, timed_stage
 from app.notifications.process_notifications import persist_notification
 from app.service.utils import service_allowed_to_send_to
 from app.utils import get_csv_max_rows
@@ -104,13 +105,19 @@ def process_job(job_id, sender_id=None):
 
     current_app.logger.debug("Starting job {} processing {} notifications".format(job_id, job.notification_count))
 
-    for row in RecipientCSV(
-            s3.get_job_from_s3(str(service.id), str(job_id)),
-            template_type=template.template_type,
-            placeholders=template.placeholders,
-            max_rows=get_csv_max_rows(service.id),
-    ).get_rows():
-        process_row(row, template, job, service, sender_id=sender_id)
+    rows = RecipientCSV(
+        s3.get_job_from_s3(str(service.id), str(job_id)),
+        template_type=template.template_type,
+        placeholders=template.placeholders,
+        max_rows=get_csv_max_rows(service.id),
+    ).get_rows()
+
+    if template.template_type == EMAIL_TYPE and current_app.config['SES_BULK_SENDING_ENABLED'] \
+            and not service.research_mode:
+        process_email_rows_in_batches(rows, template, job, service, sender_id=sender_id)
+    else:
+        for row in rows:
+            process_row(row, template, job, service, sender_id=sender_id)
 
     job_complete(job, start=start)
 
@@ -132,9 +139,8 @@ def job_complete(job, resumed=False, start=None):
         )
 
 
-def process_row(row, template, job, service, sender_id=None):
-    template_type = template.template_type
-    encrypted = encryption.encrypt({
+def encrypt_row(row, template, job):
+    return encryption.encrypt({
         'template': str(template.id),
         'template_version': job.template_version,
         'job': str(job.id),
@@ -143,6 +149,11 @@ def process_row(row, template, job, service, sender_id=None):
         'personalisation': dict(row.personalisation)
     })
 
+
+def process_row(row, template, job, service, sender_id=None):
+    template_type = template.template_type
+    encrypted = encrypt_row(row, template, job)
+
     send_fns = {
         SMS_TYPE: save_sms,
         EMAIL_TYPE: save_email,
@@ -166,6 +177,24 @@ def process_row(row, template, job, service, sender_id=None):
     )
 
 
+def process_email_rows_in_batches(rows, template, job, service, sender_id=None):
+    """
+    Saves the emails of a job in batches that are sent together, see deliver-email-batch.
+    """
+    task_kwargs = {}
+    if sender_id:
+        task_kwargs['sender_id'] = sender_id
+
+    batch = []
+    for row in rows:
+        batch.append([create_uuid(), encrypt_row(row, template, job)])
+        if len(batch) == current_app.config['SES_BULK_BATCH_SIZE']:
+            save_emails.apply_async((str(service.id), batch), task_kwargs, queue=QueueNames.DATABASE)
+            batch = []
+    if batch:
+        save_emails.apply_async((str(service.id), batch), task_kwargs, queue=QueueNames.DATABASE)
+
+
 def __sending_limits_for_job_exceeded(service, job, job_id):
     total_sent = fetch_todays_total_message_count(service.id)
 
@@ -220,10 +249,11 @@ def save_sms(self,
             reply_to_text=reply_to_text
         )
 
-        provider_tasks.deliver_sms.apply_async(
-            [str(saved_notification.id)],
-            queue=QueueNames.SEND_SMS if not service.research_mode else QueueNames.RESEARCH_MODE
-        )
+        with timed_stage(ENQUEUE, SMS_TYPE, priority=template.process_type):
+            provider_tasks.deliver_sms.apply_async(
+                [str(saved_notification.id)],
+                queue=QueueNames.SEND_SMS if not service.research_mode else QueueNames.RESEARCH_MODE
+            )
 
         current_app.logger.debug(
             "SMS {} created at {} for job {}".format(
@@ -247,43 +277,91 @@ def save_email(self,
 
     service = dao_fetch_service_by_id(service_id)
     template = dao_get_template_by_id(notification['template'], version=notification['template_version'])
-
-    if sender_id:
-        reply_to_text = dao_get_reply_to_by_id(service_id, sender_id).email_address
-    else:
-        reply_to_text = template.get_reply_to_text()
+    reply_to_text = get_email_reply_to_text(service_id, template, sender_id)
 
     if not service_allowed_to_send_to(notification['to'], service, KEY_TYPE_NORMAL):
         current_app.logger.info("Email {} failed as restricted service".format(notification_id))
         return
 
     try:
-        saved_notification = persist_notification(
-            template_id=notification['template'],
-            template_version=notification['template_version'],
-            recipient=notification['to'],
-            service=service,
-            personalisation=notification.get('personalisation'),
-            notification_type=EMAIL_TYPE,
-            api_key_id=None,
-            key_type=KEY_TYPE_NORMAL,
-            created_at=datetime.utcnow(),
-            job_id=notification.get('job', None),
-            job_row_number=notification.get('row_number', None),
-            notification_id=notification_id,
-            reply_to_text=reply_to_text
-        )
+        saved_notification = persist_email(service, notification_id, notification, reply_to_text)
 
-        provider_tasks.deliver_email.apply_async(
-            [str(saved_notification.id)],
-            queue=QueueNames.SEND_EMAIL if not service.research_mode else QueueNames.RESEARCH_MODE
-        )
+        with timed_stage(ENQUEUE, EMAIL_TYPE, priority=template.process_type):
+            provider_tasks.deliver_email.apply_async(
+                [str(saved_notification.id)],
+                queue=QueueNames.SEND_EMAIL if not service.research_mode else QueueNames.RESEARCH_MODE
+            )
 
         current_app.logger.debug("Email {} created at {}".format(saved_notification.id, saved_notification.created_at))
     except SQLAlchemyError as e:
         handle_exception(self, notification, notification_id, e)
 
 
+@notify_celery.task(name="save-emails")
+@statsd(namespace="tasks")
+def save_emails(service_id, encrypted_notifications, sender_id=None):
+    """
+    Saves a batch of emails from a job, encrypted_notifications being [notification id, encrypted notification]
+    pairs, and sends them together with deliver-email-batch.
+    """
+    service = dao_fetch_service_by_id(service_id)
+    templates = {}
+    saved_notification_ids = []
+
+    for notification_id, encrypted_notification in encrypted_notifications:
+        notification = encryption.decrypt(encrypted_notification)
+        template_key = (notification['template'], notification['template_version'])
+        if template_key not in templates:
+            template = dao_get_template_by_id(notification['template'], version=notification['template_version'])
+            templates[template_key] = (template, get_email_reply_to_text(service_id, template, sender_id))
+        template, reply_to_text = templates[template_key]
+
+        if not service_allowed_to_send_to(notification['to'], service, KEY_TYPE_NORMAL):
+            current_app.logger.info("Email {} failed as restricted service".format(notification_id))
+            continue
+
+        try:
+            saved_notification = persist_email(service, notification_id, notification, reply_to_text)
+        except SQLAlchemyError:
+            current_app.logger.exception("Email {} could not be saved with its batch".format(notification_id))
+            # saved on its own, with the retries of save-email
+            task_kwargs = {'sender_id': sender_id} if sender_id else {}
+            save_email.apply_async(
+                (service_id, notification_id, encrypted_notification), task_kwargs, queue=QueueNames.RETRY
+            )
+            continue
+        saved_notification_ids.append(str(saved_notification.id))
+
+    if saved_notification_ids:
+        provider_tasks.deliver_email_batch.apply_async([saved_notification_ids], queue=QueueNames.SEND_EMAIL)
+        current_app.logger.debug("{} emails created for job {}".format(
+            len(saved_notification_ids), notification.get('job', None)))
+
+
+def get_email_reply_to_text(service_id, template, sender_id):
+    if sender_id:
+        return dao_get_reply_to_by_id(service_id, sender_id).email_address
+    return template.get_reply_to_text()
+
+
+def persist_email(service, notification_id, notification, reply_to_text):
+    return persist_notification(
+        template_id=notification['template'],
+        template_version=notification['template_version'],
+        recipient=notification['to'],
+        service=service,
+        personalisation=notification.get('personalisation'),
+        notification_type=EMAIL_TYPE,
+        api_key_id=None,
+        key_type=KEY_TYPE_NORMAL,
+        created_at=datetime.utcnow(),
+        job_id=notification.get('job', None),
+        job_row_number=notification.get('row_number', None),
+        notification_id=notification_id,
+        reply_to_text=reply_to_text
+    )
+
+
 @notify_celery.task(bind=True, name="save-letter", max_retries=5, default_retry_delay=300)
 @statsd(namespace="tasks")
 def save_letter(
@@ -1,16 +1,17 @@
+import json
+
 import boto3
 import botocore
 from flask import current_app
 from time import monotonic
 from notifications_utils.recipients import InvalidEmailError
-import unicodedata
 
 from app.clients import STATISTICS_DELIVERED, STATISTICS_FAILURE
 from app.clients.email import (EmailClientException, EmailClient)
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.mime.application import MIMEApplication
-from email.header import Header
+from app.clients.email.raw_email import build_raw_email, encode_source, punycode_encode_email
+
+# destinations per SendBulkTemplatedEmail call
+SES_BULK_MAX_DESTINATIONS = 50
 
 ses_response_map = {
     'Permanent': {
@@ -59,10 +60,18 @@ class AwsSesClient(EmailClient):
         self.name = 'ses'
         self.statsd_client = statsd_client
         self.charset = 'utf-8'
+        # names of the templates known to exist in SES
+        self._templates = set()
 
     def get_name(self):
         return self.name
 
+    def _aws_ses_arn(self, sending_domain):
+        aws_ses_owner_account = current_app.config['AWS_SES_OWNER_ACCOUNT']
+        return 'arn:aws:ses:{}:{}:identity/{}'.format(
+            current_app.config['AWS_SES_REGION'], aws_ses_owner_account,
+            sending_domain) if aws_ses_owner_account else None
+
     def send_email(self,
                    source,
                    sending_domain,
@@ -75,54 +84,31 @@ class AwsSesClient(EmailClient):
                    importance=None,
                    cc_addresses=None):
         try:
-            aws_ses_owner_account = current_app.config['AWS_SES_OWNER_ACCOUNT']
-            aws_ses_arn = 'arn:aws:ses:{}:{}:identity/{}'.format(
-                current_app.config['AWS_SES_REGION'], aws_ses_owner_account,
-                sending_domain) if aws_ses_owner_account else None
+            aws_ses_arn = self._aws_ses_arn(sending_domain)
             if isinstance(to_addresses, str):
                 to_addresses = [to_addresses]
             if isinstance(cc_addresses, str):
                 cc_addresses = [cc_addresses]
 
-            source = unicodedata.normalize('NFKD', source)
-            friendly_name, match_string, from_address = source.partition("<")
-            friendly_name = friendly_name.replace('"', '')
-            h = Header(friendly_name, 'utf-8')
-            encoded_friendly_name = h.encode()
-            encoded_source = '{} {}{}'.format(encoded_friendly_name, match_string, from_address)
-
             reply_to_addresses = [reply_to_address] if reply_to_address else []
 
-            multipart_content_subtype = 'alternative' if html_body else 'mixed'
-            msg = MIMEMultipart(multipart_content_subtype)
-            msg['Subject'] = subject
-            msg['From'] = encoded_source
-            msg['To'] = ",".join([punycode_encode_email(addr) for addr in to_addresses])
-            if aws_ses_arn:
-                msg.add_header('X-SES-SOURCE-ARN', aws_ses_arn)
-                msg.add_header('X-SES-FROM-ARN', aws_ses_arn)
-            if importance:
-                msg.add_header('importance', importance)
-            if cc_addresses:
-                msg['CC'] = ",".join([punycode_encode_email(addr) for addr in cc_addresses])
-            if reply_to_addresses != []:
-                msg.add_header('reply-to', ",".join([punycode_encode_email(addr) for addr in reply_to_addresses]))
-            part = MIMEText(body.encode(self.charset), 'plain', self.charset)
-            msg.attach(part)
-
-            if html_body:
-                part = MIMEText(html_body.encode(self.charset), 'html', self.charset)
-                msg.attach(part)
-
-            for attachment in attachments or []:
-                part = MIMEApplication(attachment["data"])
-                part.add_header('Content-Disposition', 'attachment', filename=attachment["name"])
-                msg.attach(part)
+            raw_message = build_raw_email(
+                source,
+                to_addresses,
+                subject,
+                body,
+                html_body=html_body,
+                reply_to_addresses=reply_to_addresses,
+                cc_addresses=cc_addresses,
+                attachments=attachments,
+                aws_ses_arn=aws_ses_arn,
+                importance=importance,
+            )
 
             start_time = monotonic()
             response = self._client.send_raw_email(
                 Source=source,
-                RawMessage={'Data': msg.as_string()}
+                RawMessage={'Data': raw_message}
             )
         except botocore.exceptions.ClientError as e:
             self.statsd_client.incr("clients.ses.error")
@@ -146,8 +132,89 @@ class AwsSesClient(EmailClient):
             self.statsd_client.incr("clients.ses.success")
             return response['MessageId']
 
+    def create_template(self, template):
+        """
+        Creates template, a dict of SES template parts, unless it already exists.
+        """
+        if template['TemplateName'] in self._templates:
+            return
+        try:
+            self._client.create_template(Template=template)
+        except botocore.exceptions.ClientError as e:
+            if e.response['Error']['Code'] != 'AlreadyExists':
+                self.statsd_client.incr("clients.ses.error")
+                raise AwsSesClientException(str(e))
+        self._templates.add(template['TemplateName'])
 
-def punycode_encode_email(email_address):
-    # only the hostname should ever be punycode encoded.
-    local, hostname = email_address.split('@')
-    return '{}@{}'.format(local, hostname.encode('idna').decode('utf-8'))
+    def delete_template(self, template_name):
+        self._templates.discard(template_name)
+        try:
+            self._client.delete_template(TemplateName=template_name)
+        except botocore.exceptions.ClientError as e:
+            if e.response['Error']['Code'] != 'TemplateDoesNotExist':
+                self.statsd_client.incr("clients.ses.error")
+                raise AwsSesClientException(str(e))
+
+    def list_templates(self):
+        """
+        The (name, creation datetime) of each template of the account.
+        """
+        kwargs = {'MaxItems': 100}
+        while True:
+            response = self._client.list_templates(**kwargs)
+            for template in response['TemplatesMetadata']:
+                yield template['Name'], template['CreatedTimestamp']
+            if not response.get('NextToken'):
+                return
+            kwargs['NextToken'] = response['NextToken']
+
+    def send_bulk_templated_email(self, source, sending_domain, template_name, destinations, reply_to_address=None):
+        """
+        Sends template_name to destinations, a list of (to address, replacement data) pairs.
+        Returns the message id of each destination, None for the destinations SES rejected.
+        """
+        aws_ses_arn = self._aws_ses_arn(sending_domain)
+        message_ids = []
+        for start in range(0, len(destinations), SES_BULK_MAX_DESTINATIONS):
+            batch = destinations[start:start + SES_BULK_MAX_DESTINATIONS]
+            kwargs = {
+                'Source': encode_source(source),
+                'Template': template_name,
+                'DefaultTemplateData': '{}',
+                'Destinations': [
+                    {
+                        'Destination': {'ToAddresses': [punycode_encode_email(to_address)]},
+                        'ReplacementTemplateData': json.dumps(replacement_data),
+                    } for to_address, replacement_data in batch
+                ],
+            }
+            if reply_to_address:
+                kwargs['ReplyToAddresses'] = [punycode_encode_email(reply_to_address)]
+            if aws_ses_arn:
+                kwargs['SourceArn'] = aws_ses_arn
+
+            try:
+                start_time = monotonic()
+                response = self._client.send_bulk_templated_email(**kwargs)
+            except Exception as e:
+                self.statsd_client.incr("clients.ses.error")
+                if isinstance(e, botocore.exceptions.ClientError) and \
+                        e.response['Error']['Code'] == 'TemplateDoesNotExist':
+                    # deleted since, it is created again for the next batch
+                    self._templates.discard(template_name)
+                raise AwsSesClientException(str(e))
+
+            elapsed_time = monotonic() - start_time
+            current_app.logger.info(
+                "AWS SES bulk request for {} emails finished in {}".format(len(batch), elapsed_time))
+            self.statsd_client.timing("clients.ses.bulk-request-time", elapsed_time)
+            for status in response['Status']:
+                if status['Status'] == 'Success':
+                    self.statsd_client.incr("clients.ses.success")
+                    message_ids.append(status['MessageId'])
+                else:
+                    self.statsd_client.incr("clients.ses.error")
+                    current_app.logger.warning("AWS SES bulk destination rejected: {} {}".format(
+                        status['Status'], status.get('Error')))
+                    message_ids.append(None)
+        return message_ids
@@ -0,0 +1,159 @@
+"""
+Assembly of the raw MIME messages sent through SES.
+
+Building a `MIMEMultipart` tree and serialising it for every email re-encodes the same sender, bodies and
+attachments again and again across a job. Here the encoded pieces are cached: the sender and its headers,
+each text part by content, and each attachment (base64 encoded once per document, in a cache keyed by a digest
+of the document and bounded by the size of the encoded parts). Per recipient only the
+headers that change and the part boundaries are put together. The output is the same as
+`MIMEMultipart.as_string()`.
+"""
+import hashlib
+import random
+import sys
+import threading
+import unicodedata
+from collections import OrderedDict
+from email.header import Header
+from email.mime.application import MIMEApplication
+from email.mime.text import MIMEText
+from email.policy import compat32
+from functools import lru_cache
+
+CHARSET = 'utf-8'
+# as_string() does not fold headers
+HEADER_POLICY = compat32.clone(max_line_length=0)
+ATTACHMENT_PARTS_MAX_SIZE = 50 * 1024 * 1024  # characters of encoded parts kept per process
+
+
+@lru_cache(maxsize=1024)
+def punycode_encode_email(email_address):
+    # only the hostname should ever be punycode encoded.
+    local, hostname = email_address.split('@')
+    return '{}@{}'.format(local, hostname.encode('idna').decode('utf-8'))
+
+
+@lru_cache(maxsize=256)
+def encode_source(source):
+    source = unicodedata.normalize('NFKD', source)
+    friendly_name, match_string, from_address = source.partition("<")
+    friendly_name = friendly_name.replace('"', '')
+    return '{} {}{}'.format(Header(friendly_name, 'utf-8').encode(), match_string, from_address)
+
+
+@lru_cache(maxsize=256)
+def sending_headers(aws_ses_arn, importance):
+    headers = ''
+    if aws_ses_arn:
+        headers += _header('X-SES-SOURCE-ARN', aws_ses_arn) + _header('X-SES-FROM-ARN', aws_ses_arn)
+    if importance:
+        headers += _header('importance', importance)
+    return headers
+
+
+@lru_cache(maxsize=256)
+def _header(name, value):
+    return HEADER_POLICY.fold(name, value)
+
+
+@lru_cache(maxsize=64)
+def text_part(content, subtype):
+    return MIMEText(content.encode(CHARSET), subtype, CHARSET).as_string()
+
+
+class EncodedPartCache:
+    """
+    Least recently used cache of encoded MIME parts, bounded by their total size rather than their number.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._parts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_encode(self, key, encode):
+        with self._lock:
+            part = self._parts.get(key)
+            if part is not None:
+                self._parts.move_to_end(key)
+                self.hits += 1
+                return part
+            self.misses += 1
+
+        part = encode()
+        if len(part) > self.max_size:
+            return part
+
+        with self._lock:
+            if key not in self._parts:
+                self._parts[key] = part
+                self.size += len(part)
+            while self.size > self.max_size:
+                _, evicted = self._parts.popitem(last=False)
+                self.size -= len(evicted)
+        return part
+
+    def clear(self):
+        with self._lock:
+            self._parts.clear()
+            self.size = self.hits = self.misses = 0
+
+
+attachment_parts = EncodedPartCache(ATTACHMENT_PARTS_MAX_SIZE)
+
+
+def _encode_attachment(name, data):
+    part = MIMEApplication(data)
+    part.add_header('Content-Disposition', 'attachment', filename=name)
+    return part.as_string()
+
+
+def attachment_part(name, data):
+    # keyed by a digest so the cache does not keep the documents themselves alive
+    key = (name, hashlib.sha256(data).hexdigest())
+    return attachment_parts.get_or_encode(key, lambda: _encode_attachment(name, data))
+
+
+def _make_boundary():
+    return '=' * 15 + '%019d' % random.randrange(sys.maxsize) + '=='
+
+
+def build_raw_email(
+    source,
+    to_addresses,
+    subject,
+    body,
+    html_body='',
+    reply_to_addresses=None,
+    cc_addresses=None,
+    attachments=None,
+    aws_ses_arn=None,
+    importance=None,
+):
+    boundary = _make_boundary()
+    headers = [
+        'Content-Type: multipart/{}; boundary="{}"\n'.format('alternative' if html_body else 'mixed', boundary),
+        'MIME-Version: 1.0\n',
+        _header('Subject', subject),
+        _header('From', encode_source(source)),
+        HEADER_POLICY.fold('To', ",".join(punycode_encode_email(addr) for addr in to_addresses)),
+        sending_headers(aws_ses_arn, importance),
+    ]
+    if cc_addresses:
+        headers.append(HEADER_POLICY.fold('CC', ",".join(punycode_encode_email(addr) for addr in cc_addresses)))
+    if reply_to_addresses:
+        headers.append(
+            HEADER_POLICY.fold('reply-to', ",".join(punycode_encode_email(addr) for addr in reply_to_addresses))
+        )
+
+    parts = [text_part(body, 'plain')]
+    if html_body:
+        parts.append(text_part(html_body, 'html'))
+    for attachment in attachments or []:
+        parts.append(attachment_part(attachment["name"], attachment["data"]))
+
+    separator = '\n--{}\n'.format(boundary)
+    return '{}{}{}\n--{}--\n'.format(''.join(headers), separator, separator.join(parts), boundary)
@@ -1,11 +1,152 @@
+"""
+Malware scan verdicts for documents attached to emails.
+
+A single assemblyline client is kept per process. Completed verdicts never change, so they are cached by
+sid, in the process and in redis. Emails waiting on a scan register their sid as pending; the
+`check-pending-mlwr-scans` task polls every pending sid once per run, however many emails wait on it, and
+requeues the emails as soon as the verdict is in.
+
+Pending sids are scored by when an email last waited on them. A sid is dropped once its waiting emails have
+expired, once no email waits on it any more, or after MLWR_MAX_CHECK_FAILURES failed checks. The emails of a
+dropped sid are still retried by deliver_email, which registers the sid again if the scan is still pending.
+"""
+import json
+import threading
+import time
+
 from assemblyline_client import Client
+from cachelib import SimpleCache
 from flask import current_app
 
+from app import redis_store
+
+MLWR_COMPLETED = 'completed'
+MLWR_PENDING_SIDS_KEY = 'mlwr-pending-scans'  # a sorted set, mlwr-pending-sids was a set
+MLWR_CHECK_FAILURES_KEY = 'mlwr-check-failures'
+MLWR_MAX_CHECK_FAILURES = 30  # 5 minutes of checks every 10 seconds
+MALWARE_SCORE_THRESHOLD = 500
+
+verdict_cache = SimpleCache(threshold=1000, default_timeout=0)
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def mlwr_verdict_key(sid):
+    return 'mlwr-verdict-{}'.format(sid)
+
+
+def mlwr_waiting_notifications_key(sid):
+    return 'mlwr-waiting-{}'.format(sid)
+
+
+def get_mlwr_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = Client(
+                    current_app.config["MLWR_HOST"],
+                    apikey=(
+                        current_app.config["MLWR_USER"],
+                        current_app.config["MLWR_KEY"]))
+    return _client
+
 
 def check_mlwr_score(sid):
-    client = Client(
-        current_app.config["MLWR_HOST"],
-        apikey=(
-            current_app.config["MLWR_USER"],
-            current_app.config["MLWR_KEY"]))
-    return client.submission(sid)
+    """
+    The submission for sid, from the cache if its scan has completed.
+    """
+    verdict = verdict_cache.get(sid)
+    if verdict is not None:
+        return verdict
+
+    cached = redis_store.get(mlwr_verdict_key(sid))
+    if cached:
+        verdict = json.loads(cached)
+        verdict_cache.set(sid, verdict)
+        return verdict
+
+    submission = get_mlwr_client().submission(sid)
+    if is_completed(submission):
+        cache_verdict(sid, submission)
+    return submission
+
+
+def is_completed(submission):
+    return bool(submission) and submission.get("state") == MLWR_COMPLETED
+
+
+def is_malware(submission):
+    return "submission" in submission and submission["submission"]["max_score"] >= MALWARE_SCORE_THRESHOLD
+
+
+def cache_verdict(sid, submission):
+    # only what deliveries look at, full submissions can be large
+    verdict = {"state": submission["state"]}
+    if "submission" in submission:
+        verdict["submission"] = {"max_score": submission["submission"]["max_score"]}
+    verdict_cache.set(sid, verdict)
+    redis_store.set(mlwr_verdict_key(sid), json.dumps(verdict), ex=current_app.config['EXPIRE_CACHE_EIGHT_DAYS'])
+
+
+def wait_for_mlwr_scan(sid, notification_id):
+    """
+    Register a notification as waiting on the scan of sid, so it is requeued once the verdict is in.
+    """
+    if not redis_store.active:
+        return
+    try:
+        pipe = redis_store.redis_store.pipeline()
+        pipe.sadd(mlwr_waiting_notifications_key(sid), str(notification_id))
+        pipe.expire(mlwr_waiting_notifications_key(sid), current_app.config['EXPIRE_CACHE_EIGHT_DAYS'])
+        pipe.zadd(MLWR_PENDING_SIDS_KEY, {sid: time.time()})
+        pipe.execute()
+    except Exception:
+        current_app.logger.exception("Redis error registering pending mlwr scan {}".format(sid))
+
+
+def get_pending_mlwr_sids():
+    """
+    The pending sids, after dropping those nothing waited on for as long as waiting emails are kept.
+    """
+    if not redis_store.active:
+        return []
+    expired_before = time.time() - current_app.config['EXPIRE_CACHE_EIGHT_DAYS']
+    for sid in redis_store.redis_store.zrangebyscore(MLWR_PENDING_SIDS_KEY, '-inf', expired_before):
+        current_app.logger.warning("Dropping expired pending mlwr scan {}".format(_decode(sid)))
+        drop_pending_mlwr_scan(_decode(sid))
+    return [_decode(sid) for sid in redis_store.redis_store.zrange(MLWR_PENDING_SIDS_KEY, 0, -1)]
+
+
+def has_notifications_waiting_for_mlwr_scan(sid):
+    return bool(redis_store.redis_store.exists(mlwr_waiting_notifications_key(sid)))
+
+
+def record_mlwr_check_failure(sid):
+    """
+    Counts a failed check of sid, returns how many checks of it have failed.
+    """
+    return redis_store.redis_store.hincrby(MLWR_CHECK_FAILURES_KEY, sid, 1)
+
+
+def drop_pending_mlwr_scan(sid):
+    pipe = redis_store.redis_store.pipeline()
+    pipe.delete(mlwr_waiting_notifications_key(sid))
+    pipe.zrem(MLWR_PENDING_SIDS_KEY, sid)
+    pipe.hdel(MLWR_CHECK_FAILURES_KEY, sid)
+    pipe.execute()
+
+
+def pop_notifications_waiting_for_mlwr_scan(sid):
+    pipe = redis_store.redis_store.pipeline()
+    pipe.smembers(mlwr_waiting_notifications_key(sid))
+    pipe.delete(mlwr_waiting_notifications_key(sid))
+    pipe.zrem(MLWR_PENDING_SIDS_KEY, sid)
+    pipe.hdel(MLWR_CHECK_FAILURES_KEY, sid)
+    notification_ids, _, _, _ = pipe.execute()
+    return sorted(_decode(notification_id) for notification_id in notification_ids)
+
+
+def _decode(value):
+    return value.decode('utf-8') if isinstance(value, bytes) else value
@@ -100,6 +100,8 @@ class Config(object):
     REDIS_ENABLED = os.getenv('REDIS_ENABLED') == '1'
     EXPIRE_CACHE_TEN_MINUTES = 600
     EXPIRE_CACHE_EIGHT_DAYS = 8 * 24 * 60 * 60
+    REPORTING_CACHE_TTL = 60 * 60
+    REPORTING_CACHE_TODAY_TTL = 60
 
     # URL of AWS sqs instance
     SQS_URL = os.getenv("SQS_URL", "sqs://")
@@ -127,12 +129,23 @@ class Config(object):
     MLWR_HOST = os.getenv("MLWR_HOST", False)
     MLWR_USER = os.getenv("MLWR_USER", "")
     MLWR_KEY = os.getenv("MLWR_KEY", "")
+    MLWR_PENDING_RETRY_DELAY = 600  # seconds
 
     # SendGrid
     SENDGRID_API_KEY = os.getenv("SENDGRID_API_KEY", "")
 
     # PII check
     SCAN_FOR_PII = os.getenv("SCAN_FOR_PII", False)
+    # see app/delivery/pii.py: sin, credit_card, health_card
+    PII_DETECTORS = [name for name in os.getenv("PII_DETECTORS", "sin").split(",") if name]
+
+    # Service callback circuit breaker
+    CALLBACK_CIRCUIT_BREAKER_THRESHOLD = int(os.getenv('CALLBACK_CIRCUIT_BREAKER_THRESHOLD', 10))
+    CALLBACK_CIRCUIT_BREAKER_FAILURE_WINDOW = 60  # seconds
+    CALLBACK_CIRCUIT_BREAKER_COOLDOWN = int(os.getenv('CALLBACK_CIRCUIT_BREAKER_COOLDOWN', 300))  # seconds
+    CALLBACK_BACKLOG_MAX_SIZE = int(os.getenv('CALLBACK_BACKLOG_MAX_SIZE', 100000))
+    CALLBACK_BACKLOG_DRAIN_BATCH_SIZE = 100
+    CALLBACK_BACKLOG_DRAIN_RATE = int(os.getenv('CALLBACK_BACKLOG_DRAIN_RATE', 10))  # callbacks per second
 
     ###########################
     # Default config values ###
@@ -164,6 +177,7 @@ class Config(object):
     SQLALCHEMY_STATEMENT_TIMEOUT = 1200
     PAGE_SIZE = 50
     API_PAGE_SIZE = 250
+    NOTIFICATIONS_CSV_CHUNK_SIZE = 10000
     TEST_MESSAGE_FILENAME = 'Test message'
     ONE_OFF_MESSAGE_FILENAME = 'Report'
     MAX_VERIFY_CODE_COUNT = 10
@@ -219,7 +233,22 @@ class Config(object):
         # app/celery/scheduled_tasks.py
         'run-scheduled-jobs': {
             'task': 'run-scheduled-jobs',
-            'schedule': crontab(minute=1),
+            'schedule': crontab(),
+            'options': {'queue': QueueNames.PERIODIC}
+        },
+        'check-pending-mlwr-scans': {
+            'task': 'check-pending-mlwr-scans',
+            'schedule': timedelta(seconds=10),
+            'options': {'queue': QueueNames.PERIODIC}
+        },
+        'adjust-sms-provider-weights': {
+            'task': 'adjust-sms-provider-weights',
+            'schedule': crontab(),
+            'options': {'queue': QueueNames.PERIODIC}
+        },
+        'delete-unused-ses-templates': {
+            'task': 'delete-unused-ses-templates',
+            'schedule': crontab(minute=30),
             'options': {'queue': QueueNames.PERIODIC}
         },
         'delete-verify-codes': {
@@ -237,6 +266,11 @@ class Config(object):
             'schedule': crontab(),
             'options': {'queue': QueueNames.PERIODIC}
         },
+        'check-callback-circuit-breakers': {
+            'task': 'check-callback-circuit-breakers',
+            'schedule': crontab(),
+            'options': {'queue': QueueNames.PERIODIC}
+        },
         'replay-created-notifications': {
             'task': 'replay-created-notifications',
             'schedule': crontab(minute='0, 15, 30, 45'),
@@ -248,6 +282,11 @@ class Config(object):
             'schedule': crontab(hour=0, minute=5),
             'options': {'queue': QueueNames.PERIODIC}
         },
+        'create-billing-for-today': {
+            'task': 'create-billing-for-today',
+            'schedule': crontab(minute='*/10'),
+            'options': {'queue': QueueNames.REPORTING}
+        },
         'create-nightly-billing': {
             'task': 'create-nightly-billing',
             'schedule': crontab(hour=0, minute=15),
@@ -258,6 +297,16 @@ class Config(object):
             'schedule': crontab(hour=0, minute=30),  # after 'timeout-sending-notifications'
             'options': {'queue': QueueNames.REPORTING}
         },
+        'reconcile-notification-status-counts': {
+            'task': 'reconcile-notification-status-counts',
+            'schedule': crontab(hour=0, minute=45),
+            'options': {'queue': QueueNames.REPORTING}
+        },
+        'fold-notification-status-count-deltas': {
+            'task': 'fold-notification-status-count-deltas',
+            'schedule': crontab(),
+            'options': {'queue': QueueNames.REPORTING}
+        },
         'delete-sms-notifications': {
             'task': 'delete-sms-notifications',
             'schedule': crontab(hour=4, minute=15),  # after 'create-nightly-notification-status'
@@ -337,6 +386,38 @@ class Config(object):
     STATSD_ENABLED = bool(STATSD_HOST)
 
     SENDING_NOTIFICATIONS_TIMEOUT_PERIOD = 86400  # 1 day
+    TIMEOUT_NOTIFICATIONS_CHUNK_SIZE = 10000
+    BULK_REQUEUE_PAGE_SIZE = 5000
+    SCHEDULED_JOBS_BATCH_SIZE = 100
+
+    # seconds the in-memory provider routing table is used for before it is reloaded
+    PROVIDER_ROUTING_REFRESH_INTERVAL = 30
+
+    # share of sms traffic per provider identifier, eg {"sns": 70, "pinpoint": 30}. Empty routes by priority
+    SMS_PROVIDER_WEIGHTS = json.loads(os.getenv('SMS_PROVIDER_WEIGHTS', '{}'))
+    # providers a sender is registered with, eg {"+15146000000": ["pinpoint"]}
+    SMS_SENDER_PROVIDERS = json.loads(os.getenv('SMS_SENDER_PROVIDERS', '{}'))
+    SMS_LOAD_BALANCING_WINDOW = 5  # minutes of provider health used to adjust the weights
+    SMS_LOAD_BALANCING_MIN_REQUESTS = 20
+    SMS_LOAD_BALANCING_TARGET_LATENCY = 1000  # milliseconds
+    SMS_LOAD_BALANCING_MIN_SHARE = 0.05
+
+    # requests in flight per provider in a worker process, eg {"ses": 40, "sns": 20}, see
+    # app/provider_details/concurrency.py. Only the eventlet delivery worker makes concurrent requests
+    PROVIDER_CONCURRENCY_LIMITS = json.loads(os.getenv('PROVIDER_CONCURRENCY_LIMITS', '{}'))
+
+    # email attachments downloaded from document download
+    ATTACHMENT_CACHE_DIR = os.getenv('ATTACHMENT_CACHE_DIR', '/tmp/notification-attachments')
+    ATTACHMENT_CACHE_MAX_SIZE = int(os.getenv('ATTACHMENT_CACHE_MAX_SIZE', 500 * 1024 * 1024))
+    ATTACHMENT_CACHE_TTL = 60 * 60  # seconds
+    ATTACHMENT_DOWNLOAD_TIMEOUT = 30  # seconds
+    ATTACHMENT_MAX_SIZE = 10 * 1024 * 1024  # the SES limit for a whole message
+
+    # send job emails with SES templates, up to 50 recipients per call, see app/delivery/ses_templates.py
+    SES_BULK_SENDING_ENABLED = os.getenv('SES_BULK_SENDING_ENABLED') == '1'
+    SES_BULK_BATCH_SIZE = 50
+    SES_TEMPLATE_TTL = 24 * 60 * 60  # seconds since a template was last used
+    SES_TEMPLATES_MAX = 5000  # SES accounts can have 10,000
 
     SIMULATED_EMAIL_ADDRESSES = (
         'simulate-delivered@notifications.service.gov.uk',
@@ -470,6 +551,9 @@ class Test(Development):
     MMG_URL = 'https://example.com/mmg'
     FIRETEXT_URL = 'https://example.com/firetext'
 
+    # tests change provider_details directly, so always read the routing from the database
+    PROVIDER_ROUTING_REFRESH_INTERVAL = 0
+
 
 class Production(Config):
     NOTIFY_EMAIL_DOMAIN = os.getenv("NOTIFY_EMAIL_DOMAIN", "itq.gouv.qc.ca")
@@ -1,6 +1,10 @@
 import itertools
 from functools import wraps
 
+from sqlalchemy import tuple_
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
 from app import db
 from app.history_meta import create_history
 
@@ -75,3 +79,55 @@ def version_class(*version_options):
 
 def dao_rollback():
     db.session.rollback()
+
+
+def keyset_paginate(query, sort_columns, page_size):
+    """
+    Yield pages of query results ordered by sort_columns. Each page starts after the last row of the
+    previous one, so deep pages cost the same as the first one, unlike LIMIT/OFFSET.
+    sort_columns must order the rows uniquely and be selected by the query under their own names.
+    """
+    after = None
+    while True:
+        page_query = query
+        if after is not None:
+            page_query = page_query.filter(keyset_after(sort_columns, after))
+        page = page_query.order_by(*sort_columns).limit(page_size).all()
+        if page:
+            yield page
+        if len(page) < page_size:
+            return
+        after = tuple(getattr(page[-1], column.key) for column in sort_columns)
+
+
+def keyset_after(sort_columns, after, descending=False):
+    """
+    The condition for the rows that come after the row with the values after of sort_columns, ordered by
+    sort_columns descending if descending is set.
+    """
+    if descending:
+        return tuple_(*sort_columns) < tuple_(*after)
+    return tuple_(*sort_columns) > tuple_(*after)
+
+
+class Explain(Executable, ClauseElement):
+    """
+    EXPLAIN (FORMAT JSON) of a statement, executed as the statement would be, binds included.
+    """
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain, 'postgresql')
+def _compile_explain(element, compiler, **kwargs):
+    return 'EXPLAIN (FORMAT JSON) {}'.format(compiler.process(element.statement, **kwargs))
+
+
+def approximate_count(query):
+    """
+    The number of rows the query planner expects query to return. Unlike COUNT(*) it doesn't read the rows, so
+    it costs the same whatever their number, but it is only as good as the table statistics.
+    """
+    plan = db.session.execute(Explain(query.order_by(None).statement)).scalar()
+    return int(plan[0]['Plan']['Plan Rows'])
@@ -1,9 +1,9 @@
 from datetime import datetime, timedelta, time, date
 
 from flask import current_app
-from notifications_utils.timezones import convert_local_timezone_to_utc, convert_utc_to_local_timezone
+from notifications_utils.timezones import convert_local_timezone_to_utc
 from sqlalchemy.dialects.postgresql import insert
-from sqlalchemy import func, case, desc, Date, Integer, and_
+from sqlalchemy import func, case, desc, Date, DateTime, Integer, literal
 
 from app import db
 from app.dao.date_util import (
@@ -13,6 +13,7 @@ from app.dao.date_util import (
 
 from app.models import (
     FactBilling,
+    FactBillingSmsCumulative,
     Service,
     KEY_TYPE_TEST,
     LETTER_TYPE,
@@ -33,9 +34,22 @@ from app.utils import get_local_timezone_midnight_in_utc
 def fetch_sms_free_allowance_remainder(start_date):
     # ASSUMPTION: AnnualBilling has been populated for year.
     billing_year = get_financial_year_for_datetime(start_date)
-    start_of_year = date(billing_year, 4, 1)
 
-    billable_units = func.coalesce(func.sum(FactBilling.billable_units * FactBilling.rate_multiplier), 0)
+    # the units used in the year before start_date are the cumulative units of the last day with sms billing
+    used_before_start = db.session.query(
+        FactBillingSmsCumulative.service_id,
+        FactBillingSmsCumulative.billable_units,
+    ).filter(
+        FactBillingSmsCumulative.financial_year_start == billing_year,
+        FactBillingSmsCumulative.bst_date < start_date,
+    ).distinct(
+        FactBillingSmsCumulative.service_id
+    ).order_by(
+        FactBillingSmsCumulative.service_id,
+        desc(FactBillingSmsCumulative.bst_date),
+    ).subquery()
+
+    billable_units = func.coalesce(used_before_start.c.billable_units, 0)
 
     query = db.session.query(
         AnnualBilling.service_id.label("service_id"),
@@ -43,23 +57,55 @@ def fetch_sms_free_allowance_remainder(start_date):
         billable_units.label('billable_units'),
         func.greatest((AnnualBilling.free_sms_fragment_limit - billable_units).cast(Integer), 0).label('sms_remainder')
     ).outerjoin(
-        # if there are no ft_billing rows for a service we still want to return the annual billing so we can use the
+        # if a service has not sent any sms this year we still want to return the annual billing so we can use the
         # free_sms_fragment_limit)
-        FactBilling, and_(
-            AnnualBilling.service_id == FactBilling.service_id,
-            FactBilling.bst_date >= start_of_year,
-            FactBilling.bst_date < start_date,
-            FactBilling.notification_type == SMS_TYPE,
-        )
+        used_before_start, AnnualBilling.service_id == used_before_start.c.service_id
     ).filter(
         AnnualBilling.financial_year_start == billing_year,
-    ).group_by(
-        AnnualBilling.service_id,
-        AnnualBilling.free_sms_fragment_limit,
     )
     return query
 
 
+def update_fact_billing_sms_cumulative_for_year(process_day):
+    """
+    Rebuilds ft_billing_sms_cumulative for the financial year of process_day from ft_billing.
+    """
+    billing_year = get_financial_year_for_datetime(process_day)
+    start_of_year = date(billing_year, 4, 1)
+    start_of_next_year = date(billing_year + 1, 4, 1)
+
+    table = FactBillingSmsCumulative.__table__
+    daily_units = func.sum(FactBilling.billable_units * FactBilling.rate_multiplier)
+    cumulative = db.session.query(
+        FactBilling.service_id,
+        FactBilling.bst_date,
+        literal(billing_year, Integer),
+        func.sum(daily_units).over(partition_by=FactBilling.service_id, order_by=FactBilling.bst_date),
+        literal(datetime.utcnow(), DateTime),
+    ).filter(
+        FactBilling.bst_date >= start_of_year,
+        FactBilling.bst_date < start_of_next_year,
+        FactBilling.notification_type == SMS_TYPE,
+    ).group_by(
+        FactBilling.service_id,
+        FactBilling.bst_date,
+    )
+
+    FactBillingSmsCumulative.query.filter(
+        FactBillingSmsCumulative.financial_year_start == billing_year
+    ).delete()
+    stmt = insert(table).from_select(
+        ['service_id', 'bst_date', 'financial_year_start', 'billable_units', 'created_at'], cumulative
+    )
+    # the nightly task rebuilds the year once for each day it processes, possibly at the same time
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['service_id', 'bst_date'],
+        set_={'billable_units': stmt.excluded.billable_units, 'updated_at': datetime.utcnow()}
+    )
+    db.session.execute(stmt)
+    db.session.commit()
+
+
 def fetch_sms_billing_for_all_services(start_date, end_date):
 
     # ASSUMPTION: AnnualBilling has been populated for year.
@@ -268,16 +314,10 @@ def fetch_billing_totals_for_year(service_id, year):
 
 
 def fetch_monthly_billing_for_year(service_id, year):
+    """
+    Reads ft_billing only: today's billing is kept up to date by the create-billing-for-today task.
+    """
     year_start_date, year_end_date = get_financial_year(year)
-    utcnow = datetime.utcnow()
-    today = convert_utc_to_local_timezone(utcnow)
-    # if year end date is less than today, we are calculating for data in the past and have no need for deltas.
-    if year_end_date >= today:
-        yesterday = today - timedelta(days=1)
-        for day in [yesterday, today]:
-            data = fetch_billing_data_for_day(process_day=day, service_id=service_id)
-            for d in data:
-                update_fact_billing(data=d, process_day=day)
 
     email_and_letters = db.session.query(
         func.date_trunc('month', FactBilling.bst_date).cast(Date).label("month"),
@@ -8,10 +8,12 @@ from sqlalchemy.sql.expression import literal, extract
 from sqlalchemy.types import DateTime, Integer
 
 from app import db
+from app.dao.notification_status_counts_dao import get_local_today, notification_status_counts
 from app.models import (
     ApiKey,
     EMAIL_TYPE,
     FactNotificationStatus,
+    FactNotificationStatusMonthly,
     KEY_TYPE_NORMAL,
     KEY_TYPE_TEST,
     LETTER_TYPE,
@@ -30,11 +32,7 @@ from app.models import (
     SMS_TYPE,
     Template,
 )
-from app.utils import (
-    get_local_timezone_midnight_in_utc,
-    midnight_n_days_ago,
-    get_local_timezone_month_from_utc_column, get_local_timezone_midnight
-)
+from app.utils import midnight_n_days_ago
 
 
 def fetch_notification_status_for_day(process_day, service_id=None):
@@ -120,46 +118,92 @@ def update_fact_notification_status(data, process_day):
         db.session.commit()
 
 
-def fetch_notification_status_for_service_by_month(start_date, end_date, service_id):
-    return db.session.query(
-        func.date_trunc('month', FactNotificationStatus.bst_date).label('month'),
+def update_fact_notification_status_for_month(process_day):
+    """
+    Rebuilds ft_notification_status_monthly for the month of process_day from ft_notification_status.
+    """
+    month = process_day.replace(day=1)
+    next_month = (month + timedelta(days=32)).replace(day=1)
+
+    table = FactNotificationStatusMonthly.__table__
+    columns = ['month', 'template_id', 'service_id', 'notification_type', 'key_type', 'notification_status']
+    totals = db.session.query(
+        literal(month, Date),
+        FactNotificationStatus.template_id,
+        FactNotificationStatus.service_id,
         FactNotificationStatus.notification_type,
+        FactNotificationStatus.key_type,
         FactNotificationStatus.notification_status,
-        func.sum(FactNotificationStatus.notification_count).label('count')
+        func.sum(FactNotificationStatus.notification_count),
+        literal(datetime.utcnow(), DateTime),
     ).filter(
-        FactNotificationStatus.service_id == service_id,
-        FactNotificationStatus.bst_date >= start_date.strftime("%Y-%m-%d"),
-        # This works only for timezones to the west of GMT
-        FactNotificationStatus.bst_date < end_date.strftime("%Y-%m-%d"),
-        FactNotificationStatus.key_type != KEY_TYPE_TEST
+        FactNotificationStatus.bst_date >= month,
+        FactNotificationStatus.bst_date < next_month,
     ).group_by(
-        func.date_trunc('month', FactNotificationStatus.bst_date).label('month'),
+        FactNotificationStatus.template_id,
+        FactNotificationStatus.service_id,
         FactNotificationStatus.notification_type,
-        FactNotificationStatus.notification_status
+        FactNotificationStatus.key_type,
+        FactNotificationStatus.notification_status,
+    )
+
+    FactNotificationStatusMonthly.query.filter(
+        FactNotificationStatusMonthly.month == month
+    ).delete()
+    stmt = insert(table).from_select(columns + ['notification_count', 'created_at'], totals)
+    # the nightly task rebuilds the month once for each day it processes, possibly at the same time
+    stmt = stmt.on_conflict_do_update(
+        index_elements=columns,
+        set_={'notification_count': stmt.excluded.notification_count, 'updated_at': datetime.utcnow()}
+    )
+    db.session.execute(stmt)
+    db.session.commit()
+
+
+def fetch_notification_status_for_service_by_month(start_date, end_date, service_id):
+    month = FactNotificationStatusMonthly.month.cast(DateTime)
+    return db.session.query(
+        month.label('month'),
+        FactNotificationStatusMonthly.notification_type,
+        FactNotificationStatusMonthly.notification_status,
+        func.sum(FactNotificationStatusMonthly.notification_count).label('count')
+    ).filter(
+        FactNotificationStatusMonthly.service_id == service_id,
+        FactNotificationStatusMonthly.month >= start_date.replace(day=1).strftime("%Y-%m-%d"),
+        # This works only for timezones to the west of GMT
+        FactNotificationStatusMonthly.month < end_date.strftime("%Y-%m-%d"),
+        FactNotificationStatusMonthly.key_type != KEY_TYPE_TEST
+    ).group_by(
+        month,
+        FactNotificationStatusMonthly.notification_type,
+        FactNotificationStatusMonthly.notification_status
     ).all()
 
 
 def fetch_notification_status_for_service_for_day(bst_day, service_id):
+    """
+    The current month layer on top of fetch_notification_status_for_service_by_month, from the notification status
+    counts, which are kept for today and yesterday.
+    """
+    status_counts = notification_status_counts()
     return db.session.query(
         # return current month as a datetime so the data has the same shape as the ft_notification_status query
         literal(bst_day.replace(day=1), type_=DateTime).label('month'),
-        Notification.notification_type,
-        Notification.status.label('notification_status'),
-        func.count().label('count')
+        status_counts.notification_type,
+        status_counts.notification_status,
+        func.sum(status_counts.notification_count).label('count')
     ).filter(
-        Notification.created_at >= get_local_timezone_midnight_in_utc(bst_day),
-        Notification.created_at < get_local_timezone_midnight_in_utc(bst_day + timedelta(days=1)),
-        Notification.service_id == service_id,
-        Notification.key_type != KEY_TYPE_TEST
+        status_counts.bst_date == bst_day.date(),
+        status_counts.service_id == service_id,
+        status_counts.key_type != KEY_TYPE_TEST
     ).group_by(
-        Notification.notification_type,
-        Notification.status
+        status_counts.notification_type,
+        status_counts.notification_status
     ).all()
 
 
 def fetch_notification_status_for_service_for_today_and_7_previous_days(service_id, by_template=False, limit_days=7):
     start_date = midnight_n_days_ago(limit_days)
-    now = datetime.now()
     stats_for_7_days = db.session.query(
         FactNotificationStatus.notification_type.label('notification_type'),
         FactNotificationStatus.notification_status.label('status'),
@@ -171,19 +215,16 @@ def fetch_notification_status_for_service_for_today_and_7_previous_days(service_
         FactNotificationStatus.key_type != KEY_TYPE_TEST
     )
 
+    status_counts = notification_status_counts()
     stats_for_today = db.session.query(
-        Notification.notification_type.cast(db.Text),
-        Notification.status,
-        *([Notification.template_id] if by_template else []),
-        func.count().label('count')
+        status_counts.notification_type,
+        status_counts.notification_status,
+        *([status_counts.template_id] if by_template else []),
+        status_counts.notification_count
     ).filter(
-        Notification.created_at >= get_local_timezone_midnight(now),
-        Notification.service_id == service_id,
-        Notification.key_type != KEY_TYPE_TEST
-    ).group_by(
-        Notification.notification_type,
-        *([Notification.template_id] if by_template else []),
-        Notification.status
+        status_counts.bst_date == get_local_today(),
+        status_counts.service_id == service_id,
+        status_counts.key_type != KEY_TYPE_TEST
     )
 
     all_stats_table = stats_for_7_days.union_all(stats_for_today).subquery()
@@ -361,19 +402,15 @@ def fetch_notification_status_totals_for_all_services(start_date, end_date):
         FactNotificationStatus.notification_status,
         FactNotificationStatus.key_type,
     )
-    today = get_local_timezone_midnight_in_utc(datetime.utcnow())
     if start_date <= datetime.utcnow().date() <= end_date:
+        status_counts = notification_status_counts()
         stats_for_today = db.session.query(
-            Notification.notification_type.cast(db.Text).label('notification_type'),
-            Notification.status,
-            Notification.key_type,
-            func.count().label('count')
+            status_counts.notification_type,
+            status_counts.notification_status,
+            status_counts.key_type,
+            status_counts.notification_count
         ).filter(
-            Notification.created_at >= today
-        ).group_by(
-            Notification.notification_type.cast(db.Text),
-            Notification.status,
-            Notification.key_type,
+            status_counts.bst_date == get_local_today()
         )
         all_stats_table = stats.union_all(stats_for_today).subquery()
         query = db.session.query(
@@ -406,6 +443,19 @@ def fetch_notification_statuses_for_job(job_id):
     ).all()
 
 
+def fetch_notification_statuses_for_jobs(job_ids):
+    return db.session.query(
+        FactNotificationStatus.job_id,
+        FactNotificationStatus.notification_status.label('status'),
+        func.sum(FactNotificationStatus.notification_count).label('count'),
+    ).filter(
+        FactNotificationStatus.job_id.in_(job_ids),
+    ).group_by(
+        FactNotificationStatus.job_id,
+        FactNotificationStatus.notification_status
+    ).all()
+
+
 def fetch_stats_for_all_services_by_date_range(start_date, end_date, include_from_test_key=True):
     stats = db.session.query(
         FactNotificationStatus.service_id.label('service_id'),
@@ -438,21 +488,21 @@ def fetch_stats_for_all_services_by_date_range(start_date, end_date, include_fro
         stats = stats.filter(FactNotificationStatus.key_type != KEY_TYPE_TEST)
 
     if start_date <= datetime.utcnow().date() <= end_date:
-        today = get_local_timezone_midnight_in_utc(datetime.utcnow())
+        status_counts = notification_status_counts()
         subquery = db.session.query(
-            Notification.notification_type.cast(db.Text).label('notification_type'),
-            Notification.status.label('status'),
-            Notification.service_id.label('service_id'),
-            func.count(Notification.id).label('count')
+            status_counts.notification_type.label('notification_type'),
+            status_counts.notification_status.label('status'),
+            status_counts.service_id.label('service_id'),
+            func.sum(status_counts.notification_count).label('count')
         ).filter(
-            Notification.created_at >= today
+            status_counts.bst_date == get_local_today()
         ).group_by(
-            Notification.notification_type,
-            Notification.status,
-            Notification.service_id
+            status_counts.notification_type,
+            status_counts.notification_status,
+            status_counts.service_id
         )
         if not include_from_test_key:
-            subquery = subquery.filter(Notification.key_type != KEY_TYPE_TEST)
+            subquery = subquery.filter(status_counts.key_type != KEY_TYPE_TEST)
         subquery = subquery.subquery()
 
         stats_for_today = db.session.query(
@@ -503,60 +553,50 @@ def fetch_stats_for_all_services_by_date_range(start_date, end_date, include_fro
 def fetch_monthly_template_usage_for_service(start_date, end_date, service_id):
     # services_dao.replaces dao_fetch_monthly_historical_usage_by_template_for_service
     stats = db.session.query(
-        FactNotificationStatus.template_id.label('template_id'),
+        FactNotificationStatusMonthly.template_id.label('template_id'),
         Template.name.label('name'),
         Template.template_type.label('template_type'),
         Template.is_precompiled_letter.label('is_precompiled_letter'),
-        extract('month', FactNotificationStatus.bst_date).label('month'),
-        extract('year', FactNotificationStatus.bst_date).label('year'),
-        func.sum(FactNotificationStatus.notification_count).label('count')
+        extract('month', FactNotificationStatusMonthly.month).label('month'),
+        extract('year', FactNotificationStatusMonthly.month).label('year'),
+        func.sum(FactNotificationStatusMonthly.notification_count).label('count')
     ).join(
-        Template, FactNotificationStatus.template_id == Template.id
+        Template, FactNotificationStatusMonthly.template_id == Template.id
     ).filter(
-        FactNotificationStatus.service_id == service_id,
-        FactNotificationStatus.bst_date >= start_date.strftime("%Y-%m-%d"),
+        FactNotificationStatusMonthly.service_id == service_id,
+        FactNotificationStatusMonthly.month >= start_date.replace(day=1).strftime("%Y-%m-%d"),
         # This works only for timezones to the west of GMT
-        FactNotificationStatus.bst_date < end_date.strftime("%Y-%m-%d"),
-        FactNotificationStatus.key_type != KEY_TYPE_TEST,
-        FactNotificationStatus.notification_status != NOTIFICATION_CANCELLED,
+        FactNotificationStatusMonthly.month < end_date.strftime("%Y-%m-%d"),
+        FactNotificationStatusMonthly.key_type != KEY_TYPE_TEST,
+        FactNotificationStatusMonthly.notification_status != NOTIFICATION_CANCELLED,
     ).group_by(
-        FactNotificationStatus.template_id,
+        FactNotificationStatusMonthly.template_id,
         Template.name,
         Template.template_type,
         Template.is_precompiled_letter,
-        extract('month', FactNotificationStatus.bst_date).label('month'),
-        extract('year', FactNotificationStatus.bst_date).label('year'),
+        FactNotificationStatusMonthly.month,
     ).order_by(
-        extract('year', FactNotificationStatus.bst_date),
-        extract('month', FactNotificationStatus.bst_date),
+        FactNotificationStatusMonthly.month,
         Template.name
     )
 
     if start_date <= datetime.utcnow() <= end_date:
-        today = get_local_timezone_midnight_in_utc(datetime.utcnow())
-        month = get_local_timezone_month_from_utc_column(Notification.created_at)
-
+        status_counts = notification_status_counts()
         stats_for_today = db.session.query(
-            Notification.template_id.label('template_id'),
+            status_counts.template_id.label('template_id'),
             Template.name.label('name'),
             Template.template_type.label('template_type'),
             Template.is_precompiled_letter.label('is_precompiled_letter'),
-            extract('month', month).label('month'),
-            extract('year', month).label('year'),
-            func.count().label('count')
+            extract('month', status_counts.bst_date).label('month'),
+            extract('year', status_counts.bst_date).label('year'),
+            status_counts.notification_count.label('count')
         ).join(
-            Template, Notification.template_id == Template.id,
+            Template, status_counts.template_id == Template.id,
         ).filter(
-            Notification.created_at >= today,
-            Notification.service_id == service_id,
-            Notification.key_type != KEY_TYPE_TEST,
-            Notification.status != NOTIFICATION_CANCELLED
-        ).group_by(
-            Notification.template_id,
-            Template.hidden,
-            Template.name,
-            Template.template_type,
-            month
+            status_counts.bst_date == get_local_today(),
+            status_counts.service_id == service_id,
+            status_counts.key_type != KEY_TYPE_TEST,
+            status_counts.notification_status != NOTIFICATION_CANCELLED
         )
 
         all_stats_table = stats.union_all(stats_for_today).subquery()
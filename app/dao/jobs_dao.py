@@ -43,6 +43,24 @@ def dao_get_notification_outcomes_for_job(service_id, job_id):
     ).all()
 
 
+@statsd(namespace="dao")
+def dao_get_notification_outcomes_for_jobs(service_id, job_ids):
+    """
+    The outcomes of dao_get_notification_outcomes_for_job for each of job_ids, in a single query.
+    """
+    return db.session.query(
+        Notification.job_id,
+        func.count(Notification.status).label('count'),
+        Notification.status
+    ).filter(
+        Notification.service_id == service_id,
+        Notification.job_id.in_(job_ids)
+    ).group_by(
+        Notification.job_id,
+        Notification.status
+    ).all()
+
+
 def dao_get_job_by_service_id_and_job_id(service_id, job_id):
     return Job.query.filter_by(service_id=service_id, id=job_id).one()
 
@@ -75,22 +93,24 @@ def dao_archive_job(job):
     db.session.commit()
 
 
-def dao_set_scheduled_jobs_to_pending():
+def dao_set_scheduled_jobs_to_pending(limit=None):
     """
-    Sets all past scheduled jobs to pending, and then returns them for further processing.
+    Sets past scheduled jobs to pending, and then returns them for further processing. At most `limit` jobs
+    are claimed per call, earliest first.
 
-    this is used in the run_scheduled_jobs task, so we put a FOR UPDATE lock on the job table for the duration of
-    the transaction so that if the task is run more than once concurrently, one task will block the other select
-    from completing until it commits.
+    this is used in the run_scheduled_jobs task, so we put a FOR UPDATE SKIP LOCKED lock on the job rows for
+    the duration of the transaction. If the task is run more than once concurrently, each run claims different
+    jobs rather than blocking on (or picking up again) the jobs another run is already moving to pending.
     """
-    jobs = Job.query \
+    query = Job.query \
         .filter(
             Job.job_status == JOB_STATUS_SCHEDULED,
             Job.scheduled_for < datetime.utcnow()
         ) \
-        .order_by(asc(Job.scheduled_for)) \
-        .with_for_update() \
-        .all()
+        .order_by(asc(Job.scheduled_for))
+    if limit:
+        query = query.limit(limit)
+    jobs = query.with_for_update(skip_locked=True).all()
 
     for job in jobs:
         job.job_status = JOB_STATUS_PENDING
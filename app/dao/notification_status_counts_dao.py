@@ -0,0 +1,219 @@
+"""
+Counts of notifications per service, template, notification type, key type, status and local day.
+
+The changes to the counts are recorded in the same transaction as the notifications, from a session
+`after_flush` listener, so the statistics for today are a lookup by day and service instead of a count over
+the notifications table. They are only ever inserted, as notification_status_count_deltas, so that concurrent
+sends of the same template don't queue up on the lock of a shared count row; the
+'fold-notification-status-count-deltas' task adds them to notification_status_counts every minute and
+`notification_status_counts()` reads both, so the counts are exact whether or not they have been folded yet.
+
+Changes that do not go through the session, such as `Query.update` and `Query.delete`, are not counted:
+`reconcile_notification_status_counts` recounts a day from notifications and the
+'reconcile-notification-status-counts' task runs it for today and yesterday.
+"""
+from collections import Counter
+from datetime import datetime, timedelta
+
+from notifications_utils.timezones import convert_utc_to_local_timezone
+from sqlalchemy import DateTime, Integer, event, func, inspect, literal, null, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import aliased
+
+from app import db
+from app.dao.dao_utils import transactional
+from app.models import Notification, NotificationStatusCount, NotificationStatusCountDelta
+from app.utils import get_local_timezone_midnight_in_utc
+
+COUNT_KEY = ['bst_date', 'service_id', 'template_id', 'notification_type', 'key_type', 'notification_status']
+
+
+def get_local_today():
+    return convert_utc_to_local_timezone(datetime.utcnow()).date()
+
+
+def count_notification_statuses(session):
+    """
+    Keeps notification_status_counts up to date with the notifications flushed by session, a session,
+    sessionmaker or scoped_session such as db.session.
+    """
+    if not event.contains(session, 'after_flush', _count_flushed_notifications):
+        event.listen(session, 'after_flush', _count_flushed_notifications)
+
+
+def _count_key(notification, status):
+    return (
+        convert_utc_to_local_timezone(notification.created_at).date(),
+        str(notification.service_id),
+        str(notification.template_id),
+        notification.notification_type,
+        notification.key_type,
+        status,
+    )
+
+
+def _status_changes(session):
+    changes = Counter()
+
+    for notification in session.new:
+        if isinstance(notification, Notification) and notification.status:
+            changes[_count_key(notification, notification.status)] += 1
+
+    for notification in session.dirty:
+        if isinstance(notification, Notification):
+            # the previous status is always loaded, see Notification.status
+            history = inspect(notification).attrs.status.history
+            for status in history.deleted:
+                if status:
+                    changes[_count_key(notification, status)] -= 1
+            for status in history.added:
+                if status:
+                    changes[_count_key(notification, status)] += 1
+
+    for notification in session.deleted:
+        if isinstance(notification, Notification):
+            history = inspect(notification).attrs.status.history
+            for status in history.deleted or history.unchanged:
+                if status:
+                    changes[_count_key(notification, status)] -= 1
+
+    return changes
+
+
+def _count_flushed_notifications(session, flush_context):
+    changes = _status_changes(session)
+    rows = [
+        dict(zip(COUNT_KEY, key), notification_count=count, created_at=datetime.utcnow())
+        for key, count in changes.items()
+        if count
+    ]
+    if not rows:
+        return
+
+    session.connection().execute(NotificationStatusCountDelta.__table__.insert().values(rows))
+
+
+def notification_status_counts():
+    """
+    An alias of NotificationStatusCount for the counts with the deltas not yet folded in added, one row per
+    count as in notification_status_counts. Filters on the day and service apply to both tables.
+    """
+    counts = NotificationStatusCount.__table__
+    deltas = NotificationStatusCountDelta.__table__
+    both = select(
+        [counts.c[column] for column in COUNT_KEY]
+        + [counts.c.notification_count, counts.c.created_at, counts.c.updated_at]
+    ).union_all(
+        select(
+            [deltas.c[column] for column in COUNT_KEY]
+            + [deltas.c.notification_count, deltas.c.created_at, null().cast(DateTime).label('updated_at')]
+        )
+    ).alias()
+
+    summed = select(
+        [both.c[column] for column in COUNT_KEY]
+        + [
+            func.sum(both.c.notification_count).cast(Integer).label('notification_count'),
+            func.min(both.c.created_at).label('created_at'),
+            func.max(both.c.updated_at).label('updated_at'),
+        ]
+    ).group_by(
+        *[both.c[column] for column in COUNT_KEY]
+    ).alias('status_counts')
+    return aliased(NotificationStatusCount, summed, adapt_on_names=True)
+
+
+def fold_notification_status_count_deltas():
+    """
+    Adds the deltas to notification_status_counts, in a single statement so that readers see every delta exactly
+    once and concurrent folds never fold the same delta twice. Returns how many deltas were folded.
+    """
+    key = ', '.join(COUNT_KEY)
+    result = db.session.execute(text("""
+        WITH folded AS (
+            DELETE FROM notification_status_count_deltas
+            RETURNING {key}, notification_count
+        ), summed AS (
+            INSERT INTO notification_status_counts ({key}, notification_count, created_at)
+            SELECT {key}, sum(notification_count), :now
+            FROM folded
+            GROUP BY {key}
+            ON CONFLICT ({key}) DO UPDATE SET
+                notification_count = notification_status_counts.notification_count + excluded.notification_count,
+                updated_at = :now
+        )
+        SELECT count(*) FROM folded
+    """.format(key=key)), {'now': datetime.utcnow()})
+    folded = result.scalar()
+    db.session.commit()
+    return folded
+
+
+@transactional
+def reconcile_notification_status_counts(process_day):
+    """
+    Replaces the counts for process_day, a local date, with a count of the notifications created that day.
+    """
+    start_date = get_local_timezone_midnight_in_utc(process_day)
+    end_date = get_local_timezone_midnight_in_utc(process_day + timedelta(days=1))
+
+    NotificationStatusCount.query.filter(
+        NotificationStatusCount.bst_date == process_day
+    ).delete(synchronize_session=False)
+    NotificationStatusCountDelta.query.filter(
+        NotificationStatusCountDelta.bst_date == process_day
+    ).delete(synchronize_session=False)
+
+    counts = db.session.query(
+        literal(process_day, db.Date),
+        Notification.service_id,
+        Notification.template_id,
+        Notification.notification_type.cast(db.Text),
+        Notification.key_type,
+        Notification.status,
+        func.count(),
+        literal(datetime.utcnow(), db.DateTime),
+    ).filter(
+        Notification.created_at >= start_date,
+        Notification.created_at < end_date,
+        Notification.status.isnot(None),
+    ).group_by(
+        Notification.service_id,
+        Notification.template_id,
+        Notification.notification_type,
+        Notification.key_type,
+        Notification.status,
+    )
+
+    table = NotificationStatusCount.__table__
+    db.session.execute(
+        insert(table).from_select(COUNT_KEY + ['notification_count', 'created_at'], counts)
+    )
+
+
+@transactional
+def delete_notification_status_counts_older_than(day):
+    deleted_deltas = NotificationStatusCountDelta.query.filter(
+        NotificationStatusCountDelta.bst_date < day
+    ).delete(synchronize_session=False)
+    return deleted_deltas + NotificationStatusCount.query.filter(
+        NotificationStatusCount.bst_date < day
+    ).delete(synchronize_session=False)
+
+
+def get_service_ids_with_notifications_on(day):
+    status_counts = notification_status_counts()
+    return [
+        row.service_id for row in db.session.query(
+            status_counts.service_id
+        ).filter(
+            status_counts.bst_date == day
+        ).distinct()
+    ]
+
+
+def todays_notification_status_counts():
+    status_counts = notification_status_counts()
+    return db.session.query(status_counts).filter(
+        status_counts.bst_date == get_local_today()
+    )
@@ -1,4 +1,3 @@
-import functools
 import string
 from datetime import (
     datetime,
@@ -10,12 +9,14 @@ from flask import current_app
 from notifications_utils.international_billing_rates import INTERNATIONAL_BILLING_RATES
 from notifications_utils.recipients import (
     validate_and_format_email_address,
+    validate_and_format_phone_number,
     InvalidEmailError,
+    InvalidPhoneError,
     try_validate_and_format_phone_number
 )
 from notifications_utils.statsd_decorators import statsd
 from notifications_utils.timezones import convert_local_timezone_to_utc, convert_utc_to_local_timezone
-from sqlalchemy import (desc, func, asc)
+from sqlalchemy import (and_, desc, false, func, asc, tuple_)
 from sqlalchemy.orm import joinedload
 from sqlalchemy.orm.exc import NoResultFound
 from sqlalchemy.sql import functions
@@ -25,13 +26,17 @@ from werkzeug.datastructures import MultiDict
 
 from app import db, create_uuid
 from app.aws.s3 import remove_s3_object, get_s3_bucket_objects
-from app.dao.dao_utils import transactional
+from app.dao import dao_utils
+from app.dao.dao_utils import keyset_after, keyset_paginate, transactional
 from app.errors import InvalidRequest
 from app.letters.utils import LETTERS_PDF_FILE_LOCATION_STRUCTURE
 from app.models import (
+    Job,
     Notification,
     NotificationHistory,
     ScheduledNotification,
+    TemplateHistory,
+    User,
     KEY_TYPE_TEST,
     LETTER_TYPE,
     NOTIFICATION_CREATED,
@@ -51,6 +56,9 @@ from app.models import (
 from app.utils import get_local_timezone_midnight_in_utc
 from app.utils import midnight_n_days_ago, escape_special_characters
 
+# orders notifications uniquely, for keyset pagination
+NOTIFICATIONS_KEYSET = [Notification.created_at, Notification.id]
+
 
 @statsd(namespace="dao")
 def dao_get_last_template_usage(template_id, template_type, service_id):
@@ -217,8 +225,15 @@ def get_notifications_for_service(
         include_from_test_key=False,
         older_than=None,
         client_reference=None,
-        include_one_off=True
+        include_one_off=True,
+        approximate_count=False
 ):
+    """
+    Notifications of the service, most recent first. With older_than, the id of a notification, the page is the
+    page_size notifications that follow it, ordered by (created_at, id): a keyset page that costs the same however
+    far back it is, whatever page says, and isn't counted. Otherwise the page is found with an OFFSET and counted
+    if count_pages is set, with the query planner's estimate if approximate_count is set.
+    """
     if page_size is None:
         page_size = current_app.config['PAGE_SIZE']
 
@@ -228,9 +243,40 @@ def get_notifications_for_service(
         filters.append(Notification.created_at >= midnight_n_days_ago(limit_days))
 
     if older_than is not None:
-        older_than_created_at = db.session.query(
-            Notification.created_at).filter(Notification.id == older_than).as_scalar()
-        filters.append(Notification.created_at < older_than_created_at)
+        page = 1
+        count_pages = False
+        older_than_key = db.session.query(
+            Notification.created_at, Notification.id
+        ).filter(Notification.id == older_than).first()
+        if older_than_key is None:
+            filters.append(false())
+        else:
+            filters.append(keyset_after(NOTIFICATIONS_KEYSET, older_than_key, descending=True))
+
+    filters.extend(_notifications_for_service_filters(
+        include_jobs, include_one_off, key_type, include_from_test_key, client_reference
+    ))
+
+    query = Notification.query.filter(*filters)
+    query = _filter_query(query, filter_dict)
+    total = dao_utils.approximate_count(query) if count_pages and approximate_count else None
+    if personalisation:
+        query = query.options(
+            joinedload('template')
+        )
+
+    pagination = query.order_by(*[desc(column) for column in NOTIFICATIONS_KEYSET]).paginate(
+        page=page,
+        per_page=page_size,
+        count=count_pages and not approximate_count
+    )
+    if total is not None:
+        pagination.total = total
+    return pagination
+
+
+def _notifications_for_service_filters(include_jobs, include_one_off, key_type, include_from_test_key, client_reference):
+    filters = []
 
     if not include_jobs:
         filters.append(Notification.job_id == None)  # noqa
@@ -246,18 +292,58 @@ def get_notifications_for_service(
     if client_reference is not None:
         filters.append(Notification.client_reference == client_reference)
 
-    query = Notification.query.filter(*filters)
-    query = _filter_query(query, filter_dict)
-    if personalisation:
-        query = query.options(
-            joinedload('template')
+    return filters
+
+
+@statsd(namespace="dao")
+def dao_stream_notifications_for_service_for_csv(
+        service_id,
+        filter_dict=None,
+        limit_days=None,
+        include_jobs=True,
+        include_from_test_key=False,
+        include_one_off=True,
+        chunk_size=10000
+):
+    """
+    The columns of Notification.serialize_for_csv for the notifications of the service, most recent first, as plain
+    rows read chunk_size at a time from a server-side cursor. No notifications are loaded into the session, so the
+    memory used doesn't grow with the number of notifications.
+    """
+    filters = [Notification.service_id == service_id]
+
+    if limit_days is not None:
+        filters.append(Notification.created_at >= midnight_n_days_ago(limit_days))
+
+    filters.extend(_notifications_for_service_filters(
+        include_jobs, include_one_off, None, include_from_test_key, None
+    ))
+
+    query = db.session.query(
+        Notification.job_row_number,
+        Notification.to.label('recipient'),
+        TemplateHistory.name.label('template_name'),
+        TemplateHistory.template_type,
+        Job.original_file_name.label('job_name'),
+        Notification.status,
+        Notification.created_at,
+        User.name.label('created_by_name'),
+        User.email_address.label('created_by_email_address'),
+    ).join(
+        TemplateHistory, and_(
+            TemplateHistory.id == Notification.template_id,
+            TemplateHistory.version == Notification.template_version
         )
+    ).outerjoin(
+        Job, Job.id == Notification.job_id
+    ).outerjoin(
+        User, User.id == Notification.created_by_id
+    ).filter(*filters)
+    query = _filter_query(query, filter_dict)
 
-    return query.order_by(desc(Notification.created_at)).paginate(
-        page=page,
-        per_page=page_size,
-        count=count_pages
-    )
+    return query.order_by(
+        *[desc(column) for column in NOTIFICATIONS_KEYSET]
+    ).execution_options(stream_results=True).yield_per(chunk_size)
 
 
 def _filter_query(query, filter_dict=None):
@@ -431,24 +517,44 @@ def dao_delete_notifications_by_id(notification_id):
     ).delete(synchronize_session='fetch')
 
 
-def _timeout_notifications(current_statuses, new_status, timeout_start, updated_at):
-    notifications = Notification.query.filter(
-        Notification.created_at < timeout_start,
-        Notification.status.in_(current_statuses),
-        Notification.notification_type != LETTER_TYPE
-    ).all()
-    Notification.query.filter(
+def _timeout_notifications(current_statuses, new_status, timeout_start, updated_at, chunk_size, after=None):
+    """
+    Time out the next chunk of notifications in (created_at, id) order with a single UPDATE ... RETURNING.
+    Rows locked by another transaction are skipped rather than waited on.
+    """
+    notifications = Notification.__table__
+    to_timeout = db.session.query(Notification.id).filter(
         Notification.created_at < timeout_start,
         Notification.status.in_(current_statuses),
         Notification.notification_type != LETTER_TYPE
-    ).update(
-        {'status': new_status, 'updated_at': updated_at},
-        synchronize_session=False
     )
-    return notifications
+    if after:
+        to_timeout = to_timeout.filter(tuple_(Notification.created_at, Notification.id) > tuple_(*after))
+    to_timeout = to_timeout.order_by(
+        Notification.created_at, Notification.id
+    ).limit(chunk_size).with_for_update(skip_locked=True)
+
+    return db.session.execute(
+        notifications.update().where(
+            notifications.c.id.in_(to_timeout)
+        ).values(
+            status=new_status,
+            updated_at=updated_at
+        ).returning(
+            notifications.c.id,
+            notifications.c.service_id,
+            notifications.c.client_reference,
+            notifications.c.to,
+            notifications.c.status,
+            notifications.c.notification_type,
+            notifications.c.created_at,
+            notifications.c.updated_at,
+            notifications.c.sent_at,
+        )
+    ).fetchall()
 
 
-def dao_timeout_notifications(timeout_period_in_seconds):
+def dao_timeout_notifications_in_chunks(timeout_period_in_seconds, chunk_size):
     """
     Timeout SMS and email notifications by the following rules:
 
@@ -460,21 +566,33 @@ def dao_timeout_notifications(timeout_period_in_seconds):
         pending -> temporary-failure
 
     Letter notifications are not timed out
+
+    Yields (new_status, rows) for each chunk of at most chunk_size notifications, committing after
+    every chunk so a large backlog of stuck notifications is never held in memory or in a single transaction.
     """
     timeout_start = datetime.utcnow() - timedelta(seconds=timeout_period_in_seconds)
     updated_at = datetime.utcnow()
-    timeout = functools.partial(_timeout_notifications, timeout_start=timeout_start, updated_at=updated_at)
-
-    # Notifications still in created status are marked with a technical-failure:
-    technical_failure_notifications = timeout([NOTIFICATION_CREATED], NOTIFICATION_TECHNICAL_FAILURE)
 
-    # Notifications still in sending or pending status are marked with a temporary-failure:
-    temporary_failure_notifications = timeout([NOTIFICATION_SENDING, NOTIFICATION_PENDING],
-                                              NOTIFICATION_TEMPORARY_FAILURE)
+    for current_statuses, new_status in (
+        # Notifications still in created status are marked with a technical-failure:
+        ([NOTIFICATION_CREATED], NOTIFICATION_TECHNICAL_FAILURE),
+        # Notifications still in sending or pending status are marked with a temporary-failure:
+        ([NOTIFICATION_SENDING, NOTIFICATION_PENDING], NOTIFICATION_TEMPORARY_FAILURE),
+    ):
+        after = None
+        while True:
+            timed_out = _timeout_notifications(
+                current_statuses, new_status, timeout_start, updated_at, chunk_size, after=after
+            )
+            db.session.commit()
+            if not timed_out:
+                break
 
-    db.session.commit()
+            yield new_status, timed_out
 
-    return technical_failure_notifications, temporary_failure_notifications
+            if len(timed_out) < chunk_size:
+                break
+            after = max((row.created_at, row.id) for row in timed_out)
 
 
 def is_delivery_slow_for_provider(
@@ -536,42 +654,76 @@ def dao_update_notifications_by_reference(references, update_dict):
 
 
 @statsd(namespace="dao")
-def dao_get_notifications_by_to_field(service_id, search_term, notification_type=None, statuses=None):
+def dao_get_notifications_by_to_field(
+    service_id, search_term, notification_type=None, statuses=None, page_size=None, older_than=None
+):
+    """
+    The page_size most recent notifications of the service sent to search_term, a full phone number or email
+    address, or sent to recipients containing it. older_than, the id of a notification, gives the next page.
+    Full recipients are matched exactly with the (service_id, normalised_to) index, parts of recipients with the
+    trigram index on normalised_to.
+    """
     if notification_type is None:
         notification_type = guess_notification_type(search_term)
+    if page_size is None:
+        page_size = current_app.config['PAGE_SIZE']
 
-    if notification_type == SMS_TYPE:
-        normalised = try_validate_and_format_phone_number(search_term)
+    exact_recipient = _exact_recipient_filter(search_term, notification_type)
+    if exact_recipient is not None:
+        filters = [exact_recipient]
+    else:
+        normalised = _normalise_search_term(search_term, notification_type)
+        filters = [Notification.normalised_to.like("%{}%".format(normalised))]
 
-        for character in {'(', ')', ' ', '-'}:
-            normalised = normalised.replace(character, '')
+    filters += [
+        Notification.service_id == service_id,
+        Notification.key_type != KEY_TYPE_TEST,
+        Notification.notification_type == notification_type,
+    ]
+    if statuses:
+        filters.append(Notification.status.in_(statuses))
+    if older_than is not None:
+        older_than_key = db.session.query(
+            Notification.created_at, Notification.id
+        ).filter(Notification.id == older_than).first()
+        if older_than_key is None:
+            return []
+        filters.append(keyset_after(NOTIFICATIONS_KEYSET, older_than_key, descending=True))
 
-        normalised = normalised.lstrip('+0')
+    return db.session.query(Notification).filter(*filters).order_by(
+        *[desc(column) for column in NOTIFICATIONS_KEYSET]
+    ).limit(page_size).all()
 
-    elif notification_type == EMAIL_TYPE:
+
+def _exact_recipient_filter(search_term, notification_type):
+    if notification_type == SMS_TYPE:
         try:
-            normalised = validate_and_format_email_address(search_term)
+            phone_number = validate_and_format_phone_number(search_term, international=True)
+        except InvalidPhoneError:
+            return None
+        # older notifications have numbers normalised without the +
+        return Notification.normalised_to.in_([phone_number, phone_number.lstrip('+')])
+    if notification_type == EMAIL_TYPE:
+        try:
+            return Notification.normalised_to == validate_and_format_email_address(search_term)
         except InvalidEmailError:
-            normalised = search_term.lower()
+            return None
+    raise InvalidRequest("Only email and SMS can use search by recipient", 400)
 
-    else:
-        raise InvalidRequest("Only email and SMS can use search by recipient", 400)
 
-    normalised = escape_special_characters(normalised)
+def _normalise_search_term(search_term, notification_type):
+    if notification_type == SMS_TYPE:
+        normalised = try_validate_and_format_phone_number(search_term)
 
-    filters = [
-        Notification.service_id == service_id,
-        Notification.normalised_to.like("%{}%".format(normalised)),
-        Notification.key_type != KEY_TYPE_TEST,
-    ]
+        for character in {'(', ')', ' ', '-'}:
+            normalised = normalised.replace(character, '')
 
-    if statuses:
-        filters.append(Notification.status.in_(statuses))
-    if notification_type:
-        filters.append(Notification.notification_type == notification_type)
+        normalised = normalised.lstrip('+0')
 
-    results = db.session.query(Notification).filter(*filters).order_by(desc(Notification.created_at)).all()
-    return results
+    else:
+        normalised = search_term.lower()
+
+    return escape_special_characters(normalised)
 
 
 @statsd(namespace="dao")
@@ -595,6 +747,23 @@ def dao_get_notification_history_by_reference(reference):
         ).one()
 
 
+def _notifications_for_delivery_query():
+    # the service and its email branding come with the notification rather than by lazy loads
+    return Notification.query.options(
+        joinedload(Notification.service).joinedload(Service.email_branding)
+    )
+
+
+@statsd(namespace="dao")
+def dao_get_notification_for_delivery(notification_id):
+    return _notifications_for_delivery_query().filter(Notification.id == notification_id).first()
+
+
+@statsd(namespace="dao")
+def dao_get_notifications_for_delivery(notification_ids):
+    return _notifications_for_delivery_query().filter(Notification.id.in_(notification_ids)).all()
+
+
 @statsd(namespace="dao")
 def dao_get_notifications_by_references(references):
     return Notification.query.filter(
@@ -608,22 +777,44 @@ def dao_created_scheduled_notification(scheduled_notification):
     db.session.commit()
 
 
-@statsd(namespace="dao")
-def dao_get_scheduled_notifications():
-    notifications = Notification.query.join(
-        ScheduledNotification
+def dao_claim_scheduled_notifications(batch_size):
+    """
+    Claims the next batch of due scheduled notifications as lightweight rows (id, notification_type,
+    key_type, research_mode), earliest first.
+
+    The scheduled_notifications rows are locked FOR UPDATE SKIP LOCKED, so several workers running
+    send_scheduled_notifications at once each get a different batch instead of queueing behind one
+    another. The lock is held until the caller marks the batch processed with
+    set_scheduled_notifications_to_processed, which commits.
+    """
+    return db.session.query(
+        ScheduledNotification.notification_id,
+        Notification.id,
+        Notification.notification_type,
+        Notification.key_type,
+        Service.research_mode,
+    ).join(
+        Notification, Notification.id == ScheduledNotification.notification_id
+    ).join(
+        Service, Service.id == Notification.service_id
     ).filter(
         ScheduledNotification.scheduled_for < datetime.utcnow(),
-        ScheduledNotification.pending).all()
-
-    return notifications
+        ScheduledNotification.pending
+    ).order_by(
+        ScheduledNotification.scheduled_for
+    ).limit(
+        batch_size
+    ).with_for_update(
+        skip_locked=True, of=ScheduledNotification
+    ).all()
 
 
-def set_scheduled_notification_to_processed(notification_id):
+def set_scheduled_notifications_to_processed(notification_ids):
     db.session.query(ScheduledNotification).filter(
-        ScheduledNotification.notification_id == notification_id
+        ScheduledNotification.notification_id.in_(notification_ids)
     ).update(
-        {'pending': False}
+        {'pending': False},
+        synchronize_session=False
     )
     db.session.commit()
 
@@ -674,15 +865,27 @@ def dao_get_last_notification_added_for_job_id(job_id):
     return last_notification_added
 
 
-def notifications_not_yet_sent(should_be_sending_after_seconds, notification_type):
+def notifications_not_yet_sent_in_pages(should_be_sending_after_seconds, notification_type, page_size):
+    """
+    Notifications of notification_type still created should_be_sending_after_seconds after they were, in pages of
+    lightweight rows (id, notification_type, key_type, research_mode) so a large backlog is never loaded at once.
+    """
     older_than_date = datetime.utcnow() - timedelta(seconds=should_be_sending_after_seconds)
 
-    notifications = Notification.query.filter(
+    query = db.session.query(
+        Notification.created_at,
+        Notification.id,
+        Notification.notification_type,
+        Notification.key_type,
+        Service.research_mode,
+    ).join(
+        Service, Service.id == Notification.service_id
+    ).filter(
         Notification.created_at <= older_than_date,
         Notification.notification_type == notification_type,
         Notification.status == NOTIFICATION_CREATED
-    ).all()
-    return notifications
+    )
+    return keyset_paginate(query, NOTIFICATIONS_KEYSET, page_size)
 
 
 def dao_old_letters_with_created_status():
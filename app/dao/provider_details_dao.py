@@ -4,6 +4,7 @@ from notifications_utils.timezones import convert_utc_to_local_timezone
 from sqlalchemy import asc, desc, func
 
 from app.dao.dao_utils import transactional
+from app.provider_details.routing import invalidate_provider_routing
 from app.provider_details.switch_providers import (
     provider_is_inactive,
     provider_is_primary,
@@ -54,8 +55,13 @@ def dao_toggle_sms_provider(identifier):
     dao_switch_sms_provider_to_provider_with_identifier(alternate_provider.identifier)
 
 
-@transactional
 def dao_switch_sms_provider_to_provider_with_identifier(identifier):
+    _switch_sms_provider_to_provider_with_identifier(identifier)
+    invalidate_provider_routing()
+
+
+@transactional
+def _switch_sms_provider_to_provider_with_identifier(identifier):
     new_provider = get_provider_details_by_identifier(identifier)
 
     if provider_is_inactive(new_provider):
@@ -87,8 +93,14 @@ def get_provider_details_by_notification_type(notification_type, supports_intern
     return ProviderDetails.query.filter(*filters).order_by(asc(ProviderDetails.priority)).all()
 
 
-@transactional
 def dao_update_provider_details(provider_details):
+    _update_provider_details(provider_details)
+    # only once committed, so other processes cannot reload the old routing
+    invalidate_provider_routing()
+
+
+@transactional
+def _update_provider_details(provider_details):
     provider_details.version += 1
     provider_details.updated_at = datetime.utcnow()
     history = ProviderDetailsHistory.from_original(provider_details)
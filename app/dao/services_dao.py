@@ -1,7 +1,8 @@
 import uuid
-from datetime import date, datetime, timedelta
+from datetime import datetime
 
 from notifications_utils.statsd_decorators import statsd
+from sqlalchemy import Integer
 from sqlalchemy.sql.expression import asc, case, and_, func
 from sqlalchemy.orm import joinedload
 from flask import current_app
@@ -15,6 +16,7 @@ from app.dao.dao_utils import (
 )
 from app.dao.email_branding_dao import dao_get_email_branding_by_name
 from app.dao.letter_branding_dao import dao_get_letter_branding_by_name
+from app.dao.notification_status_counts_dao import get_local_today, notification_status_counts
 from app.dao.organisation_dao import dao_get_organisation_by_email_address
 from app.dao.service_sms_sender_dao import insert_service_sms_sender
 from app.dao.service_user_dao import dao_get_service_user
@@ -50,7 +52,6 @@ from app.models import (
 from app.utils import (
     email_address_is_nhs,
     escape_special_characters,
-    get_local_timezone_midnight_in_utc,
     midnight_n_days_ago)
 
 DEFAULT_SERVICE_PERMISSIONS = [
@@ -159,17 +160,18 @@ def dao_fetch_live_services_data():
     ).order_by(
         asc(Service.go_live_at)
     ).all()
-    results = []
+    # one row per service and notification type, merged by service in go live order
+    results = {}
     for row in data:
-        existing_service = next((x for x in results if x['service_id'] == row.service_id), None)
+        existing_service = results.get(row.service_id)
 
         if existing_service is not None:
             existing_service["email_totals"] += row.email_totals
             existing_service["sms_totals"] += row.sms_totals
             existing_service["letter_totals"] += row.letter_totals
         else:
-            results.append(row._asdict())
-    return results
+            results[row.service_id] = row._asdict()
+    return list(results.values())
 
 
 def dao_fetch_service_by_id(service_id, only_active=False):
@@ -424,23 +426,32 @@ def dao_fetch_stats_for_service(service_id, limit_days):
 
 @statsd(namespace="dao")
 def dao_fetch_todays_stats_for_service(service_id):
-    return _stats_for_service_query(service_id).filter(
-        func.date(Notification.created_at) == date.today()
+    status_counts = notification_status_counts()
+    return db.session.query(
+        status_counts.notification_type,
+        status_counts.notification_status.label('status'),
+        func.cast(func.sum(status_counts.notification_count), Integer).label('count')
+    ).filter(
+        status_counts.service_id == service_id,
+        status_counts.bst_date == get_local_today(),
+        status_counts.key_type != KEY_TYPE_TEST,
+        status_counts.notification_count != 0
+    ).group_by(
+        status_counts.notification_type,
+        status_counts.notification_status,
     ).all()
 
 
 def fetch_todays_total_message_count(service_id):
+    status_counts = notification_status_counts()
     result = db.session.query(
-        func.count(Notification.id).label('count')
+        func.sum(status_counts.notification_count)
     ).filter(
-        Notification.service_id == service_id,
-        Notification.key_type != KEY_TYPE_TEST,
-        func.date(Notification.created_at) == date.today()
-    ).group_by(
-        Notification.notification_type,
-        Notification.status,
-    ).first()
-    return 0 if result is None else result.count
+        status_counts.service_id == service_id,
+        status_counts.bst_date == get_local_today(),
+        status_counts.key_type != KEY_TYPE_TEST
+    ).scalar()
+    return result or 0
 
 
 def _stats_for_service_query(service_id):
@@ -459,26 +470,23 @@ def _stats_for_service_query(service_id):
 
 @statsd(namespace='dao')
 def dao_fetch_todays_stats_for_all_services(include_from_test_key=True, only_active=True):
-    today = date.today()
-    start_date = get_local_timezone_midnight_in_utc(today)
-    end_date = get_local_timezone_midnight_in_utc(today + timedelta(days=1))
-
+    status_counts = notification_status_counts()
     subquery = db.session.query(
-        Notification.notification_type,
-        Notification.status,
-        Notification.service_id,
-        func.count(Notification.id).label('count')
+        status_counts.notification_type,
+        status_counts.notification_status.label('status'),
+        status_counts.service_id,
+        func.cast(func.sum(status_counts.notification_count), Integer).label('count')
     ).filter(
-        Notification.created_at >= start_date,
-        Notification.created_at < end_date
+        status_counts.bst_date == get_local_today(),
+        status_counts.notification_count != 0
     ).group_by(
-        Notification.notification_type,
-        Notification.status,
-        Notification.service_id
+        status_counts.notification_type,
+        status_counts.notification_status,
+        status_counts.service_id
     )
 
     if not include_from_test_key:
-        subquery = subquery.filter(Notification.key_type != KEY_TYPE_TEST)
+        subquery = subquery.filter(status_counts.key_type != KEY_TYPE_TEST)
 
     subquery = subquery.subquery()
 
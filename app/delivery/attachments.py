@@ -0,0 +1,150 @@
+"""
+Download of the documents attached to emails.
+
+A job usually sends the same document to every recipient, so downloaded attachments are kept in a disk
+cache shared by the workers on the host, keyed by a hash of the document URL and bounded in size by evicting
+the least recently used files. The documents are recipients' personal information: the cache is only readable
+by the user the workers run as, and a document is dropped once it is older than ATTACHMENT_CACHE_TTL whether
+it is still used or not. Downloads are streamed with a deadline and a size limit, and the MIME type is
+sniffed from the first bytes so anything that is not a PDF is abandoned without being downloaded.
+"""
+import hashlib
+import os
+import tempfile
+from time import monotonic, time
+
+import magic
+import requests
+from flask import current_app
+
+ATTACHMENT_MIME_TYPE = 'application/pdf'
+MIME_SNIFF_SIZE = 2048
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+
+class AttachmentDownloadError(Exception):
+    pass
+
+
+class AttachmentCache:
+
+    def __init__(self, directory, max_size, ttl):
+        self.directory = directory
+        self.max_size = max_size
+        self.ttl = ttl
+
+    def path(self, url):
+        return os.path.join(self.directory, hashlib.sha256(url.encode('utf-8')).hexdigest())
+
+    def expired(self, stat):
+        # the modification time is when the document was downloaded
+        return stat.st_mtime < time() - self.ttl
+
+    def get(self, url):
+        path = self.path(url)
+        try:
+            if self.expired(os.stat(path)):
+                os.remove(path)
+                return None
+            with open(path, 'rb') as f:
+                data = f.read()
+            # the access time is what the least recently used eviction goes by
+            os.utime(path, (time(), os.stat(path).st_mtime))
+        except OSError:
+            return None
+        return data
+
+    def set(self, url, data):
+        if len(data) > self.max_size:
+            return
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        # the directory may have been created with other permissions, the files are created 0o600 by mkstemp
+        os.chmod(self.directory, 0o700)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self.path(url))
+        except OSError:
+            current_app.logger.exception("Could not write attachment cache file {}".format(tmp_path))
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        self.evict()
+
+    def evict(self):
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.tmp'):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            if self.expired(stat):
+                self.remove(entry.path)
+                continue
+            files.append((stat.st_atime, stat.st_size, entry.path))
+
+        total_size = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total_size <= self.max_size:
+                break
+            self.remove(path)
+            total_size -= size
+
+    @staticmethod
+    def remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def get_attachment_cache():
+    return AttachmentCache(
+        current_app.config['ATTACHMENT_CACHE_DIR'],
+        current_app.config['ATTACHMENT_CACHE_MAX_SIZE'],
+        current_app.config['ATTACHMENT_CACHE_TTL'],
+    )
+
+
+def get_pdf_attachment(url):
+    """
+    Returns the content of the document at url if it is a PDF, otherwise None.
+    Raises AttachmentDownloadError if it cannot be downloaded in time or is too large.
+    """
+    cache = get_attachment_cache()
+    data = cache.get(url)
+    if data is None:
+        data = download_pdf(url)
+        if data is not None:
+            cache.set(url, data)
+    return data
+
+
+def download_pdf(url):
+    timeout = current_app.config['ATTACHMENT_DOWNLOAD_TIMEOUT']
+    max_size = current_app.config['ATTACHMENT_MAX_SIZE']
+    deadline = monotonic() + timeout
+
+    with requests.get(url, stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+        chunks = response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE)
+
+        head = b''
+        for chunk in chunks:
+            head += chunk
+            if len(head) >= MIME_SNIFF_SIZE:
+                break
+        if magic.from_buffer(head[:MIME_SNIFF_SIZE], mime=True) != ATTACHMENT_MIME_TYPE:
+            return None
+
+        data = bytearray(head)
+        for chunk in chunks:
+            data += chunk
+            if len(data) > max_size:
+                raise AttachmentDownloadError("{} is larger than {} bytes".format(url, max_size))
+            if monotonic() > deadline:
+                raise AttachmentDownloadError("{} took longer than {} seconds to download".format(url, timeout))
+        return bytes(data)
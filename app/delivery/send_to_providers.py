@@ -1,11 +1,11 @@
+from collections import defaultdict
 from datetime import datetime
+from time import monotonic
 import os
-import urllib.request
-import magic
-import re
 
 from flask import current_app
 from notifications_utils.recipients import (
+    InvalidEmailError,
     validate_and_format_phone_number,
     validate_and_format_email_address
 )
@@ -16,11 +16,21 @@ from app.dao.notifications_dao import (
     dao_update_notification
 )
 from app.dao.provider_details_dao import (
-    get_provider_details_by_notification_type,
     dao_toggle_sms_provider
 )
+from app.provider_details.load_balancing import (
+    choose_weighted_provider,
+    providers_allowed_for_sender,
+    record_sms_provider_response,
+    sms_load_balancing_enabled
+)
+from app.provider_details.concurrency import provider_request_slot
+from app.provider_details.routing import get_active_providers, get_sms_provider_weights
 from app.celery.research_mode_tasks import send_sms_response, send_email_response
-from app.dao.templates_dao import dao_get_template_by_id
+from app.delivery.attachments import get_pdf_attachment
+from app.delivery.pii import scan_for_pii
+from app.delivery.ses_templates import compile_ses_template, record_ses_template_use
+from app.delivery.templates import get_template_version
 from app.exceptions import NotificationTechnicalFailureException, MalwarePendingException
 from app.models import (
     SMS_TYPE,
@@ -35,7 +45,8 @@ from app.models import (
     NOTIFICATION_SENT,
     NOTIFICATION_SENDING
 )
-from app.clients.mlwr.mlwr import check_mlwr_score
+from app.clients.mlwr.mlwr import check_mlwr_score, is_completed, is_malware, wait_for_mlwr_scan
+from app.notifications.latency import PROVIDER, RENDER, record_stage, timed_stage
 from app.utils import get_logo_url
 
 
@@ -54,33 +65,48 @@ def send_sms_to_provider(notification):
             notification.reply_to_text
         )
 
-        template_model = dao_get_template_by_id(notification.template_id, notification.template_version)
-
-        template = SMSMessageTemplate(
-            template_model.__dict__,
-            values=notification.personalisation,
-            prefix=service.name,
-            show_prefix=service.prefix_sms,
-        )
+        template_dict = get_template_version(notification.template_id, notification.template_version)
+        priority = template_dict['process_type']
+        with timed_stage(RENDER, SMS_TYPE, provider.get_name(), priority):
+            template = SMSMessageTemplate(
+                template_dict,
+                values=notification.personalisation,
+                prefix=service.name,
+                show_prefix=service.prefix_sms,
+            )
+            content = str(template)
 
         if service.research_mode or notification.key_type == KEY_TYPE_TEST:
             update_notification_to_sending(notification, provider)
             send_sms_response(provider.get_name(), str(notification.id), notification.to)
 
         else:
+            load_balancing = sms_load_balancing_enabled()
+            start_time = monotonic()
             try:
-                provider.send_sms(
-                    to=validate_and_format_phone_number(notification.to, international=notification.international),
-                    content=str(template),
-                    reference=str(notification.id),
-                    sender=notification.reply_to_text
-                )
+                with provider_request_slot(provider.get_name()):
+                    # waiting for a slot is not provider latency
+                    start_time = monotonic()
+                    provider.send_sms(
+                        to=validate_and_format_phone_number(notification.to, international=notification.international),
+                        content=content,
+                        reference=str(notification.id),
+                        sender=notification.reply_to_text
+                    )
             except Exception as e:
                 notification.billable_units = template.fragment_count
                 dao_update_notification(notification)
-                dao_toggle_sms_provider(provider.name)
+                if load_balancing:
+                    # the failure lowers the provider's weight instead of switching all traffic away from it
+                    record_sms_provider_response(provider.name, (monotonic() - start_time) * 1000, success=False)
+                else:
+                    dao_toggle_sms_provider(provider.name)
                 raise e
             else:
+                elapsed_seconds = monotonic() - start_time
+                record_stage(PROVIDER, SMS_TYPE, elapsed_seconds, provider.get_name(), priority)
+                if load_balancing:
+                    record_sms_provider_response(provider.name, elapsed_seconds * 1000, success=True)
                 notification.billable_units = template.fragment_count
                 update_notification_to_sending(notification, provider)
 
@@ -111,24 +137,23 @@ def send_email_to_provider(notification):
                     'mlwr_sid' in personalisation_data[key]['document'] and
                     personalisation_data[key]['document']['mlwr_sid'] != "false"):
 
-                mlwr_result = check_mlwr(personalisation_data[key]['document']['mlwr_sid'])
+                mlwr_sid = personalisation_data[key]['document']['mlwr_sid']
+                mlwr_result = check_mlwr(mlwr_sid)
 
-                if "state" in mlwr_result and mlwr_result["state"] == "completed":
+                if is_completed(mlwr_result):
                     # Update notification that it contains malware
-                    if "submission" in mlwr_result and mlwr_result["submission"]['max_score'] >= 500:
+                    if is_malware(mlwr_result):
                         malware_failure(notification=notification)
                         return
                 else:
-                    # Throw error so celery will retry in sixty seconds
+                    # The notification is requeued as soon as the scan completes, see check-pending-mlwr-scans
+                    wait_for_mlwr_scan(mlwr_sid, notification.id)
                     raise MalwarePendingException
 
             try:
-                req = urllib.request.Request(personalisation_data[key]['document']['direct_file_url'])
-                with urllib.request.urlopen(req) as response:
-                    buffer = response.read()
-                    mime_type = magic.from_buffer(buffer, mime=True)
-                    if mime_type == 'application/pdf':
-                        attachments.append({"name": "{}.pdf".format(key), "data": buffer})
+                buffer = get_pdf_attachment(personalisation_data[key]['document']['direct_file_url'])
+                if buffer is not None:
+                    attachments.append({"name": "{}.pdf".format(key), "data": buffer})
             except Exception:
                 current_app.logger.error(
                     "Could not download and attach {}".format(personalisation_data[key]['document']['direct_file_url'])
@@ -136,59 +161,41 @@ def send_email_to_provider(notification):
 
             personalisation_data[key] = personalisation_data[key]['document']['url']
 
-        template_dict = dao_get_template_by_id(notification.template_id, notification.template_version).__dict__
-
-        # Local Jinja support - Add USE_LOCAL_JINJA_TEMPLATES=True to .env
-        # Add a folder to the project root called 'jinja_templates'
-        # with a copy of 'email_template.jinja2' from notification-utils repo
-        debug_template_path = (os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-                               if os.environ.get('USE_LOCAL_JINJA_TEMPLATES') == 'True' else None)
-
-        html_email = HTMLEmailTemplate(
-            template_dict,
-            values=personalisation_data,
-            jinja_path=debug_template_path,
-            **get_html_email_options(service)
-        )
-
-        plain_text_email = PlainTextEmailTemplate(
-            template_dict,
-            values=personalisation_data
-        )
+        template_dict = get_template_version(notification.template_id, notification.template_version)
+        priority = template_dict['process_type']
+        with timed_stage(RENDER, EMAIL_TYPE, provider.get_name(), priority):
+            subject, html_body, body = _render_email_parts(template_dict, service, personalisation_data)
 
         if current_app.config["SCAN_FOR_PII"]:
-            contains_pii(notification, str(plain_text_email))
+            contains_pii(notification, body)
 
         if service.research_mode or notification.key_type == KEY_TYPE_TEST:
             notification.reference = str(create_uuid())
             update_notification_to_sending(notification, provider)
             send_email_response(notification.reference, notification.to)
         else:
-            if service.sending_domain is None or service.sending_domain.strip() == "":
-                sending_domain = current_app.config['NOTIFY_EMAIL_DOMAIN']
-            else:
-                sending_domain = service.sending_domain
-
-            from_address = '"{}" <{}@{}>'.format(service.name, service.email_from,
-                                                 sending_domain)
+            sending_domain = get_sending_domain(service)
+            from_address = get_from_address(service, sending_domain)
 
             email_reply_to = notification.reply_to_text
 
             emails_parameters = notification.additional_email_parameters if notification.additional_email_parameters else {}
 
-            reference = provider.send_email(
-                from_address,
-                sending_domain,
-                validate_and_format_email_address(notification.to),
-                plain_text_email.subject,
-                body=str(plain_text_email),
-                html_body=str(html_email),
-                reply_to_address=validate_and_format_email_address(email_reply_to) if email_reply_to else None,
-                attachments=attachments,
-                importance=emails_parameters.get('importance', None),
-                cc_addresses=validate_and_format_email_address(emails_parameters.get(
-                    'cc_address')) if emails_parameters.get('cc_address', None) else None
-            )
+            with provider_request_slot(provider.get_name()), \
+                    timed_stage(PROVIDER, EMAIL_TYPE, provider.get_name(), priority):
+                reference = provider.send_email(
+                    from_address,
+                    sending_domain,
+                    validate_and_format_email_address(notification.to),
+                    subject,
+                    body=body,
+                    html_body=html_body,
+                    reply_to_address=validate_and_format_email_address(email_reply_to) if email_reply_to else None,
+                    attachments=attachments,
+                    importance=emails_parameters.get('importance', None),
+                    cc_addresses=validate_and_format_email_address(emails_parameters.get(
+                        'cc_address')) if emails_parameters.get('cc_address', None) else None
+                )
             notification.reference = reference
             update_notification_to_sending(notification, provider)
 
@@ -196,6 +203,150 @@ def send_email_to_provider(notification):
         statsd_client.timing("email.total-time", delta_milliseconds)
 
 
+def send_emails_to_provider(notifications):
+    """
+    Sends emails of a job, with one SES SendBulkTemplatedEmail call for up to 50 emails of the same template,
+    sender and reply-to address, see app/delivery/ses_templates.py.
+    Returns the notifications that have to be delivered one at a time.
+    """
+    singles = []
+    batches = defaultdict(list)
+    compiled_templates = {}
+    for notification in notifications:
+        try:
+            prepared = prepare_bulk_email(notification, compiled_templates)
+        except NotificationTechnicalFailureException:
+            current_app.logger.exception("Email notification {} not sent".format(notification.id))
+            continue
+        if prepared is None:
+            singles.append(notification)
+            continue
+        provider, compiled, to_address, replacement_data = prepared
+        batches[(provider, compiled, notification.service, notification.reply_to_text)].append(
+            (notification, to_address, replacement_data)
+        )
+
+    for (provider, compiled, service, reply_to_text), batch in batches.items():
+        sending_domain = get_sending_domain(service)
+        try:
+            with provider_request_slot(provider.get_name()):
+                start_time = monotonic()
+                provider.create_template(compiled.ses_template())
+                record_ses_template_use(compiled.name)
+                message_ids = provider.send_bulk_templated_email(
+                    get_from_address(service, sending_domain),
+                    sending_domain,
+                    compiled.name,
+                    [(to_address, data) for _, to_address, data in batch],
+                    reply_to_address=validate_and_format_email_address(reply_to_text) if reply_to_text else None
+                )
+                elapsed_seconds = monotonic() - start_time
+        except Exception:
+            current_app.logger.exception("Bulk sending of {} emails failed".format(len(batch)))
+            singles.extend(notification for notification, _, _ in batch)
+            continue
+
+        for (notification, _, _), message_id in zip(batch, message_ids):
+            if message_id is None:
+                singles.append(notification)
+                continue
+            notification.reference = message_id
+            update_notification_to_sending(notification, provider)
+            # each email of the batch waited for the whole request
+            template_dict = get_template_version(notification.template_id, notification.template_version)
+            record_stage(PROVIDER, EMAIL_TYPE, elapsed_seconds, provider.get_name(), template_dict['process_type'])
+            delta_milliseconds = (datetime.utcnow() - notification.created_at).total_seconds() * 1000
+            statsd_client.timing("email.total-time", delta_milliseconds)
+
+    return singles
+
+
+def prepare_bulk_email(notification, compiled_templates):
+    """
+    The provider, compiled template, recipient and replacement data to send notification in bulk with, or None
+    if it has to be sent on its own.
+    """
+    service = notification.service
+    personalisation = notification.personalisation or {}
+    if (
+        not service.active
+        or notification.status != 'created'
+        or service.research_mode
+        or notification.key_type == KEY_TYPE_TEST
+        or notification.additional_email_parameters
+        or any(isinstance(value, dict) and 'document' in value for value in personalisation.values())
+    ):
+        return None
+
+    provider = provider_to_use(EMAIL_TYPE, notification.id)
+    if provider.get_name() != 'ses':
+        return None
+
+    try:
+        to_address = validate_and_format_email_address(notification.to)
+    except InvalidEmailError:
+        return None
+
+    template_dict = get_template_version(notification.template_id, notification.template_version)
+    with timed_stage(RENDER, EMAIL_TYPE, provider.get_name(), template_dict['process_type']):
+        html_email, plain_text_email = render_email(template_dict, service, personalisation)
+        subject, html_body, body = plain_text_email.subject, str(html_email), str(plain_text_email)
+
+    if current_app.config["SCAN_FOR_PII"]:
+        contains_pii(notification, body)
+
+    key = (notification.template_id, notification.template_version, service.id)
+    if key not in compiled_templates:
+        compiled_templates[key] = compile_ses_template(
+            plain_text_email.placeholders,
+            lambda values: _render_email_parts(template_dict, service, values)
+        )
+    compiled = compiled_templates[key]
+    if compiled is None:
+        return None
+
+    replacement_data = compiled.replacement_data(personalisation)
+    if not compiled.matches(replacement_data, subject, html_body, body):
+        return None
+    return provider, compiled, to_address, replacement_data
+
+
+def render_email(template_dict, service, values):
+    # Local Jinja support - Add USE_LOCAL_JINJA_TEMPLATES=True to .env
+    # Add a folder to the project root called 'jinja_templates'
+    # with a copy of 'email_template.jinja2' from notification-utils repo
+    debug_template_path = (os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+                           if os.environ.get('USE_LOCAL_JINJA_TEMPLATES') == 'True' else None)
+
+    html_email = HTMLEmailTemplate(
+        template_dict,
+        values=values,
+        jinja_path=debug_template_path,
+        **get_html_email_options(service)
+    )
+
+    plain_text_email = PlainTextEmailTemplate(
+        template_dict,
+        values=values
+    )
+    return html_email, plain_text_email
+
+
+def _render_email_parts(template_dict, service, values):
+    html_email, plain_text_email = render_email(template_dict, service, values)
+    return plain_text_email.subject, str(html_email), str(plain_text_email)
+
+
+def get_sending_domain(service):
+    if service.sending_domain is None or service.sending_domain.strip() == "":
+        return current_app.config['NOTIFY_EMAIL_DOMAIN']
+    return service.sending_domain
+
+
+def get_from_address(service, sending_domain):
+    return '"{}" <{}@{}>'.format(service.name, service.email_from, sending_domain)
+
+
 def update_notification_to_sending(notification, provider):
     notification.sent_at = datetime.utcnow()
     notification.sent_by = provider.get_name()
@@ -207,9 +358,7 @@ def update_notification_to_sending(notification, provider):
 
 
 def provider_to_use(notification_type, notification_id, international=False, sender=None):
-    active_providers_in_order = [
-        p for p in get_provider_details_by_notification_type(notification_type, international) if p.active
-    ]
+    active_providers_in_order = get_active_providers(notification_type, international)
 
     if not active_providers_in_order:
         current_app.logger.error(
@@ -227,7 +376,15 @@ def provider_to_use(notification_type, notification_id, international=False, sen
     # if sender is not None and notification_type == SMS_TYPE and sender[0] == "+":
     #     return clients.get_client_by_name_and_type("pinpoint", notification_type)
 
-    return clients.get_client_by_name_and_type(active_providers_in_order[0].identifier, notification_type)
+    if notification_type == SMS_TYPE and sms_load_balancing_enabled():
+        candidates = providers_allowed_for_sender(sender, active_providers_in_order)
+        if not candidates:
+            raise Exception("No active {} providers for sender {}".format(notification_type, sender))
+        return clients.get_client_by_name_and_type(
+            choose_weighted_provider(candidates, get_sms_provider_weights()), notification_type
+        )
+
+    return clients.get_client_by_name_and_type(active_providers_in_order[0], notification_type)
 
 
 def get_html_email_options(service):
@@ -284,10 +441,9 @@ def check_mlwr(sid):
 
 
 def contains_pii(notification, text_content):
-    for sin in re.findall(r'\s\d{3}-\d{3}-\d{3}\s', text_content):
-        if luhn(sin.replace("-", "").strip()):
-            fail_pii(notification, "Social Insurance Number")
-            return
+    pii_type = scan_for_pii(text_content, current_app.config["PII_DETECTORS"])
+    if pii_type:
+        fail_pii(notification, pii_type)
 
 
 def fail_pii(notification, pii_type):
@@ -298,8 +454,3 @@ def fail_pii(notification, pii_type):
             notification.notification_type,
             notification.id,
             pii_type))
-
-
-def luhn(n):
-    r = [int(ch) for ch in n][::-1]
-    return (sum(r[0::2]) + sum(sum(divmod(d * 2, 10)) for d in r[1::2])) % 10 == 0
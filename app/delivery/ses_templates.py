@@ -0,0 +1,144 @@
+"""
+SES templates for sending the emails of a job in bulk.
+
+Emails of the same template usually differ only by the values of their placeholders. Such emails can be sent
+with SendBulkTemplatedEmail, up to 50 recipients per call, instead of one send_raw_email call each: the email
+is rendered once with a token in place of each placeholder, the tokens become SES replacement tags and each
+recipient only carries the values of its placeholders.
+
+Whether an email can be sent that way is checked by filling the compiled template with its values and comparing
+the result with its own rendering. Anything the values change beyond their own place in the email (conditional
+placeholders, markdown in a value and so on) makes the comparison fail and the email is sent on its own, so
+bulk sending never changes what a recipient receives.
+
+SES accounts can hold at most 10,000 templates, and a template is created for each distinct content. Every
+use of a template is recorded in redis, and the `delete-unused-ses-templates` task deletes the templates that
+haven't been used for SES_TEMPLATE_TTL, as well as the least recently used ones beyond SES_TEMPLATES_MAX.
+"""
+import hashlib
+import re
+from html import escape
+from time import time
+
+from flask import current_app
+
+from app import redis_store
+
+SES_TEMPLATE_PREFIX = 'notify-'
+SES_TEMPLATES_LAST_USED_KEY = 'ses-templates-last-used'
+
+_TOKEN = 'ZZSESPLACEHOLDER{}ZZ'
+_TOKENS = re.compile(r'ZZSESPLACEHOLDER(\d+)ZZ')
+# handlebars syntax in the content itself, or braces next to a tag, would be interpreted by SES
+_HANDLEBARS = re.compile(r'\{\{|\}\}|\{ZZSESPLACEHOLDER|ZZSESPLACEHOLDER\d+ZZ\}')
+
+
+def _insensitive_key(key):
+    return ''.join(key.split()).replace('_', '').replace('-', '').lower()
+
+
+class CompiledTemplate:
+    """
+    An email rendered with a token for each of its placeholders.
+    """
+
+    def __init__(self, placeholders, subject, html_body, body):
+        self.placeholders = placeholders
+        self.subject = subject
+        self.html_body = html_body
+        self.body = body
+        digest = hashlib.sha256('\0'.join([subject, html_body, body]).encode('utf-8')).hexdigest()
+        # SES template names are at most 64 letters, digits, underscores and dashes
+        self.name = '{}{}'.format(SES_TEMPLATE_PREFIX, digest[:48])
+
+    def ses_template(self):
+        # triple braces, the values are already escaped for the part they go in
+        def tags(prefix, part):
+            return _TOKENS.sub(lambda match: '{{{%s%s}}}' % (prefix, match.group(1)), part)
+
+        return {
+            'TemplateName': self.name,
+            'SubjectPart': tags('t', self.subject),
+            'HtmlPart': tags('h', self.html_body),
+            'TextPart': tags('t', self.body),
+        }
+
+    def replacement_data(self, personalisation):
+        values = {_insensitive_key(key): value for key, value in (personalisation or {}).items()}
+        data = {}
+        for index, placeholder in enumerate(self.placeholders):
+            value = values.get(_insensitive_key(placeholder))
+            text = '' if value is None else str(value)
+            data['t{}'.format(index)] = text
+            data['h{}'.format(index)] = escape(text, quote=False)
+        return data
+
+    def matches(self, replacement_data, subject, html_body, body):
+        """
+        Whether SES would send exactly subject, html_body and body with replacement_data.
+        """
+        def fill(prefix, part):
+            return _TOKENS.sub(lambda match: replacement_data['{}{}'.format(prefix, match.group(1))], part)
+
+        return (
+            fill('t', self.subject) == subject
+            and fill('t', self.body) == body
+            and fill('h', self.html_body) == html_body
+        )
+
+
+def compile_ses_template(placeholders, render):
+    """
+    Compiles the email rendered by render(values) -> (subject, html_body, body), or returns None if it can't
+    be sent as an SES template.
+    """
+    placeholders = sorted(placeholders)
+    subject, html_body, body = render({
+        placeholder: _TOKEN.format(index) for index, placeholder in enumerate(placeholders)
+    })
+    if any(_HANDLEBARS.search(part) for part in (subject, html_body, body)):
+        return None
+    return CompiledTemplate(placeholders, subject, html_body, body)
+
+
+def record_ses_template_use(name):
+    if not redis_store.active:
+        return
+    try:
+        redis_store.redis_store.zadd(SES_TEMPLATES_LAST_USED_KEY, {name: time()})
+    except Exception:
+        current_app.logger.exception("Redis error recording the use of SES template {}".format(name))
+
+
+def delete_unused_ses_templates(ses_client):
+    """
+    Deletes the templates of ses_client that haven't been used for SES_TEMPLATE_TTL seconds, and the least
+    recently used ones beyond the SES_TEMPLATES_MAX most recent. Templates whose use was never recorded go by
+    their creation time. Returns the names of the deleted templates.
+    """
+    last_used = {}
+    if redis_store.active:
+        last_used = {
+            name.decode('utf-8'): used
+            for name, used in redis_store.redis_store.zrange(SES_TEMPLATES_LAST_USED_KEY, 0, -1, withscores=True)
+        }
+
+    templates = sorted(
+        (
+            (last_used.get(name, created_at.timestamp()), name)
+            for name, created_at in ses_client.list_templates()
+            if name.startswith(SES_TEMPLATE_PREFIX)
+        ),
+        reverse=True
+    )
+    oldest_use = time() - current_app.config['SES_TEMPLATE_TTL']
+    to_delete = [
+        name for position, (used, name) in enumerate(templates)
+        if used < oldest_use or position >= current_app.config['SES_TEMPLATES_MAX']
+    ]
+
+    for name in to_delete:
+        ses_client.delete_template(name)
+    if to_delete and redis_store.active:
+        redis_store.redis_store.zrem(SES_TEMPLATES_LAST_USED_KEY, *to_delete)
+    return to_delete
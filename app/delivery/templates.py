@@ -0,0 +1,57 @@
+"""
+Cache of the template versions notifications are delivered with.
+
+A template version is never changed once written, so delivery doesn't need to query it for every notification:
+each worker process loads a version the first time it delivers it and keeps it, most recently used first, up to
+TEMPLATE_VERSION_CACHE_SIZE versions. The notification itself comes with its service and email branding from
+`dao_get_notification_for_delivery`, which leaves a single query to deliver a notification.
+"""
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import inspect
+
+from app.dao.templates_dao import dao_get_template_by_id
+
+TEMPLATE_VERSION_CACHE_SIZE = 1000
+
+
+class TemplateVersionCache:
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.templates = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, template_id, version):
+        key = (str(template_id), version)
+        with self.lock:
+            template = self.templates.get(key)
+            if template is not None:
+                self.templates.move_to_end(key)
+                return dict(template)
+
+        template_history = dao_get_template_by_id(template_id, version)
+        template = {
+            column.key: getattr(template_history, column.key)
+            for column in inspect(template_history).mapper.column_attrs
+        }
+        with self.lock:
+            self.templates[key] = template
+            while len(self.templates) > self.max_size:
+                self.templates.popitem(last=False)
+        return dict(template)
+
+    def clear(self):
+        with self.lock:
+            self.templates.clear()
+
+
+template_versions = TemplateVersionCache(TEMPLATE_VERSION_CACHE_SIZE)
+
+
+def get_template_version(template_id, version):
+    """
+    The columns of a template version as a dict, as the notifications_utils templates take them.
+    """
+    return template_versions.get(template_id, version)
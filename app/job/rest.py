@@ -1,4 +1,5 @@
-import dateutil
+from collections import defaultdict
+
 from flask import (
     Blueprint,
     jsonify,
@@ -14,10 +15,11 @@ from app.dao.jobs_dao import (
     dao_get_jobs_by_service_id,
     dao_get_future_scheduled_job_by_id_and_service_id,
     dao_get_notification_outcomes_for_job,
+    dao_get_notification_outcomes_for_jobs,
     dao_cancel_letter_job,
     can_letter_job_be_cancelled
 )
-from app.dao.fact_notification_status_dao import fetch_notification_statuses_for_job
+from app.dao.fact_notification_status_dao import fetch_notification_statuses_for_jobs
 from app.dao.services_dao import dao_fetch_service_by_id
 from app.dao.templates_dao import dao_get_template_by_id
 from app.dao.notifications_dao import get_notifications_for_job
@@ -186,19 +188,32 @@ def get_paginated_jobs(service_id, limit_days, statuses, page):
         statuses=statuses
     )
     data = job_schema.dump(pagination.items, many=True).data
-    for job_data in data:
-        start = job_data['processing_started']
-        start = dateutil.parser.parse(start).replace(tzinfo=None) if start else None
 
-        if start is None:
-            statistics = []
-        elif start.replace(tzinfo=None) < midnight_n_days_ago(3):
+    # the statistics for every job on the page come from at most two queries
+    old_job_ids = []
+    recent_job_ids = []
+    for job in pagination.items:
+        if job.processing_started is None:
+            continue
+        elif job.processing_started < midnight_n_days_ago(3):
             # ft_notification_status table
-            statistics = fetch_notification_statuses_for_job(job_data['id'])
+            old_job_ids.append(job.id)
         else:
             # notifications table
-            statistics = dao_get_notification_outcomes_for_job(service_id, job_data['id'])
-        job_data['statistics'] = [{'status': statistic.status, 'count': statistic.count} for statistic in statistics]
+            recent_job_ids.append(job.id)
+
+    statistics = defaultdict(list)
+    if old_job_ids:
+        for statistic in fetch_notification_statuses_for_jobs(old_job_ids):
+            statistics[str(statistic.job_id)].append(statistic)
+    if recent_job_ids:
+        for statistic in dao_get_notification_outcomes_for_jobs(service_id, recent_job_ids):
+            statistics[str(statistic.job_id)].append(statistic)
+
+    for job_data in data:
+        job_data['statistics'] = [
+            {'status': statistic.status, 'count': statistic.count} for statistic in statistics[job_data['id']]
+        ]
 
     return {
         'data': data,
@@ -1271,6 +1271,10 @@ class Job(db.Model):
     )
     archived = db.Column(db.Boolean, nullable=False, default=False)
 
+    __table_args__ = (
+        Index('ix_jobs_scheduled_for_pending', 'scheduled_for', postgresql_where=job_status == 'scheduled'),
+    )
+
 
 VERIFY_CODE_TYPES = [EMAIL_TYPE, SMS_TYPE]
 
@@ -1405,6 +1409,41 @@ class NotificationStatusTypes(db.Model):
     name = db.Column(db.String(), primary_key=True)
 
 
+FORMATTED_NOTIFICATION_STATUSES = {
+    'email': {
+        'failed': 'Failed',
+        'technical-failure': 'Technical failure',
+        'temporary-failure': 'Inbox not accepting messages right now',
+        'permanent-failure': 'Email address doesn’t exist',
+        'delivered': 'Delivered',
+        'sending': 'Sending',
+        'created': 'Sending',
+        'sent': 'Delivered'
+    },
+    'sms': {
+        'failed': 'Failed',
+        'technical-failure': 'Technical failure',
+        'temporary-failure': 'Phone not accepting messages right now',
+        'permanent-failure': 'Phone number doesn’t exist',
+        'delivered': 'Delivered',
+        'sending': 'Sending',
+        'created': 'Sending',
+        'sent': 'Sent internationally'
+    },
+    'letter': {
+        'technical-failure': 'Technical failure',
+        'sending': 'Accepted',
+        'created': 'Accepted',
+        'delivered': 'Received',
+        'returned-letter': 'Returned',
+    }
+}
+
+
+def format_notification_status(template_type, status):
+    return FORMATTED_NOTIFICATION_STATUSES[template_type].get(status, status)
+
+
 class Notification(db.Model):
     __tablename__ = 'notifications'
 
@@ -1441,14 +1480,19 @@ class Notification(db.Model):
         unique=False,
         nullable=True,
         onupdate=datetime.datetime.utcnow)
-    status = db.Column(
-        'notification_status',
-        db.String,
-        db.ForeignKey('notification_status_types.name'),
-        index=True,
-        nullable=True,
-        default='created',
-        key='status'  # http://docs.sqlalchemy.org/en/latest/core/metadata.html#sqlalchemy.schema.Column
+    # active_history loads the previous status when it is changed, so NotificationStatusCount can move the
+    # notification from one status to the other
+    status = db.column_property(
+        db.Column(
+            'notification_status',
+            db.String,
+            db.ForeignKey('notification_status_types.name'),
+            index=True,
+            nullable=True,
+            default='created',
+            key='status'  # http://docs.sqlalchemy.org/en/latest/core/metadata.html#sqlalchemy.schema.Column
+        ),
+        active_history=True
     )
     reference = db.Column(db.String, nullable=True, index=True)
     client_reference = db.Column(db.String, index=True, nullable=True)
@@ -1484,6 +1528,14 @@ class Notification(db.Model):
             ['template_id', 'template_version'],
             ['templates_history.id', 'templates_history.version'],
         ),
+        Index('ix_notifications_job_id_job_row_number', 'job_id', 'job_row_number'),
+        # only notifications that can still time out or be replayed, the others are the vast majority
+        Index(
+            'ix_notifications_notification_status_created_at_in_flight',
+            'status',  # the column key, notification_status is its name in the database
+            'created_at',
+            postgresql_where=db.text("notification_status IN ('created', 'sending', 'pending')")
+        ),
         {}
     )
 
@@ -1566,35 +1618,7 @@ class Notification(db.Model):
 
     @property
     def formatted_status(self):
-        return {
-            'email': {
-                'failed': 'Failed',
-                'technical-failure': 'Technical failure',
-                'temporary-failure': 'Inbox not accepting messages right now',
-                'permanent-failure': 'Email address doesn’t exist',
-                'delivered': 'Delivered',
-                'sending': 'Sending',
-                'created': 'Sending',
-                'sent': 'Delivered'
-            },
-            'sms': {
-                'failed': 'Failed',
-                'technical-failure': 'Technical failure',
-                'temporary-failure': 'Phone not accepting messages right now',
-                'permanent-failure': 'Phone number doesn’t exist',
-                'delivered': 'Delivered',
-                'sending': 'Sending',
-                'created': 'Sending',
-                'sent': 'Sent internationally'
-            },
-            'letter': {
-                'technical-failure': 'Technical failure',
-                'sending': 'Accepted',
-                'created': 'Accepted',
-                'delivered': 'Received',
-                'returned-letter': 'Returned',
-            }
-        }[self.template.template_type].get(self.status, self.status)
+        return format_notification_status(self.template.template_type, self.status)
 
     def get_letter_status(self):
         """
@@ -1755,6 +1779,7 @@ class NotificationHistory(db.Model, HistoryModel):
             ['template_id', 'template_version'],
             ['templates_history.id', 'templates_history.version'],
         ),
+        Index('ix_notification_history_service_created_at', 'service_id', 'created_at'),
         {}
     )
 
@@ -1778,6 +1803,10 @@ class ScheduledNotification(db.Model):
     scheduled_for = db.Column(db.DateTime, index=False, nullable=False)
     pending = db.Column(db.Boolean, nullable=False, default=True)
 
+    __table_args__ = (
+        Index('ix_scheduled_notifications_scheduled_for_pending', 'scheduled_for', postgresql_where=pending),
+    )
+
 
 INVITE_PENDING = 'pending'
 INVITE_ACCEPTED = 'accepted'
@@ -2102,6 +2131,27 @@ class FactBilling(db.Model):
     updated_at = db.Column(db.DateTime, nullable=True, onupdate=datetime.datetime.utcnow)
 
 
+class FactBillingSmsCumulative(db.Model):
+    """
+    The sms billable units a service has used in its financial year up to and including bst_date, for each day it has
+    a row in ft_billing. Rebuilt for the financial year of each day the nightly billing task processes.
+    """
+    __tablename__ = "ft_billing_sms_cumulative"
+
+    service_id = db.Column(UUID(as_uuid=True), primary_key=True, nullable=False)
+    bst_date = db.Column(db.Date, primary_key=True, nullable=False)
+    financial_year_start = db.Column(db.Integer(), nullable=False)
+    billable_units = db.Column(db.BigInteger(), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=True, onupdate=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        db.Index(
+            'ix_ft_billing_sms_cumulative_year_service_id_bst_date', 'financial_year_start', 'service_id', 'bst_date'
+        ),
+    )
+
+
 class DateTimeDimension(db.Model):
     __tablename__ = "dm_datetime"
     bst_date = db.Column(db.Date, nullable=False, primary_key=True, index=True)
@@ -2140,6 +2190,69 @@ class FactNotificationStatus(db.Model):
     updated_at = db.Column(db.DateTime, nullable=True, onupdate=datetime.datetime.utcnow)
 
 
+class FactNotificationStatusMonthly(db.Model):
+    """
+    ft_notification_status summed by month, rebuilt for the month of each day the nightly notification status task
+    processes.
+    """
+    __tablename__ = "ft_notification_status_monthly"
+
+    month = db.Column(db.Date, primary_key=True, nullable=False)
+    template_id = db.Column(UUID(as_uuid=True), primary_key=True, nullable=False)
+    service_id = db.Column(UUID(as_uuid=True), primary_key=True, nullable=False)
+    notification_type = db.Column(db.Text, primary_key=True, nullable=False)
+    key_type = db.Column(db.Text, primary_key=True, nullable=False)
+    notification_status = db.Column(db.Text, primary_key=True, nullable=False)
+    notification_count = db.Column(db.Integer(), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=True, onupdate=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_ft_notification_status_monthly_service_id_month', 'service_id', 'month'),
+    )
+
+
+class NotificationStatusCount(db.Model):
+    """
+    The number of notifications per status for the current and previous day, kept up to date as notifications
+    are created and change status, see app/dao/notification_status_counts_dao.py. Read them through
+    notification_status_counts(), which adds the deltas not yet folded in.
+    """
+    __tablename__ = "notification_status_counts"
+
+    bst_date = db.Column(db.Date, primary_key=True, nullable=False)
+    service_id = db.Column(UUID(as_uuid=True), primary_key=True, nullable=False)
+    template_id = db.Column(UUID(as_uuid=True), primary_key=True, nullable=False)
+    notification_type = db.Column(db.Text, primary_key=True, nullable=False)
+    key_type = db.Column(db.Text, primary_key=True, nullable=False)
+    notification_status = db.Column(db.Text, primary_key=True, nullable=False)
+    notification_count = db.Column(db.Integer(), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=True, onupdate=datetime.datetime.utcnow)
+
+
+class NotificationStatusCountDelta(db.Model):
+    """
+    A change to notification_status_counts not yet folded into it. Sending only ever inserts these, so concurrent
+    sends never wait for one another on a count row.
+    """
+    __tablename__ = "notification_status_count_deltas"
+
+    id = db.Column(db.BigInteger, primary_key=True)
+    bst_date = db.Column(db.Date, nullable=False)
+    service_id = db.Column(UUID(as_uuid=True), nullable=False)
+    template_id = db.Column(UUID(as_uuid=True), nullable=False)
+    notification_type = db.Column(db.Text, nullable=False)
+    key_type = db.Column(db.Text, nullable=False)
+    notification_status = db.Column(db.Text, nullable=False)
+    notification_count = db.Column(db.Integer(), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_notification_status_count_deltas_service_id_bst_date', 'service_id', 'bst_date'),
+    )
+
+
 class Complaint(db.Model):
     __tablename__ = 'complaints'
 
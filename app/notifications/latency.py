@@ -0,0 +1,85 @@
+"""
+Latency of the stages a notification goes through, from the API request to its delivery receipt.
+
+Each stage is sent to statsd as a timer named `latency.<stage>.<notification type>.<provider>.<priority>`,
+which statsd_mapping.yml turns into the `notifications_latency` histogram with a label for each part. The
+provider is `none` until one is chosen and the priority is the process type of the template, `normal` or
+`priority`, so every stage has the same labels and the stages of a notification can be compared.
+"""
+from contextlib import contextmanager
+from datetime import datetime
+from time import monotonic
+
+from flask import g, has_request_context
+
+from app import statsd_client
+from app.delivery.templates import get_template_version
+from app.models import NORMAL
+
+# API request received -> notification committed
+ACCEPT = 'accept'
+# notification committed -> delivery task published
+ENQUEUE = 'enqueue'
+# notification created -> delivery task started, the time spent waiting in the queue
+DEQUEUE = 'dequeue'
+# template rendered for the provider
+RENDER = 'render'
+# request to the provider, without the wait for a slot, see app/provider_details/concurrency.py
+PROVIDER = 'provider'
+# notification sent -> delivery receipt processed
+RECEIPT = 'receipt'
+
+NO_PROVIDER = 'none'
+
+
+def record_stage(stage, notification_type, elapsed_seconds, provider=None, priority=None):
+    statsd_client.timing(
+        'latency.{}.{}.{}.{}'.format(stage, notification_type, provider or NO_PROVIDER, priority or NORMAL),
+        elapsed_seconds * 1000
+    )
+
+
+def record_stage_since(stage, notification_type, since, provider=None, priority=None):
+    """
+    Records the time from since, a UTC datetime such as the notification's created_at, until now.
+    """
+    record_stage(stage, notification_type, (datetime.utcnow() - since).total_seconds(), provider, priority)
+
+
+def record_accept_stage(notification_type, priority=None):
+    """
+    Records the time since the start of the API request, if there is one.
+    """
+    if has_request_context() and 'start' in g:
+        record_stage(ACCEPT, notification_type, monotonic() - g.start, priority=priority)
+
+
+@contextmanager
+def timed_stage(stage, notification_type, provider=None, priority=None):
+    """
+    Records how long the block takes, unless it raises.
+    """
+    start = monotonic()
+    yield
+    record_stage(stage, notification_type, monotonic() - start, provider, priority)
+
+
+def notification_priority(notification):
+    return get_template_version(notification.template_id, notification.template_version)['process_type']
+
+
+def record_dequeue(notification):
+    record_stage_since(
+        DEQUEUE, notification.notification_type, notification.created_at, priority=notification_priority(notification)
+    )
+
+
+def record_receipt(notification):
+    if notification.sent_at:
+        record_stage_since(
+            RECEIPT,
+            notification.notification_type,
+            notification.sent_at,
+            provider=notification.sent_by,
+            priority=notification_priority(notification)
+        )
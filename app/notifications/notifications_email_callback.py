@@ -9,6 +9,7 @@ from app.errors import InvalidRequest, register_errors
 from app.clients.email.sendgrid_client import get_sendgrid_responses
 from app import statsd_client
 from app.dao import notifications_dao
+from app.notifications.latency import record_receipt
 
 email_callback_blueprint = Blueprint("email_callback", __name__, url_prefix="/notifications/email")
 register_errors(email_callback_blueprint)
@@ -37,6 +38,7 @@ def process_sendgrid_response():
             if notification.sent_at:
                 statsd_client.timing_with_dates(
                     'callback.sendgrid.elapsed-time', datetime.utcnow(), notification.sent_at)
+            record_receipt(notification)
 
     except Exception as e:
         current_app.logger.exception('Error processing SendGrid results: {}'.format(type(e)))
@@ -27,6 +27,7 @@ from app.dao.templates_dao import dao_get_template_by_id
 from app.models import NOTIFICATION_PENDING
 from app.dao.inbound_sms_keyword_dao import dao_create_inbound_sms_keyword
 from app.models import InboundSmsKeyword
+from app.notifications.latency import record_receipt
 
 sms_response_mapper = {
     'MMG': get_mmg_responses,
@@ -129,6 +130,7 @@ def _process_for_status(notification_status, client_name, provider_reference):
             datetime.utcnow(),
             notification.sent_at
         )
+    record_receipt(notification)
 
     if notification.billable_units == 0:
         service = notification.service
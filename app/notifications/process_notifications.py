@@ -1,4 +1,5 @@
 import uuid
+from collections import defaultdict
 from datetime import datetime
 
 from flask import current_app
@@ -11,7 +12,7 @@ from notifications_utils.recipients import (
 )
 from notifications_utils.timezones import convert_local_timezone_to_utc
 
-from app import redis_store
+from app import notify_celery, redis_store
 from app.celery import provider_tasks
 from app.celery.letters_pdf_tasks import create_letters_pdf
 from app.config import QueueNames
@@ -23,7 +24,9 @@ from app.models import (
     LETTER_TYPE,
     NOTIFICATION_CREATED,
     Notification,
-    ScheduledNotification
+    ScheduledNotification,
+    NORMAL,
+    PRIORITY
 )
 from app.dao.notifications_dao import (
     dao_create_notification,
@@ -31,6 +34,7 @@ from app.dao.notifications_dao import (
     dao_created_scheduled_notification
 )
 
+from app.notifications.latency import ENQUEUE, record_accept_stage, timed_stage
 from app.v2.errors import BadRequestError
 from app.utils import get_template_instance
 
@@ -124,25 +128,37 @@ def persist_notification(
     return notification
 
 
-def send_notification_to_queue(notification, research_mode, queue=None):
-    if research_mode or notification.key_type == KEY_TYPE_TEST:
+def _get_delivery_task_and_queue(notification_type, key_type, research_mode, queue=None):
+    if research_mode or key_type == KEY_TYPE_TEST:
         queue = QueueNames.RESEARCH_MODE
 
-    if notification.notification_type == SMS_TYPE:
+    if notification_type == SMS_TYPE:
         if not queue:
             queue = QueueNames.SEND_SMS
         deliver_task = provider_tasks.deliver_sms
-    if notification.notification_type == EMAIL_TYPE:
+    if notification_type == EMAIL_TYPE:
         if not queue:
             queue = QueueNames.SEND_EMAIL
         deliver_task = provider_tasks.deliver_email
-    if notification.notification_type == LETTER_TYPE:
+    if notification_type == LETTER_TYPE:
         if not queue:
             queue = QueueNames.CREATE_LETTERS_PDF
         deliver_task = create_letters_pdf
 
+    return deliver_task, queue
+
+
+def send_notification_to_queue(notification, research_mode, queue=None):
+    deliver_task, queue = _get_delivery_task_and_queue(
+        notification.notification_type, notification.key_type, research_mode, queue
+    )
+    # the API sends notifications of priority templates to the priority queue
+    priority = PRIORITY if queue == QueueNames.PRIORITY else NORMAL
+    record_accept_stage(notification.notification_type, priority=priority)
+
     try:
-        deliver_task.apply_async([str(notification.id)], queue=queue)
+        with timed_stage(ENQUEUE, notification.notification_type, priority=priority):
+            deliver_task.apply_async([str(notification.id)], queue=queue)
     except Exception:
         dao_delete_notifications_by_id(notification.id)
         raise
@@ -153,6 +169,24 @@ def send_notification_to_queue(notification, research_mode, queue=None):
                                                          queue))
 
 
+def send_notifications_to_queue_in_bulk(notifications):
+    """
+    Queue already persisted notifications for delivery. Each row needs id, notification_type, key_type
+    and research_mode. Tasks are published in one batch per delivery queue. Unlike
+    send_notification_to_queue, notifications are not deleted if publishing fails: they stay in the
+    database and are picked up again on the next run.
+    """
+    batches = defaultdict(list)
+    for notification in notifications:
+        batches[_get_delivery_task_and_queue(
+            notification.notification_type, notification.key_type, notification.research_mode
+        )].append([str(notification.id)])
+
+    for (deliver_task, queue), args_list in batches.items():
+        notify_celery.apply_async_many(deliver_task, args_list, queue=queue)
+        current_app.logger.debug("{} notifications sent to the {} queue for delivery".format(len(args_list), queue))
+
+
 def simulated_recipient(to_address, notification_type):
     if notification_type == SMS_TYPE:
         formatted_simulated_numbers = [
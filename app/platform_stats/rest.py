@@ -14,6 +14,7 @@ from app.dao.fact_billing_dao import (
 from app.dao.fact_notification_status_dao import fetch_notification_status_totals_for_all_services
 from app.errors import register_errors, InvalidRequest
 from app.platform_stats.platform_stats_schema import platform_stats_request
+from app.reporting_cache import cached_report
 from app.service.statistics import format_admin_stats
 from app.schema_validation import validate
 from app.utils import get_local_timezone_midnight_in_utc
@@ -24,6 +25,7 @@ register_errors(platform_stats_blueprint)
 
 
 @platform_stats_blueprint.route('')
+@cached_report('platform-stats')
 def get_platform_stats():
     if request.args:
         validate(request.args, platform_stats_request)
@@ -85,6 +87,7 @@ def isValidGUID(organisation_id):
 
 
 @platform_stats_blueprint.route('usage-for-all-services')
+@cached_report('usage-for-all-services')
 def get_usage_for_all_services():
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
@@ -140,6 +143,7 @@ def get_usage_for_all_services():
 
 
 @platform_stats_blueprint.route('usage-for-all-services-by-organisation')
+@cached_report('usage-for-all-services-by-organisation')
 def get_usage_for_all_services_by_organisation():
     organisation_id = request.args.get('organisation_id')
     start_date = request.args.get('start_date')
@@ -0,0 +1,38 @@
+"""
+Limits on the number of requests a worker process makes to each provider at the same time.
+
+Prefork workers make one provider request at a time. The eventlet delivery worker
+(scripts/run_celery_delivery.sh) handles many notifications at once on green threads and, without a limit,
+would open as many connections to a provider as it has green threads. PROVIDER_CONCURRENCY_LIMITS sets the
+number of requests in flight per provider, eg {"ses": 40, "sns": 20}; providers without a limit are only
+bounded by the worker concurrency. eventlet patches threading, so the semaphores are green.
+"""
+import threading
+from contextlib import contextmanager
+
+from flask import current_app
+
+_semaphores = {}
+_semaphores_lock = threading.Lock()
+
+
+def get_provider_semaphore(provider_name, limit):
+    key = (provider_name, limit)
+    semaphore = _semaphores.get(key)
+    if semaphore is None:
+        with _semaphores_lock:
+            semaphore = _semaphores.setdefault(key, threading.BoundedSemaphore(limit))
+    return semaphore
+
+
+@contextmanager
+def provider_request_slot(provider_name):
+    """
+    Waits until fewer than the limit of requests to provider_name are in flight in this process.
+    """
+    limit = current_app.config['PROVIDER_CONCURRENCY_LIMITS'].get(provider_name)
+    if not limit:
+        yield
+        return
+    with get_provider_semaphore(provider_name, limit):
+        yield
@@ -0,0 +1,139 @@
+"""
+Weighted load balancing of sms traffic across providers.
+
+SMS_PROVIDER_WEIGHTS sets the share of traffic each provider gets, eg `{"sns": 70, "pinpoint": 30}`. When it
+is empty sms is routed to the first active provider by priority, as before.
+
+Every send records its outcome and response time in per minute buckets in redis. The
+`adjust-sms-provider-weights` task turns the last few minutes of those into effective weights: providers
+that fail or answer slowly get less traffic, down to SMS_LOAD_BALANCING_MIN_SHARE of their configured weight
+so that we notice when they recover.
+"""
+import json
+import random
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from app import redis_store
+from app.provider_details.routing import SMS_PROVIDER_WEIGHTS_KEY, invalidate_provider_routing
+
+SMS_PROVIDER_WEIGHTS_EXPIRY = 10 * 60  # seconds, the base weights are used if the task stops running
+
+
+def sms_provider_health_key(identifier, minute):
+    return 'sms-provider-health-{}-{}'.format(identifier, minute.strftime('%Y%m%d%H%M'))
+
+
+def sms_load_balancing_enabled():
+    return bool(current_app.config['SMS_PROVIDER_WEIGHTS'])
+
+
+def choose_weighted_provider(identifiers, weights):
+    """
+    Pick one of the identifiers at random in proportion to its weight. Identifiers without a weight only get
+    traffic when none of the others have one, in which case the first (highest priority) is used.
+    """
+    weighted = [(identifier, weights.get(identifier, 0)) for identifier in identifiers]
+    weighted = [(identifier, weight) for identifier, weight in weighted if weight > 0]
+    if not weighted:
+        return identifiers[0]
+    return random.choices(
+        [identifier for identifier, _ in weighted],
+        weights=[weight for _, weight in weighted]
+    )[0]
+
+
+def providers_allowed_for_sender(sender, identifiers):
+    """
+    Some senders are only registered with some providers, see SMS_SENDER_PROVIDERS. Returns the identifiers
+    the sender can be sent from, keeping their order, which is empty if none of its providers are active.
+    """
+    allowed = current_app.config['SMS_SENDER_PROVIDERS'].get(sender)
+    if not allowed:
+        return identifiers
+    allowed_identifiers = [identifier for identifier in identifiers if identifier in allowed]
+    if not allowed_identifiers:
+        current_app.logger.error("None of the providers {} of sender {} are active".format(allowed, sender))
+    return allowed_identifiers
+
+
+def record_sms_provider_response(identifier, elapsed_ms, success):
+    if not redis_store.active:
+        return
+    key = sms_provider_health_key(identifier, datetime.utcnow())
+    try:
+        pipe = redis_store.redis_store.pipeline()
+        pipe.hincrby(key, 'requests', 1)
+        if success:
+            pipe.hincrby(key, 'elapsed_ms', int(elapsed_ms))
+        else:
+            pipe.hincrby(key, 'errors', 1)
+        pipe.expire(key, (current_app.config['SMS_LOAD_BALANCING_WINDOW'] + 1) * 60)
+        pipe.execute()
+    except Exception:
+        current_app.logger.exception("Redis error recording sms provider response for {}".format(identifier))
+
+
+def get_sms_provider_health(identifier):
+    """
+    Requests, errors and total response time of successful requests over the last SMS_LOAD_BALANCING_WINDOW
+    minutes.
+    """
+    health = {'requests': 0, 'errors': 0, 'elapsed_ms': 0}
+    if not redis_store.active:
+        return health
+
+    now = datetime.utcnow()
+    try:
+        pipe = redis_store.redis_store.pipeline()
+        for minutes_ago in range(current_app.config['SMS_LOAD_BALANCING_WINDOW']):
+            pipe.hgetall(sms_provider_health_key(identifier, now - timedelta(minutes=minutes_ago)))
+        buckets = pipe.execute()
+    except Exception:
+        current_app.logger.exception("Redis error reading sms provider health for {}".format(identifier))
+        return health
+
+    for bucket in buckets:
+        for field, value in bucket.items():
+            field = field.decode('utf-8') if isinstance(field, bytes) else field
+            health[field] += int(value)
+    return health
+
+
+def effective_weight(base_weight, health):
+    if health['requests'] < current_app.config['SMS_LOAD_BALANCING_MIN_REQUESTS']:
+        return base_weight
+
+    factor = 1 - health['errors'] / health['requests']
+
+    successes = health['requests'] - health['errors']
+    target_latency = current_app.config['SMS_LOAD_BALANCING_TARGET_LATENCY']
+    if successes:
+        average_latency = health['elapsed_ms'] / successes
+        if average_latency > target_latency:
+            factor *= target_latency / average_latency
+
+    factor = max(factor, current_app.config['SMS_LOAD_BALANCING_MIN_SHARE'])
+    return round(base_weight * factor, 2)
+
+
+def adjust_sms_provider_weights():
+    """
+    Recompute the effective weights from live provider health and share them with every process.
+    """
+    base_weights = current_app.config['SMS_PROVIDER_WEIGHTS']
+    weights = {
+        identifier: effective_weight(base_weight, get_sms_provider_health(identifier))
+        for identifier, base_weight in base_weights.items()
+    }
+
+    redis_store.set(SMS_PROVIDER_WEIGHTS_KEY, json.dumps(weights), ex=SMS_PROVIDER_WEIGHTS_EXPIRY)
+    invalidate_provider_routing()
+
+    for identifier, weight in weights.items():
+        if weight != base_weights[identifier]:
+            current_app.logger.warning("SMS provider {} weight reduced from {} to {}".format(
+                identifier, base_weights[identifier], weight
+            ))
+    return weights
@@ -8,6 +8,7 @@ from app.dao.provider_details_dao import (
     dao_get_provider_versions
 )
 from app.dao.users_dao import get_user_by_id
+from app.provider_details.routing import get_provider_routing_status
 from app.errors import (
     register_errors,
     InvalidRequest
@@ -38,6 +39,11 @@ def get_providers():
     return jsonify(provider_details=provider_details)
 
 
+@provider_details.route('/routing', methods=['GET'])
+def get_provider_routing():
+    return jsonify(get_provider_routing_status())
+
+
 @provider_details.route('/<uuid:provider_details_id>', methods=['GET'])
 def get_provider_by_id(provider_details_id):
     data = provider_details_schema.dump(get_provider_details_by_id(provider_details_id)).data
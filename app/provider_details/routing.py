@@ -0,0 +1,112 @@
+"""
+In-memory routing table of the active providers for each notification type, in priority order.
+
+`provider_to_use` runs for every sms and email we send, so rather than querying provider_details each
+time the table is loaded once and reused until PROVIDER_ROUTING_REFRESH_INTERVAL seconds have passed.
+Changes made through `dao_update_provider_details` invalidate it straight away: locally, and in other
+processes through a version number kept in redis.
+
+The table also carries the sms load balancing weights, see app/provider_details/load_balancing.py.
+"""
+import json
+import threading
+import time
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import asc
+
+from app import db, redis_store
+from app.models import ProviderDetails
+
+PROVIDER_ROUTING_VERSION_KEY = 'provider-routing-version'
+SMS_PROVIDER_WEIGHTS_KEY = 'sms-provider-weights'
+
+
+class ProviderRoutingTable:
+
+    def __init__(self):
+        self.routes = None
+        self.weights = {}
+        self.loaded_at = None
+        self.expires_at = 0
+        self.version = None
+        self.lock = threading.Lock()
+
+    def get_active_providers(self, notification_type, international=False):
+        routes = self.routes
+        version = redis_store.get(PROVIDER_ROUTING_VERSION_KEY)
+        if routes is None or time.monotonic() >= self.expires_at or version != self.version:
+            routes = self.refresh(version)
+
+        return routes.get(notification_type, {}).get('international' if international else 'domestic', [])
+
+    def refresh(self, version=None):
+        with self.lock:
+            providers = db.session.query(
+                ProviderDetails.identifier,
+                ProviderDetails.notification_type,
+                ProviderDetails.supports_international,
+            ).filter(
+                ProviderDetails.active
+            ).order_by(
+                asc(ProviderDetails.priority)
+            ).all()
+
+            routes = {}
+            for provider in providers:
+                route = routes.setdefault(provider.notification_type, {'domestic': [], 'international': []})
+                route['domestic'].append(provider.identifier)
+                if provider.supports_international:
+                    route['international'].append(provider.identifier)
+
+            self.routes = routes
+            self.weights = _load_sms_provider_weights()
+            self.loaded_at = datetime.utcnow()
+            self.expires_at = time.monotonic() + current_app.config['PROVIDER_ROUTING_REFRESH_INTERVAL']
+            self.version = version
+            return routes
+
+    def invalidate(self):
+        self.routes = None
+        self.expires_at = 0
+
+    def status(self):
+        return {
+            'routing': self.routes,
+            'weights': self.weights,
+            'loaded_at': self.loaded_at.isoformat() if self.routes is not None else None,
+            'refresh_interval': current_app.config['PROVIDER_ROUTING_REFRESH_INTERVAL'],
+        }
+
+
+provider_routing = ProviderRoutingTable()
+
+
+def get_active_providers(notification_type, international=False):
+    return provider_routing.get_active_providers(notification_type, international)
+
+
+def get_sms_provider_weights():
+    """
+    The weights loaded with the routing table the last time `get_active_providers` refreshed it.
+    """
+    return provider_routing.weights
+
+
+def invalidate_provider_routing():
+    provider_routing.invalidate()
+    redis_store.incr(PROVIDER_ROUTING_VERSION_KEY)
+
+
+def get_provider_routing_status():
+    if provider_routing.routes is None:
+        provider_routing.refresh(redis_store.get(PROVIDER_ROUTING_VERSION_KEY))
+    return provider_routing.status()
+
+
+def _load_sms_provider_weights():
+    weights = redis_store.get(SMS_PROVIDER_WEIGHTS_KEY)
+    if weights:
+        return json.loads(weights)
+    return dict(current_app.config['SMS_PROVIDER_WEIGHTS'])
@@ -0,0 +1,68 @@
+"""
+Read-through cache for the platform-wide reporting endpoints.
+
+Responses are kept in redis, keyed by the report name and its request parameters. Every key
+also carries a generation number which the nightly reporting tasks increment once they have
+rebuilt ft_billing or ft_notification_status, so cached reports never outlive the facts they
+were built from. Reports that include today are only cached for a short time, as today's
+figures keep changing.
+"""
+import functools
+from datetime import datetime
+
+from flask import current_app, request, Response
+
+from app import redis_store
+
+REPORTING_CACHE_GENERATION_KEY = 'reporting-cache-generation'
+
+
+def reporting_cache_key(name, params):
+    generation = redis_store.get(REPORTING_CACHE_GENERATION_KEY)
+    generation = int(generation) if generation else 0
+    return 'reporting-{}-{}-{}'.format(
+        generation,
+        name,
+        '&'.join('{}={}'.format(key, value) for key, value in sorted(params.items()))
+    )
+
+
+def invalidate_reporting_cache():
+    redis_store.incr(REPORTING_CACHE_GENERATION_KEY)
+
+
+def includes_today(params):
+    today = str(datetime.utcnow().date())
+    return params.get('start_date', today) <= today <= params.get('end_date', today)
+
+
+def get_cached_report(name, params, build_report, ttl=None):
+    """
+    The JSON response for the report name with request parameters params, from the cache or
+    from build_report, a function that returns a flask response. Unless ttl is given, it is
+    kept for longer when the report does not include today.
+    """
+    key = reporting_cache_key(name, params)
+    cached = redis_store.get(key)
+    if cached:
+        return Response(cached, mimetype='application/json')
+
+    response = build_report()
+    if response.status_code == 200:
+        if ttl is None:
+            ttl = current_app.config['REPORTING_CACHE_TODAY_TTL'] if includes_today(params) \
+                else current_app.config['REPORTING_CACHE_TTL']
+        redis_store.set(key, response.get_data(), ex=ttl)
+    return response
+
+
+def cached_report(name):
+    """
+    Caches the response of a reporting view by its query string.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            return get_cached_report(name, request.args.to_dict(), lambda: view(*args, **kwargs))
+        return wrapper
+    return decorator
@@ -628,6 +628,7 @@ class NotificationsFilterSchema(ma.Schema):
     to = fields.String()
     include_one_off = fields.Boolean(required=False)
     count_pages = fields.Boolean(required=False)
+    approximate_count = fields.Boolean(required=False)
 
     @pre_load
     def handle_multidict(self, in_data):
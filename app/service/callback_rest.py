@@ -5,6 +5,7 @@ from flask import (
 )
 from sqlalchemy.exc import SQLAlchemyError
 
+from app.callback_circuit_breaker import get_circuit_breaker_status
 from app.errors import (
     register_errors,
     InvalidRequest
@@ -117,7 +118,21 @@ def update_service_callback_api(service_id, callback_api_id):
 def fetch_service_callback_api(service_id, callback_api_id):
     callback_api = get_service_callback_api(callback_api_id, service_id)
 
-    return jsonify(data=callback_api.serialize()), 200
+    return jsonify(
+        data=callback_api.serialize(),
+        circuit_breaker=get_circuit_breaker_status(callback_api.url, service_id)
+    ), 200
+
+
+@service_callback_blueprint.route('/delivery-receipt-api/<uuid:callback_api_id>/circuit-breaker', methods=["GET"])
+def fetch_service_callback_api_circuit_breaker(service_id, callback_api_id):
+    callback_api = get_service_callback_api(callback_api_id, service_id)
+
+    if not callback_api:
+        error = 'Service delivery receipt callback API not found'
+        raise InvalidRequest(error, status_code=404)
+
+    return jsonify(data=get_circuit_breaker_status(callback_api.url, service_id)), 200
 
 
 @service_callback_blueprint.route('/delivery-receipt-api/<uuid:callback_api_id>', methods=['DELETE'])
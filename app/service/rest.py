@@ -5,7 +5,9 @@ from flask import (
     jsonify,
     request,
     current_app,
-    Blueprint
+    Blueprint,
+    Response,
+    stream_with_context
 )
 from notifications_utils.letter_timings import letter_can_be_cancelled
 from notifications_utils.timezones import convert_utc_to_local_timezone
@@ -91,6 +93,7 @@ from app.models import (
     EmailBranding, LetterBranding
 )
 from app.notifications.process_notifications import persist_notification, send_notification_to_queue
+from app.reporting_cache import get_cached_report
 from app.schema_validation import validate
 from app.service import statistics
 from app.service.service_data_retention_schema import (
@@ -102,7 +105,7 @@ from app.service.service_senders_schema import (
     add_service_letter_contact_block_request,
     add_service_sms_sender_request
 )
-from app.service.utils import get_safelist_objects
+from app.service.utils import get_safelist_objects, notifications_csv
 from app.service.sender import send_notification_to_service_users
 from app.service.send_notification import send_one_off_notification, send_pdf_letter_notification
 from app.schemas import (
@@ -114,7 +117,7 @@ from app.schemas import (
     email_data_request_schema
 )
 from app.user.users_schema import post_set_permissions_schema
-from app.utils import pagination_links
+from app.utils import keyset_pagination_links, pagination_links
 
 from app.smtp.aws import (smtp_add, smtp_get_user_key, smtp_remove)
 from nanoid import generate
@@ -159,11 +162,12 @@ def get_services():
     if user_id:
         services = dao_fetch_all_services_by_user(user_id, only_active)
     elif detailed:
-        result = jsonify(data=get_detailed_services(start_date=start_date, end_date=end_date,
-                                                    only_active=only_active,
-                                                    include_from_test_key=include_from_test_key
-                                                    ))
-        return result
+        return get_cached_report('detailed-services', request.args.to_dict(), lambda: jsonify(
+            data=get_detailed_services(start_date=start_date, end_date=end_date,
+                                       only_active=only_active,
+                                       include_from_test_key=include_from_test_key
+                                       )
+        ))
     else:
         services = dao_fetch_all_services(only_active)
     data = service_schema.dump(services, many=True).data
@@ -183,8 +187,11 @@ def find_services_by_name():
 
 @service_blueprint.route('/live-services-data', methods=['GET'])
 def get_live_services_data():
-    data = dao_fetch_live_services_data()
-    return jsonify(data=data)
+    return get_cached_report(
+        'live-services-data', {},
+        lambda: jsonify(data=dao_fetch_live_services_data()),
+        ttl=current_app.config['REPORTING_CACHE_TTL']
+    )
 
 
 @service_blueprint.route('/<uuid:service_id>', methods=['GET'])
@@ -381,7 +388,9 @@ def get_all_notifications_for_service(service_id):
         return search_for_notification_by_to_field(service_id=service_id,
                                                    search_term=data['to'],
                                                    statuses=data.get('status'),
-                                                   notification_type=notification_type)
+                                                   notification_type=notification_type,
+                                                   page_size=data.get('page_size'),
+                                                   older_than=data.get('older_than'))
     page = data['page'] if 'page' in data else 1
     page_size = data['page_size'] if 'page_size' in data else current_app.config.get('PAGE_SIZE')
     limit_days = data.get('limit_days')
@@ -390,6 +399,7 @@ def get_all_notifications_for_service(service_id):
     include_one_off = data.get('include_one_off', True)
 
     count_pages = data.get('count_pages', True)
+    older_than = data.get('older_than')
 
     pagination = notifications_dao.get_notifications_for_service(
         service_id,
@@ -400,12 +410,21 @@ def get_all_notifications_for_service(service_id):
         limit_days=limit_days,
         include_jobs=include_jobs,
         include_from_test_key=include_from_test_key,
-        include_one_off=include_one_off
+        include_one_off=include_one_off,
+        older_than=older_than,
+        approximate_count=data.get('approximate_count', False)
     )
 
     kwargs = request.args.to_dict()
     kwargs['service_id'] = service_id
 
+    if older_than:
+        links = keyset_pagination_links(
+            pagination.items, page_size, '.get_all_notifications_for_service', **kwargs
+        )
+    else:
+        links = pagination_links(pagination, '.get_all_notifications_for_service', **kwargs)
+
     if data.get('format_for_csv'):
         notifications = [notification.serialize_for_csv() for notification in pagination.items]
     else:
@@ -414,14 +433,31 @@ def get_all_notifications_for_service(service_id):
         notifications=notifications,
         page_size=page_size,
         total=pagination.total,
-        links=pagination_links(
-            pagination,
-            '.get_all_notifications_for_service',
-            **kwargs
-        )
+        links=links
     ), 200
 
 
+@service_blueprint.route('/<uuid:service_id>/notifications.csv', methods=['GET'])
+def get_notifications_for_service_as_csv(service_id):
+    data = notifications_filter_schema.load(request.args).data
+
+    rows = notifications_dao.dao_stream_notifications_for_service_for_csv(
+        service_id,
+        filter_dict=data,
+        limit_days=data.get('limit_days'),
+        include_jobs=data.get('include_jobs', True),
+        include_from_test_key=data.get('include_from_test_key', False),
+        include_one_off=data.get('include_one_off', True),
+        chunk_size=current_app.config['NOTIFICATIONS_CSV_CHUNK_SIZE']
+    )
+    # the session, and the cursor the rows are read from, must outlive the request handler
+    return Response(
+        stream_with_context(notifications_csv(rows)),
+        mimetype='text/csv',
+        headers={'Content-Disposition': 'attachment; filename="notifications.csv"'}
+    )
+
+
 @service_blueprint.route('/<uuid:service_id>/notifications/<uuid:notification_id>', methods=['GET'])
 def get_notification_for_service(service_id, notification_id):
 
@@ -460,15 +496,23 @@ def cancel_notification_for_service(service_id, notification_id):
     ), 200
 
 
-def search_for_notification_by_to_field(service_id, search_term, statuses, notification_type):
+def search_for_notification_by_to_field(
+    service_id, search_term, statuses, notification_type, page_size=None, older_than=None
+):
+    page_size = page_size or current_app.config.get('PAGE_SIZE')
     results = notifications_dao.dao_get_notifications_by_to_field(
         service_id=service_id,
         search_term=search_term,
         statuses=statuses,
-        notification_type=notification_type
+        notification_type=notification_type,
+        page_size=page_size,
+        older_than=older_than
     )
+    kwargs = request.args.to_dict()
+    kwargs['service_id'] = service_id
     return jsonify(
-        notifications=notification_with_template_schema.dump(results, many=True).data
+        notifications=notification_with_template_schema.dump(results, many=True).data,
+        links=keyset_pagination_links(results, page_size, '.get_all_notifications_for_service', **kwargs)
     ), 200
 
 
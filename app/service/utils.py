@@ -1,11 +1,19 @@
+import csv
+import io
 import itertools
 
 from notifications_utils.recipients import allowed_to_send_to
+from notifications_utils.timezones import convert_utc_to_local_timezone
 
 from app.models import (
     ServiceSafelist,
     MOBILE_TYPE, EMAIL_TYPE,
-    KEY_TYPE_TEST, KEY_TYPE_TEAM, KEY_TYPE_NORMAL)
+    KEY_TYPE_TEST, KEY_TYPE_TEAM, KEY_TYPE_NORMAL,
+    format_notification_status)
+
+NOTIFICATIONS_CSV_HEADER = [
+    'Row number', 'Recipient', 'Template', 'Type', 'Sent by', 'Sent by email', 'Job', 'Status', 'Time'
+]
 
 
 def get_recipients_from_request(request_json, key, type):
@@ -52,3 +60,32 @@ def service_allowed_to_send_to(recipient, service, key_type, allow_safelisted_re
                 safelist_members
             )
         )
+
+
+def notifications_csv(rows, rows_per_chunk=1000):
+    """
+    The CSV export of rows from dao_stream_notifications_for_service_for_csv, in chunks of text of rows_per_chunk
+    rows, formatted like Notification.serialize_for_csv.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(NOTIFICATIONS_CSV_HEADER)
+
+    for index, row in enumerate(rows, start=1):
+        writer.writerow([
+            '' if row.job_row_number is None else row.job_row_number + 1,
+            row.recipient,
+            row.template_name,
+            row.template_type,
+            row.created_by_name or '',
+            row.created_by_email_address or '',
+            row.job_name or '',
+            format_notification_status(row.template_type, row.status),
+            convert_utc_to_local_timezone(row.created_at).strftime("%Y-%m-%d %H:%M:%S"),
+        ])
+        if index % rows_per_chunk == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue()
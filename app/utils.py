@@ -22,6 +22,15 @@ def pagination_links(pagination, endpoint, **kwargs):
     return links
 
 
+def keyset_pagination_links(items, page_size, endpoint, **kwargs):
+    kwargs.pop('page', None)
+    kwargs.pop('older_than', None)
+    links = {}
+    if items and len(items) == page_size:
+        links['next'] = url_for(endpoint, older_than=items[-1].id, **kwargs)
+    return links
+
+
 def url_with_token(data, url, config, base_url=None):
     from notifications_utils.url_safe_token import generate_token
     token = generate_token(data, config['SECRET_KEY'], config['DANGEROUS_SALT'])
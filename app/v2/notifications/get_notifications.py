@@ -80,6 +80,7 @@ def get_notifications():
         older_than=data.get('older_than'),
         client_reference=data.get('reference'),
         page_size=current_app.config.get('API_PAGE_SIZE'),
+        count_pages=False,
         include_jobs=data.get('include_jobs')
     )
 
@@ -0,0 +1,30 @@
+"""
+
+Revision ID: 0311_scheduler_partial_indexes
+Revises: 0310c_add_shortnumber_keyword
+Create Date: 2021-01-05 10:00:00
+
+"""
+from alembic import op
+
+revision = '0311_scheduler_partial_indexes'
+down_revision = '0310c_add_shortnumber_keyword'
+
+
+def upgrade():
+    # built concurrently so jobs and scheduled notifications can still be written to meanwhile
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_scheduled_notifications_scheduled_for_pending "
+            "ON scheduled_notifications (scheduled_for) WHERE pending"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_jobs_scheduled_for_pending "
+            "ON jobs (scheduled_for) WHERE job_status = 'scheduled'"
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_jobs_scheduled_for_pending")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_scheduled_notifications_scheduled_for_pending")
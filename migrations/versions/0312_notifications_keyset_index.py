@@ -0,0 +1,32 @@
+"""
+
+Revision ID: 0312_notifications_keyset_index
+Revises: 0311_scheduler_partial_indexes
+Create Date: 2021-01-12 10:00:00
+
+"""
+from alembic import op
+
+revision = '0312_notifications_keyset_index'
+down_revision = '0311_scheduler_partial_indexes'
+
+
+def upgrade():
+    # the id makes the index match the (created_at, id) keyset the notifications of a service are paged with,
+    # it replaces ix_notifications_service_created_at for everything else. Both are done concurrently so
+    # notifications can still be written to, and the old index is only dropped once the new one exists.
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_notifications_service_created_at_id "
+            "ON notifications (service_id, created_at, id)"
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_notifications_service_created_at")
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_notifications_service_created_at "
+            "ON notifications (service_id, created_at)"
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_notifications_service_created_at_id")
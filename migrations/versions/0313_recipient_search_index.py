@@ -0,0 +1,35 @@
+"""
+
+Revision ID: 0313_recipient_search_index
+Revises: 0312_notifications_keyset_index
+Create Date: 2021-01-19 10:00:00
+
+"""
+from alembic import op
+
+revision = '0313_recipient_search_index'
+down_revision = '0312_notifications_keyset_index'
+
+
+def upgrade():
+    # creating an extension needs a privileged role
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # the trigram index in particular takes long to build, both are built concurrently so that notifications
+    # can still be written to meanwhile
+    with op.get_context().autocommit_block():
+        # searches for a full phone number or email address
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_notifications_service_id_normalised_to "
+            "ON notifications (service_id, normalised_to)"
+        )
+        # searches for part of one, normalised_to LIKE '%term%'
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_notifications_normalised_to_trgm "
+            "ON notifications USING gin (normalised_to gin_trgm_ops)"
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_notifications_normalised_to_trgm")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_notifications_service_id_normalised_to")
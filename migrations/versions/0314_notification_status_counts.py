@@ -0,0 +1,54 @@
+"""
+
+Revision ID: 0314_notification_status_counts
+Revises: 0313_recipient_search_index
+Create Date: 2021-01-26 10:00:00
+
+"""
+import os
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = '0314_notification_status_counts'
+down_revision = '0313_recipient_search_index'
+
+
+def upgrade():
+    op.create_table(
+        'notification_status_counts',
+        sa.Column('bst_date', sa.Date(), nullable=False),
+        sa.Column('service_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('template_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('notification_type', sa.Text(), nullable=False),
+        sa.Column('key_type', sa.Text(), nullable=False),
+        sa.Column('notification_status', sa.Text(), nullable=False),
+        sa.Column('notification_count', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint(
+            'bst_date', 'service_id', 'template_id', 'notification_type', 'key_type', 'notification_status'
+        )
+    )
+    # the counts start from what is already in notifications for today and yesterday, the
+    # 'reconcile-notification-status-counts' task corrects anything created while this runs
+    op.execute("""
+        INSERT INTO notification_status_counts (
+            bst_date, service_id, template_id, notification_type, key_type, notification_status,
+            notification_count, created_at
+        )
+        SELECT
+            (created_at AT TIME ZONE 'UTC' AT TIME ZONE '{timezone}')::date,
+            service_id, template_id, notification_type::text, key_type, notification_status,
+            count(*), now() AT TIME ZONE 'UTC'
+        FROM notifications
+        WHERE created_at >= (date_trunc('day', now() AT TIME ZONE '{timezone}') - interval '1 day')
+            AT TIME ZONE '{timezone}' AT TIME ZONE 'UTC'
+        AND notification_status IS NOT NULL
+        GROUP BY 1, 2, 3, 4, 5, 6
+    """.format(timezone=os.getenv("TIMEZONE", "America/Toronto")))
+
+
+def downgrade():
+    op.drop_table('notification_status_counts')
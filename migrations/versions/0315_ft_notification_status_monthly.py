@@ -0,0 +1,52 @@
+"""
+
+Revision ID: 0315_ft_notification_status_monthly
+Revises: 0314_notification_status_counts
+Create Date: 2021-02-02 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = '0315_ft_notification_status_monthly'
+down_revision = '0314_notification_status_counts'
+
+
+def upgrade():
+    op.create_table(
+        'ft_notification_status_monthly',
+        sa.Column('month', sa.Date(), nullable=False),
+        sa.Column('template_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('service_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('notification_type', sa.Text(), nullable=False),
+        sa.Column('key_type', sa.Text(), nullable=False),
+        sa.Column('notification_status', sa.Text(), nullable=False),
+        sa.Column('notification_count', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint(
+            'month', 'template_id', 'service_id', 'notification_type', 'key_type', 'notification_status'
+        )
+    )
+    op.create_index(
+        'ix_ft_notification_status_monthly_service_id_month',
+        'ft_notification_status_monthly',
+        ['service_id', 'month']
+    )
+    op.execute("""
+        INSERT INTO ft_notification_status_monthly (
+            month, template_id, service_id, notification_type, key_type, notification_status,
+            notification_count, created_at
+        )
+        SELECT
+            date_trunc('month', bst_date)::date, template_id, service_id, notification_type, key_type,
+            notification_status, sum(notification_count), now() AT TIME ZONE 'UTC'
+        FROM ft_notification_status
+        GROUP BY 1, 2, 3, 4, 5, 6
+    """)
+
+
+def downgrade():
+    op.drop_index('ix_ft_notification_status_monthly_service_id_month', table_name='ft_notification_status_monthly')
+    op.drop_table('ft_notification_status_monthly')
@@ -0,0 +1,58 @@
+"""
+
+Revision ID: 0316_ft_billing_sms_cumulative
+Revises: 0315_ft_notification_status_monthly
+Create Date: 2021-02-09 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = '0316_ft_billing_sms_cumulative'
+down_revision = '0315_ft_notification_status_monthly'
+
+
+def upgrade():
+    op.create_table(
+        'ft_billing_sms_cumulative',
+        sa.Column('service_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('bst_date', sa.Date(), nullable=False),
+        sa.Column('financial_year_start', sa.Integer(), nullable=False),
+        sa.Column('billable_units', sa.BigInteger(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('service_id', 'bst_date')
+    )
+    op.create_index(
+        'ix_ft_billing_sms_cumulative_year_service_id_bst_date',
+        'ft_billing_sms_cumulative',
+        ['financial_year_start', 'service_id', 'bst_date']
+    )
+    op.execute("""
+        INSERT INTO ft_billing_sms_cumulative (service_id, bst_date, financial_year_start, billable_units, created_at)
+        SELECT
+            service_id,
+            bst_date,
+            financial_year_start,
+            sum(sum(billable_units * rate_multiplier)) OVER (
+                PARTITION BY service_id, financial_year_start ORDER BY bst_date
+            ),
+            now() AT TIME ZONE 'UTC'
+        FROM (
+            SELECT
+                service_id,
+                bst_date,
+                billable_units,
+                rate_multiplier,
+                (extract(year FROM bst_date - interval '3 months'))::integer AS financial_year_start
+            FROM ft_billing
+            WHERE notification_type = 'sms'
+        ) AS sms_billing
+        GROUP BY service_id, bst_date, financial_year_start
+    """)
+
+
+def downgrade():
+    op.drop_index('ix_ft_billing_sms_cumulative_year_service_id_bst_date', table_name='ft_billing_sms_cumulative')
+    op.drop_table('ft_billing_sms_cumulative')
@@ -0,0 +1,55 @@
+"""
+
+Revision ID: 0317_notification_composite_indexes
+Revises: 0316_ft_billing_sms_cumulative
+Create Date: 2021-02-16 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0317_notification_composite_indexes'
+down_revision = '0316_ft_billing_sms_cumulative'
+
+IN_FLIGHT = sa.text("notification_status IN ('created', 'sending', 'pending')")
+
+
+def upgrade():
+    # notifications and notification_history are too busy to be locked while the indexes are built.
+    # notifications (service_id, created_at) is already served by ix_notifications_service_created_at_id, and
+    # ix_notification_history_service_id_created_at is taken by the (service_id, date(created_at)) index of 0050
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_notification_history_service_created_at',
+            'notification_history',
+            ['service_id', 'created_at'],
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_notifications_job_id_job_row_number',
+            'notifications',
+            ['job_id', 'job_row_number'],
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_notifications_notification_status_created_at_in_flight',
+            'notifications',
+            ['notification_status', 'created_at'],
+            postgresql_where=IN_FLIGHT,
+            postgresql_concurrently=True
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_notifications_notification_status_created_at_in_flight',
+            table_name='notifications',
+            postgresql_concurrently=True
+        )
+        op.drop_index('ix_notifications_job_id_job_row_number', table_name='notifications', postgresql_concurrently=True)
+        op.drop_index(
+            'ix_notification_history_service_created_at',
+            table_name='notification_history',
+            postgresql_concurrently=True
+        )
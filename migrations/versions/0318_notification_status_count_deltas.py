@@ -0,0 +1,42 @@
+"""
+
+Revision ID: 0318_notification_status_count_deltas
+Revises: 0317_notification_composite_indexes
+Create Date: 2021-02-23 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = '0318_notification_status_count_deltas'
+down_revision = '0317_notification_composite_indexes'
+
+
+def upgrade():
+    op.create_table(
+        'notification_status_count_deltas',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('bst_date', sa.Date(), nullable=False),
+        sa.Column('service_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('template_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('notification_type', sa.Text(), nullable=False),
+        sa.Column('key_type', sa.Text(), nullable=False),
+        sa.Column('notification_status', sa.Text(), nullable=False),
+        sa.Column('notification_count', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'ix_notification_status_count_deltas_service_id_bst_date',
+        'notification_status_count_deltas',
+        ['service_id', 'bst_date']
+    )
+
+
+def downgrade():
+    op.drop_index(
+        'ix_notification_status_count_deltas_service_id_bst_date',
+        table_name='notification_status_count_deltas'
+    )
+    op.drop_table('notification_status_count_deltas')
@@ -0,0 +1,157 @@
+"""
+
+A simulation comparing the delivery throughput per GB of memory of prefork workers and of the eventlet
+delivery worker (scripts/run_celery_delivery.sh) model.
+
+Nothing is delivered: no provider client, celery task or database query runs, so the results say nothing
+about the psycopg2 wait callback or the real provider clients under eventlet. They only show how the two concurrency
+models compare when provider latency dominates. Measure a real worker before drawing conclusions about it.
+
+Each message is a provider request simulated by --latency milliseconds of sleeping, after --cpu milliseconds
+of busy work standing in for loading, rendering and encoding. Prefork workers handle one message at a time in
+each of --processes processes; the eventlet worker handles up to --concurrency messages at a time in a single
+process, with at most --provider-limit requests in flight to the provider. Memory is the sum of the peak
+resident size of the worker processes.
+
+With --app, each worker process creates the notification app first, as celery workers do, so that memory
+includes its footprint, and the eventlet worker limits requests with app/provider_details/concurrency.py.
+Messages are still simulated.
+
+Usage:
+    scripts/benchmark_delivery_workers.py [options]
+
+Options:
+    --messages=<n>        messages to deliver [default: 2000]
+    --latency=<ms>        provider latency [default: 150]
+    --cpu=<ms>            work per message [default: 2]
+    --processes=<n>       prefork worker processes [default: 4]
+    --concurrency=<n>     eventlet green threads [default: 100]
+    --provider-limit=<n>  requests in flight to the provider, the concurrency if not set
+    --app                 create the notification app in each worker process
+
+Example:
+    scripts/benchmark_delivery_workers.py --messages=2000 --latency=150 --cpu=2 --processes=4 --concurrency=100
+"""
+import multiprocessing
+import os
+import resource
+import sys
+import time
+from contextlib import contextmanager
+
+from docopt import docopt
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+
+def create_app():
+    from flask import Flask
+    from app import create_app
+
+    application = Flask('delivery')
+    create_app(application)
+    application.app_context().push()
+    return application
+
+
+def deliver(latency, cpu):
+    end = time.perf_counter() + cpu
+    while time.perf_counter() < end:
+        pass
+    time.sleep(latency)
+
+
+def prefork_worker(messages, latency, cpu, with_app, connection):
+    if with_app:
+        create_app()
+    connection.send('ready')
+    connection.recv()
+    for _ in range(messages):
+        deliver(latency, cpu)
+    connection.send(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+def eventlet_worker(messages, latency, cpu, concurrency, provider_limit, with_app, connection):
+    import eventlet
+    eventlet.monkey_patch()
+    import threading
+
+    if with_app:
+        application = create_app()
+        application.config['PROVIDER_CONCURRENCY_LIMITS'] = {'ses': provider_limit}
+        from app.provider_details.concurrency import provider_request_slot
+    else:
+        semaphore = threading.BoundedSemaphore(provider_limit)
+
+        @contextmanager
+        def provider_request_slot(provider_name):
+            with semaphore:
+                yield
+
+    def deliver_with_slot(_):
+        with provider_request_slot('ses'):
+            deliver(latency, cpu)
+
+    connection.send('ready')
+    connection.recv()
+    pool = eventlet.GreenPool(concurrency)
+    for _ in pool.imap(deliver_with_slot, range(messages)):
+        pass
+    connection.send(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+def run(name, processes, target, args, messages):
+    # pipes rather than queues, whose feeder threads eventlet would turn into green threads
+    context = multiprocessing.get_context('spawn')
+    connections, workers = [], []
+    for i in range(processes):
+        share = messages // processes + (1 if i < messages % processes else 0)
+        connection, worker_connection = context.Pipe()
+        connections.append(connection)
+        workers.append(context.Process(target=target, args=args(share) + (worker_connection,)))
+    for worker in workers:
+        worker.start()
+    for connection in connections:
+        connection.recv()
+
+    started = time.monotonic()
+    for connection in connections:
+        connection.send('start')
+    peak_rss_kb = sum(connection.recv() for connection in connections)
+    elapsed = time.monotonic() - started
+    for worker in workers:
+        worker.join()
+
+    rate = messages / elapsed
+    memory_gb = peak_rss_kb / 1024 / 1024
+    print("{:<30} {:>8.0f} messages/s {:>8.0f} MB {:>10.0f} messages/s per GB".format(
+        name, rate, memory_gb * 1024, rate / memory_gb))
+
+
+if __name__ == "__main__":
+    arguments = docopt(__doc__)
+    messages = int(arguments['--messages'])
+    latency = int(arguments['--latency']) / 1000
+    cpu = int(arguments['--cpu']) / 1000
+    processes = int(arguments['--processes'])
+    concurrency = int(arguments['--concurrency'])
+    provider_limit = int(arguments['--provider-limit'] or concurrency)
+    with_app = arguments['--app']
+
+    print("Simulation: {} messages, {} ms provider latency, {} ms of work each".format(
+        messages, latency * 1000, cpu * 1000
+    ))
+    run(
+        "prefork ({} processes)".format(processes),
+        processes,
+        prefork_worker,
+        lambda share: (share, latency, cpu, with_app),
+        messages
+    )
+    run(
+        "eventlet ({} green threads)".format(concurrency),
+        1,
+        eventlet_worker,
+        lambda share: (share, latency, cpu, concurrency, provider_limit, with_app),
+        messages
+    )
@@ -0,0 +1,77 @@
+"""
+
+Benchmark of the PII scan run on every email when SCAN_FOR_PII is on.
+
+Scans generated email bodies, similar in length and content to what services send (greetings, reference
+numbers, dates, phone numbers, links and the odd social insurance number), with the previous findall and
+Luhn implementation and with app/delivery/pii.py, and reports the overhead per message.
+
+Usage:
+    scripts/benchmark_pii_scanner.py [--messages=<n>] [--paragraphs=<n>]
+
+Example:
+    scripts/benchmark_pii_scanner.py --messages=2000 --paragraphs=8
+"""
+import os
+import random
+import re
+import sys
+import timeit
+
+from docopt import docopt
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app.delivery.pii import PII_DETECTORS, scan_for_pii  # noqa: E402
+
+PARAGRAPHS = [
+    "Bonjour {name}, nous avons bien reçu votre demande numéro {reference} le {date}.",
+    "Hello {name}, your application {reference} was received on {date} and is being processed.",
+    "Pour toute question, communiquez avec nous au {phone} du lundi au vendredi, de 8 h 30 à 16 h 30.",
+    "If you have questions call {phone} or visit https://www.quebec.ca/services/{reference}.",
+    "Votre numéro d'assurance sociale {sin} a été vérifié.",
+    "Your payment of {amount} $ was processed on {date}. Keep this message for your records.",
+    "Ce message a été envoyé automatiquement, veuillez ne pas y répondre.",
+]
+
+
+def generate_email(paragraphs):
+    values = {
+        'name': random.choice(['Jo', 'Marie-Ève Tremblay', 'Jean Côté', 'Alex']),
+        'reference': '{:08d}'.format(random.randint(0, 99999999)),
+        'date': '2020-{:02d}-{:02d}'.format(random.randint(1, 12), random.randint(1, 28)),
+        'phone': '{}-{}-{}'.format(random.randint(200, 999), random.randint(200, 999), random.randint(1000, 9999)),
+        'sin': '{:03d}-{:03d}-{:03d}'.format(random.randint(0, 999), random.randint(0, 999), random.randint(0, 999)),
+        'amount': '{}.{:02d}'.format(random.randint(1, 5000), random.randint(0, 99)),
+    }
+    return '\n\n'.join(random.choice(PARAGRAPHS).format(**values) for _ in range(paragraphs))
+
+
+def previous_luhn(n):
+    r = [int(ch) for ch in n][::-1]
+    return (sum(r[0::2]) + sum(sum(divmod(d * 2, 10)) for d in r[1::2])) % 10 == 0
+
+
+def previous_contains_pii(text_content):
+    for sin in re.findall(r'\s\d{3}-\d{3}-\d{3}\s', text_content):
+        if previous_luhn(sin.replace("-", "").strip()):
+            return "Social Insurance Number"
+
+
+def report(name, scan, emails):
+    elapsed = min(timeit.repeat(lambda: [scan(email) for email in emails], number=1, repeat=5))
+    print("{:<50} {:>8.1f} µs per message".format(name, elapsed / len(emails) * 1000000))
+
+
+if __name__ == "__main__":
+    arguments = docopt(__doc__)
+    random.seed(0)
+    emails = [
+        generate_email(int(arguments['--paragraphs'] or 8)) for _ in range(int(arguments['--messages'] or 2000))
+    ]
+    print("{} messages, {} characters on average".format(len(emails), sum(map(len, emails)) // len(emails)))
+
+    report("previous scanner (sin)", previous_contains_pii, emails)
+    report("scanner (sin)", lambda email: scan_for_pii(email, ['sin']), emails)
+    report("scanner (all: {})".format(', '.join(PII_DETECTORS)), lambda email: scan_for_pii(email, list(PII_DETECTORS)),
+           emails)
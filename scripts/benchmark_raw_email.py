@@ -0,0 +1,86 @@
+"""
+
+Benchmark of the raw MIME message assembly done for every email sent through SES.
+
+Builds the messages of a job (same sender, template and attachment, a different recipient and personalised
+body for each) with a `MIMEMultipart` tree serialised by `as_string()`, as AwsSesClient used to, and with
+app/clients/email/raw_email.py, and reports messages per second on one core.
+
+Usage:
+    scripts/benchmark_raw_email.py [--messages=<n>] [--attachment-size=<bytes>]
+
+Example:
+    scripts/benchmark_raw_email.py --messages=2000 --attachment-size=500000
+"""
+import os
+import sys
+import time
+import unicodedata
+from email.header import Header
+from email.mime.application import MIMEApplication
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+from docopt import docopt
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app.clients.email.raw_email import build_raw_email, punycode_encode_email  # noqa: E402
+
+SOURCE = '"Ministère de la Cybersécurité et du Numérique" <noreply@notification.gouv.qc.ca>'
+ARN = 'arn:aws:ses:ca-central-1:123456789012:identity/notification.gouv.qc.ca'
+PARAGRAPH = "Bonjour {}, votre demande a été reçue et sera traitée dans les prochains jours ouvrables. "
+
+
+def previous_build(to_address, subject, body, html_body, attachments):
+    source = unicodedata.normalize('NFKD', SOURCE)
+    friendly_name, match_string, from_address = source.partition("<")
+    friendly_name = friendly_name.replace('"', '')
+    encoded_source = '{} {}{}'.format(Header(friendly_name, 'utf-8').encode(), match_string, from_address)
+
+    msg = MIMEMultipart('alternative')
+    msg['Subject'] = subject
+    msg['From'] = encoded_source
+    msg['To'] = punycode_encode_email(to_address)
+    msg.add_header('X-SES-SOURCE-ARN', ARN)
+    msg.add_header('X-SES-FROM-ARN', ARN)
+    msg.attach(MIMEText(body.encode('utf-8'), 'plain', 'utf-8'))
+    msg.attach(MIMEText(html_body.encode('utf-8'), 'html', 'utf-8'))
+    for attachment in attachments:
+        part = MIMEApplication(attachment["data"])
+        part.add_header('Content-Disposition', 'attachment', filename=attachment["name"])
+        msg.attach(part)
+    return msg.as_string()
+
+
+def build(to_address, subject, body, html_body, attachments):
+    return build_raw_email(
+        SOURCE, [to_address], subject, body, html_body=html_body, attachments=attachments, aws_ses_arn=ARN
+    )
+
+
+def report(name, builder, messages, attachments):
+    start = time.process_time()
+    for to_address, body, html_body in messages:
+        # a fresh copy of the document, as each notification reads it from the attachment cache
+        builder(to_address, 'Votre demande', body, html_body, [dict(a, data=bytes(a['data'])) for a in attachments])
+    elapsed = time.process_time() - start
+    print("{:<30} {:>10.0f} messages per second per core".format(name, len(messages) / elapsed))
+
+
+if __name__ == "__main__":
+    arguments = docopt(__doc__)
+    count = int(arguments['--messages'] or 2000)
+    attachment_size = int(arguments['--attachment-size'] or 0)
+    attachments = [{"name": "document.pdf", "data": b'%PDF-1.4\n' + os.urandom(attachment_size)}]
+
+    messages = []
+    for i in range(count):
+        name = 'Personne {}'.format(i)
+        body = PARAGRAPH.format(name) * 10
+        messages.append(('personne.{}@exemple.qc.ca'.format(i), body, '<p>{}</p>'.format(body)))
+
+    for label, files in (("without attachment", []), ("with attachment", attachments)):
+        print("{} messages {}".format(count, label))
+        report("  MIMEMultipart.as_string", previous_build, messages, files)
+        report("  build_raw_email", build, messages, files)
@@ -0,0 +1,12 @@
+#!/bin/sh
+
+set -e
+
+# Delivers notifications from the send queues on eventlet green threads: a single process makes the provider
+# requests of up to CELERY_DELIVERY_CONCURRENCY notifications at the same time, limited per provider by
+# PROVIDER_CONCURRENCY_LIMITS. Each notification holds a database connection while it is delivered, so the
+# connection pool, shared by the green threads, is sized to match.
+CELERY_DELIVERY_CONCURRENCY=${CELERY_DELIVERY_CONCURRENCY:-50}
+export SQLALCHEMY_POOL_SIZE=${SQLALCHEMY_POOL_SIZE:-$CELERY_DELIVERY_CONCURRENCY}
+
+celery -A run_celery.notify_celery worker --pidfile="/tmp/celery-delivery.pid" --loglevel=INFO -P eventlet --concurrency="$CELERY_DELIVERY_CONCURRENCY" -Q send-email-tasks,send-sms-tasks
@@ -0,0 +1,157 @@
+from datetime import datetime
+
+import pytest
+import validatesns
+from freezegun import freeze_time
+
+from app.aws import sns_validation
+from app.aws.sns_validation import (
+    load_certificate,
+    validate_sns_message,
+)
+
+CERT_URL = 'https://sns.ca-central-1.amazonaws.com/SimpleNotificationService-abc.pem'
+
+
+@pytest.fixture(autouse=True)
+def clear_certificate_caches():
+    sns_validation.certificate_cache.clear()
+    load_certificate.cache_clear()
+    yield
+    sns_validation.certificate_cache.clear()
+    load_certificate.cache_clear()
+
+
+def _sns_message(**overrides):
+    message = {
+        'Type': 'Notification',
+        'MessageId': 'message-id',
+        'TopicArn': 'arn:aws:sns:ca-central-1:123456789012:ses-callbacks',
+        'Message': '{}',
+        'Timestamp': datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S.%fZ'),
+        'SignatureVersion': '1',
+        'Signature': 'c2lnbmF0dXJl',
+        'SigningCertURL': CERT_URL,
+    }
+    message.update(overrides)
+    return message
+
+
+def test_load_certificate_downloads_and_shares_certificate_through_redis(notify_api, mocker):
+    mocker.patch('app.aws.sns_validation.redis_store.get', return_value=None)
+    mock_redis_set = mocker.patch('app.aws.sns_validation.redis_store.set')
+    mock_get = mocker.patch('app.aws.sns_validation.requests.get')
+    mock_get.return_value.content = b'certificate'
+    mock_load = mocker.patch('app.aws.sns_validation.oscrypto.asymmetric.load_certificate')
+
+    assert load_certificate(CERT_URL) == mock_load.return_value
+    assert load_certificate(CERT_URL) == mock_load.return_value
+
+    mock_get.assert_called_once_with(CERT_URL, timeout=5)
+    mock_get.return_value.raise_for_status.assert_called_once_with()
+    mock_load.assert_called_once_with(b'certificate')
+    mock_redis_set.assert_called_once_with(
+        'sns-signing-certificate-{}'.format(CERT_URL), b'certificate', ex=8 * 24 * 60 * 60
+    )
+
+
+def test_load_certificate_uses_certificate_from_redis_without_downloading(notify_api, mocker):
+    mocker.patch('app.aws.sns_validation.redis_store.get', return_value=b'certificate')
+    mock_get = mocker.patch('app.aws.sns_validation.requests.get')
+    mock_load = mocker.patch('app.aws.sns_validation.oscrypto.asymmetric.load_certificate')
+
+    assert load_certificate(CERT_URL) == mock_load.return_value
+    mock_load.assert_called_once_with(b'certificate')
+    assert not mock_get.called
+
+
+def test_load_certificate_does_not_cache_a_failed_download(notify_api, mocker):
+    mocker.patch('app.aws.sns_validation.redis_store.get', return_value=None)
+    mock_redis_set = mocker.patch('app.aws.sns_validation.redis_store.set')
+    mock_get = mocker.patch('app.aws.sns_validation.requests.get')
+    mock_get.return_value.raise_for_status.side_effect = sns_validation.requests.HTTPError('403 Forbidden')
+    mock_load = mocker.patch('app.aws.sns_validation.oscrypto.asymmetric.load_certificate')
+
+    with pytest.raises(sns_validation.requests.HTTPError):
+        load_certificate(CERT_URL)
+
+    assert not mock_load.called
+    assert not mock_redis_set.called
+    assert sns_validation.certificate_cache.get(CERT_URL) is None
+
+
+def test_load_certificate_does_not_cache_a_download_that_is_not_a_certificate(notify_api, mocker):
+    mocker.patch('app.aws.sns_validation.redis_store.get', return_value=None)
+    mock_redis_set = mocker.patch('app.aws.sns_validation.redis_store.set')
+    mock_get = mocker.patch('app.aws.sns_validation.requests.get')
+    mock_get.return_value.content = b'<html>Service Unavailable</html>'
+    mocker.patch('app.aws.sns_validation.oscrypto.asymmetric.load_certificate', side_effect=ValueError)
+
+    with pytest.raises(ValueError):
+        load_certificate(CERT_URL)
+
+    assert not mock_redis_set.called
+    assert sns_validation.certificate_cache.get(CERT_URL) is None
+
+
+def test_load_certificate_discards_cached_certificate_that_does_not_parse(notify_api, mocker):
+    mocker.patch('app.aws.sns_validation.redis_store.get', return_value=b'<html>Forbidden</html>')
+    mock_redis_delete = mocker.patch('app.aws.sns_validation.redis_store.delete')
+    mock_redis_set = mocker.patch('app.aws.sns_validation.redis_store.set')
+    mock_get = mocker.patch('app.aws.sns_validation.requests.get')
+    mock_get.return_value.content = b'certificate'
+    mock_load = mocker.patch(
+        'app.aws.sns_validation.oscrypto.asymmetric.load_certificate',
+        side_effect=[ValueError, mocker.sentinel.certificate]
+    )
+
+    assert load_certificate(CERT_URL) == mocker.sentinel.certificate
+
+    mock_redis_delete.assert_called_once_with('sns-signing-certificate-{}'.format(CERT_URL))
+    assert mock_load.call_args_list == [mocker.call(b'<html>Forbidden</html>'), mocker.call(b'certificate')]
+    mock_redis_set.assert_called_once_with(
+        'sns-signing-certificate-{}'.format(CERT_URL), b'certificate', ex=8 * 24 * 60 * 60
+    )
+
+
+def test_validate_sns_message_verifies_signature_with_loaded_certificate(notify_api, mocker):
+    mock_load = mocker.patch('app.aws.sns_validation.load_certificate')
+    mock_verify = mocker.patch('app.aws.sns_validation.oscrypto.asymmetric.rsa_pkcs1v15_verify')
+
+    with freeze_time('2020-06-01 12:00:00'):
+        message = _sns_message()
+        validate_sns_message(message)
+
+    mock_load.assert_called_once_with(CERT_URL)
+    mock_verify.assert_called_once_with(
+        mock_load.return_value,
+        b'signature',
+        'Message\n{{}}\nMessageId\nmessage-id\nTimestamp\n{}\nTopicArn\n{}\nType\nNotification\n'.format(
+            message['Timestamp'], message['TopicArn']
+        ).encode(),
+        'sha1'
+    )
+
+
+@pytest.mark.parametrize('overrides', [
+    {'SigningCertURL': 'https://attacker.example.com/cert.pem'},
+    {'Timestamp': '2000-01-01T00:00:00.000Z'},
+    {'SignatureVersion': '2'},
+])
+def test_validate_sns_message_rejects_invalid_messages(notify_api, mocker, overrides):
+    mock_load = mocker.patch('app.aws.sns_validation.load_certificate')
+    mocker.patch('app.aws.sns_validation.oscrypto.asymmetric.rsa_pkcs1v15_verify')
+
+    with pytest.raises(validatesns.ValidationError):
+        validate_sns_message(_sns_message(**overrides))
+
+    if 'SigningCertURL' in overrides:
+        assert not mock_load.called
+
+
+def test_validate_sns_message_raises_validation_error_if_certificate_cannot_be_downloaded(notify_api, mocker):
+    mocker.patch('app.aws.sns_validation.redis_store.get', return_value=None)
+    mocker.patch('app.aws.sns_validation.requests.get', side_effect=sns_validation.requests.ConnectionError)
+
+    with pytest.raises(validatesns.ValidationError):
+        validate_sns_message(_sns_message())
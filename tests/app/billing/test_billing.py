@@ -158,23 +158,19 @@ def test_update_free_sms_fragment_limit_data(client, sample_service):
 
 
 @freeze_time('2018-04-21 14:00')
-def test_get_yearly_usage_by_monthly_from_ft_billing_populates_deltas(client, notify_db_session):
+def test_get_yearly_usage_by_monthly_from_ft_billing_does_not_populate_deltas(client, notify_db_session):
     service = create_service()
     sms_template = create_template(service=service, template_type="sms")
     create_rate(start_date=datetime.utcnow() - timedelta(days=1), value=0.158, notification_type='sms')
 
     create_notification(template=sms_template, status='delivered')
 
-    assert FactBilling.query.count() == 0
-
     response = client.get('service/{}/billing/ft-monthly-usage?year=2018'.format(service.id),
                           headers=[('Content-Type', 'application/json'), create_authorization_header()])
 
     assert response.status_code == 200
-    assert len(json.loads(response.get_data(as_text=True))) == 1
-    fact_billing = FactBilling.query.all()
-    assert len(fact_billing) == 1
-    assert fact_billing[0].notification_type == 'sms'
+    assert json.loads(response.get_data(as_text=True)) == []
+    assert FactBilling.query.count() == 0
 
 
 def test_get_yearly_usage_by_monthly_from_ft_billing(client, notify_db_session):
@@ -463,3 +459,15 @@ def set_up_data_for_all_cases():
                       notifications_sent=1,
                       postage='first')
     return service
+
+
+def test_get_yearly_billing_usage_summary_from_ft_billing_returns_cached_totals(client, sample_service, mocker):
+    mocker.patch('app.reporting_cache.redis_store.get', return_value=b'[{"notification_type": "sms"}]')
+    fetch_totals = mocker.patch('app.billing.rest.fetch_billing_totals_for_year')
+
+    response = client.get('service/{}/billing/ft-yearly-usage-summary?year=2016'.format(sample_service.id),
+                          headers=[create_authorization_header()])
+
+    assert response.status_code == 200
+    assert json.loads(response.get_data(as_text=True)) == [{'notification_type': 'sms'}]
+    fetch_totals.assert_not_called()
@@ -1,6 +1,6 @@
 from datetime import datetime, timedelta, date
 from functools import partial
-from unittest.mock import call, patch, PropertyMock
+from unittest.mock import ANY, call, patch, PropertyMock
 
 import pytest
 import pytz
@@ -28,6 +28,7 @@ from app.celery.nightly_tasks import (
 from app.celery.service_callback_tasks import create_delivery_status_callback_data
 from app.clients.performance_platform.performance_platform_client import PerformancePlatformClient
 from app.config import QueueNames
+from app.dao.service_callback_api_dao import get_service_delivery_status_callback_api_for_service
 from app.exceptions import NotificationTechnicalFailureException
 from app.models import (
     LETTER_TYPE,
@@ -35,6 +36,7 @@ from app.models import (
     EMAIL_TYPE
 )
 from tests.app.aws.test_s3 import single_s3_object_stub
+from tests.conftest import set_config
 from tests.app.db import (
     create_notification,
     create_service,
@@ -224,6 +226,7 @@ def test_should_not_update_status_of_letter_notifications(client, sample_letter_
 
 def test_timeout_notifications_sends_status_update_to_service(client, sample_template, mocker):
     callback_api = create_service_callback_api(service=sample_template.service)
+    mocker.patch('app.celery.nightly_tasks.notify_celery.producer_or_acquire')
     mocked = mocker.patch('app.celery.service_callback_tasks.send_delivery_status_to_service.apply_async')
     notification = create_notification(
         template=sample_template,
@@ -233,7 +236,35 @@ def test_timeout_notifications_sends_status_update_to_service(client, sample_tem
     timeout_notifications()
 
     encrypted_data = create_delivery_status_callback_data(notification, callback_api)
-    mocked.assert_called_once_with([str(notification.id), encrypted_data], queue=QueueNames.CALLBACKS)
+    mocked.assert_called_once_with([str(notification.id), encrypted_data], queue=QueueNames.CALLBACKS, producer=ANY)
+
+
+def test_timeout_notifications_looks_up_callback_api_once_per_service_across_chunks(
+    notify_api, sample_template, mocker
+):
+    create_service_callback_api(service=sample_template.service)
+    mocker.patch('app.celery.nightly_tasks.notify_celery.producer_or_acquire')
+    mocked = mocker.patch('app.celery.service_callback_tasks.send_delivery_status_to_service.apply_async')
+    mock_get_callback_api = mocker.patch(
+        'app.celery.nightly_tasks.get_service_delivery_status_callback_api_for_service',
+        wraps=get_service_delivery_status_callback_api_for_service
+    )
+    notifications = [
+        create_notification(
+            template=sample_template,
+            status='sending',
+            created_at=datetime.utcnow() - timedelta(
+                seconds=current_app.config.get('SENDING_NOTIFICATIONS_TIMEOUT_PERIOD') + 10 + i))
+        for i in range(3)
+    ]
+
+    with set_config(notify_api, 'TIMEOUT_NOTIFICATIONS_CHUNK_SIZE', 2):
+        timeout_notifications()
+
+    mock_get_callback_api.assert_called_once_with(service_id=sample_template.service_id)
+    assert mocked.call_count == 3
+    assert {args[0][0][0] for args in mocked.call_args_list} == {str(n.id) for n in notifications}
+    assert {n.status for n in notifications} == {'temporary-failure'}
 
 
 def test_send_daily_performance_stats_calls_does_not_send_if_inactive(client, mocker):
@@ -69,7 +69,7 @@ def test_notifications_ses_400_with_certificate(client):
 
 
 def test_notifications_ses_200_autoconfirms_subscription(client, mocker):
-    mocker.patch("validatesns.validate")
+    mocker.patch("app.celery.process_ses_receipts_tasks.validate_sns_message")
     requests_mock = mocker.patch("requests.get")
     data = json.dumps({"Type": "SubscriptionConfirmation", "SubscribeURL": "https://foo"})
     response = client.post(
@@ -83,7 +83,7 @@ def test_notifications_ses_200_autoconfirms_subscription(client, mocker):
 
 
 def test_notifications_ses_200_call_process_task(client, mocker):
-    mocker.patch("validatesns.validate")
+    mocker.patch("app.celery.process_ses_receipts_tasks.validate_sns_message")
     process_mock = mocker.patch("app.celery.process_ses_receipts_tasks.process_ses_results.apply_async")
     data = {"Type": "Notification", "foo": "bar"}
     json_data = json.dumps(data)
@@ -348,6 +348,7 @@ def test_ses_callback_should_send_on_complaint_to_user_callback_api(sample_email
         'reference': None,
         'service_callback_api_bearer_token': 'some_super_secret',
         'service_callback_api_url': 'https://original_url.com',
+        'service_id': str(notification.service_id),
         'to': 'recipient1@example.com'
     }
 
@@ -396,7 +397,7 @@ def test_notifications_ses_smtp_400_with_certificate(client):
 
 
 def test_notifications_ses_smtp_200_autoconfirms_subscription(client, mocker):
-    mocker.patch("validatesns.validate")
+    mocker.patch("app.celery.process_ses_receipts_tasks.validate_sns_message")
     requests_mock = mocker.patch("requests.get")
     data = json.dumps({"Type": "SubscriptionConfirmation", "SubscribeURL": "https://foo"})
     response = client.post(
@@ -410,7 +411,7 @@ def test_notifications_ses_smtp_200_autoconfirms_subscription(client, mocker):
 
 
 def test_notifications_ses_smtp_200_call_process_task(client, mocker):
-    mocker.patch("validatesns.validate")
+    mocker.patch("app.celery.process_ses_receipts_tasks.validate_sns_message")
     process_mock = mocker.patch("app.celery.process_ses_receipts_tasks.process_ses_smtp_results.apply_async")
     data = {"Type": "Notification", "foo": "bar"}
     json_data = json.dumps(data)
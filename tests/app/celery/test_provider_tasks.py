@@ -5,9 +5,10 @@ from notifications_utils.recipients import InvalidEmailError
 
 import app
 from app.celery import provider_tasks
-from app.celery.provider_tasks import deliver_sms, deliver_email
+from app.celery.provider_tasks import check_pending_mlwr_scans, deliver_sms, deliver_email, deliver_email_batch
 from app.clients.email.aws_ses import AwsSesClientException
-from app.exceptions import NotificationTechnicalFailureException
+from app.exceptions import NotificationTechnicalFailureException, MalwarePendingException
+from tests.app.db import create_notification
 
 
 def test_should_have_decorated_tasks_functions():
@@ -126,3 +127,85 @@ def test_send_sms_should_not_switch_providers_on_non_provider_failure(
     deliver_sms(sample_notification.id)
 
     assert switch_provider_mock.called is False
+
+
+def test_should_retry_later_if_email_is_pending_malware_scan(sample_notification, mocker):
+    mocker.patch('app.delivery.send_to_providers.send_email_to_provider', side_effect=MalwarePendingException())
+    mocker.patch('app.celery.provider_tasks.deliver_email.retry')
+
+    deliver_email(sample_notification.id)
+
+    app.celery.provider_tasks.deliver_email.retry.assert_called_with(queue="retry-tasks", countdown=600)
+
+
+def test_check_pending_mlwr_scans_requeues_notifications_of_completed_scans(notify_api, mocker):
+    mocker.patch('app.celery.provider_tasks.get_pending_mlwr_sids', return_value=['done', 'pending', 'broken'])
+    mocker.patch('app.celery.provider_tasks.has_notifications_waiting_for_mlwr_scan', return_value=True)
+    mocker.patch('app.celery.provider_tasks.record_mlwr_check_failure', return_value=1)
+    mock_drop = mocker.patch('app.celery.provider_tasks.drop_pending_mlwr_scan')
+    mocker.patch('app.celery.provider_tasks.check_mlwr_score', side_effect=[
+        {"state": "completed", "submission": {"max_score": 0}},
+        {"state": "submitted"},
+        Exception("assemblyline is down"),
+    ])
+    mock_pop = mocker.patch(
+        'app.celery.provider_tasks.pop_notifications_waiting_for_mlwr_scan', return_value=['id-1', 'id-2']
+    )
+    mock_apply_async_many = mocker.patch('app.celery.provider_tasks.notify_celery.apply_async_many')
+
+    check_pending_mlwr_scans()
+
+    mock_pop.assert_called_once_with('done')
+    mock_apply_async_many.assert_called_once_with(deliver_email, [['id-1'], ['id-2']], 'retry-tasks')
+    assert not mock_drop.called
+
+
+def test_check_pending_mlwr_scans_drops_scans_no_email_waits_on(notify_api, mocker):
+    mocker.patch('app.celery.provider_tasks.get_pending_mlwr_sids', return_value=['forgotten'])
+    mocker.patch('app.celery.provider_tasks.has_notifications_waiting_for_mlwr_scan', return_value=False)
+    mock_check = mocker.patch('app.celery.provider_tasks.check_mlwr_score')
+    mock_drop = mocker.patch('app.celery.provider_tasks.drop_pending_mlwr_scan')
+
+    check_pending_mlwr_scans()
+
+    mock_drop.assert_called_once_with('forgotten')
+    assert not mock_check.called
+
+
+@pytest.mark.parametrize('failures, dropped', [(29, False), (30, True)])
+def test_check_pending_mlwr_scans_drops_scans_that_keep_failing(notify_api, mocker, failures, dropped):
+    mocker.patch('app.celery.provider_tasks.get_pending_mlwr_sids', return_value=['broken'])
+    mocker.patch('app.celery.provider_tasks.has_notifications_waiting_for_mlwr_scan', return_value=True)
+    mocker.patch('app.celery.provider_tasks.check_mlwr_score', side_effect=Exception("assemblyline is down"))
+    mock_record = mocker.patch('app.celery.provider_tasks.record_mlwr_check_failure', return_value=failures)
+    mock_drop = mocker.patch('app.celery.provider_tasks.drop_pending_mlwr_scan')
+
+    check_pending_mlwr_scans()
+
+    mock_record.assert_called_once_with('broken')
+    assert mock_drop.called is dropped
+
+
+def test_deliver_email_batch_delivers_emails_not_sent_in_bulk_one_at_a_time(sample_email_template, mocker):
+    notifications = [create_notification(template=sample_email_template) for _ in range(3)]
+    send_mock = mocker.patch(
+        'app.delivery.send_to_providers.send_emails_to_provider', return_value=[notifications[1]]
+    )
+    mock_apply_async_many = mocker.patch('app.celery.provider_tasks.notify_celery.apply_async_many')
+
+    deliver_email_batch([str(notification.id) for notification in notifications])
+
+    assert set(send_mock.call_args[0][0]) == set(notifications)
+    mock_apply_async_many.assert_called_once_with(deliver_email, [[str(notifications[1].id)]], 'send-email-tasks')
+
+
+def test_deliver_email_batch_delivers_all_emails_one_at_a_time_if_bulk_sending_fails(sample_email_template, mocker):
+    notification_ids = [str(create_notification(template=sample_email_template).id) for _ in range(2)]
+    mocker.patch('app.delivery.send_to_providers.send_emails_to_provider', side_effect=Exception('SES is down'))
+    mock_apply_async_many = mocker.patch('app.celery.provider_tasks.notify_celery.apply_async_many')
+
+    deliver_email_batch(notification_ids)
+
+    mock_apply_async_many.assert_called_once_with(
+        deliver_email, [[notification_id] for notification_id in notification_ids], 'send-email-tasks'
+    )
@@ -5,21 +5,32 @@ import pytest
 from freezegun import freeze_time
 
 from app.celery.reporting_tasks import (
+    create_billing_for_today,
     create_nightly_billing,
     create_nightly_notification_status,
     create_nightly_billing_for_day,
     create_nightly_notification_status_for_day,
+    fold_notification_status_count_deltas_task,
+    reconcile_notification_status_counts_task,
 )
 from app.dao.fact_billing_dao import get_rate
 from app.models import (
     FactBilling,
+    FactBillingSmsCumulative,
     Notification,
     LETTER_TYPE,
     EMAIL_TYPE,
-    SMS_TYPE, FactNotificationStatus
+    SMS_TYPE, FactNotificationStatus, FactNotificationStatusMonthly
 )
 
-from tests.app.db import create_service, create_template, create_notification, create_rate, create_letter_rate
+from tests.app.db import (
+    create_ft_billing,
+    create_letter_rate,
+    create_notification,
+    create_rate,
+    create_service,
+    create_template,
+)
 from notifications_utils.timezones import convert_utc_to_local_timezone
 
 
@@ -388,6 +399,28 @@ def test_create_nightly_billing_for_day_use_BST(
     assert records[0].billable_units == 3
 
 
+@freeze_time('2019-06-03T15:00:00')
+def test_create_nightly_billing_for_day_updates_sms_cumulative_usage(sample_template, mocker):
+    mocker.patch('app.dao.fact_billing_dao.get_rate', side_effect=mocker_get_rate)
+    create_ft_billing(utc_date=date(2019, 5, 30), notification_type=SMS_TYPE, template=sample_template,
+                      service=sample_template.service, billable_unit=5)
+    create_notification(
+        created_at=datetime(2019, 6, 1, 15, 0),
+        template=sample_template,
+        status='delivered',
+        rate_multiplier=2,
+        billable_units=3,
+    )
+
+    create_nightly_billing_for_day('2019-06-01')
+
+    records = FactBillingSmsCumulative.query.order_by(FactBillingSmsCumulative.bst_date).all()
+    assert [(row.bst_date, row.financial_year_start, row.billable_units) for row in records] == [
+        (date(2019, 5, 30), 2019, 5),
+        (date(2019, 6, 1), 2019, 11),
+    ]
+
+
 @freeze_time('2018-01-15T03:30:00')
 @pytest.mark.skip(reason="Not in use")
 def test_create_nightly_billing_for_day_update_when_record_exists(
@@ -435,6 +468,25 @@ def test_create_nightly_billing_for_day_update_when_record_exists(
     assert records[0].updated_at
 
 
+@freeze_time('2019-01-05T15:00:00')
+def test_create_billing_for_today_updates_services_that_sent_today(notify_db_session, mocker):
+    mocker.patch('app.dao.fact_billing_dao.get_rate', side_effect=mocker_get_rate)
+    sms_template = create_template(service=create_service(service_name='sms service'))
+    email_template = create_template(service=create_service(service_name='email service'), template_type='email')
+    quiet_template = create_template(service=create_service(service_name='quiet service'))
+    create_notification(template=sms_template, status='delivered')
+    create_notification(template=email_template, status='delivered')
+    create_notification(template=quiet_template, status='delivered', created_at=datetime(2019, 1, 4, 15, 0))
+
+    create_billing_for_today()
+
+    records = FactBilling.query.order_by(FactBilling.notification_type).all()
+    assert [(record.bst_date, record.service_id) for record in records] == [
+        (date(2019, 1, 5), email_template.service_id),
+        (date(2019, 1, 5), sms_template.service_id),
+    ]
+
+
 @freeze_time('2019-01-05')
 def test_create_nightly_notification_status_for_day(notify_db_session):
     first_service = create_service(service_name='First Service')
@@ -464,6 +516,10 @@ def test_create_nightly_notification_status_for_day(notify_db_session):
     assert new_data[1].bst_date == date(2019, 1, 1)
     assert new_data[2].bst_date == date(2019, 1, 1)
 
+    monthly_data = FactNotificationStatusMonthly.query.all()
+    assert len(monthly_data) == 3
+    assert {row.month for row in monthly_data} == {date(2019, 1, 1)}
+
 
 # the job runs at 12:30am London time. 04/01 is in BST.
 @freeze_time('2019-04-01T5:30')
@@ -483,3 +539,27 @@ def test_create_nightly_notification_status_for_day_respects_local_timezone(samp
 
     assert noti_status[0].bst_date == date(2019, 4, 1)
     assert noti_status[0].notification_status == 'created'
+
+
+@freeze_time('2021-01-26T15:00:00')
+def test_reconcile_notification_status_counts_task_recounts_today_and_yesterday(mocker):
+    mock_reconcile = mocker.patch('app.celery.reporting_tasks.reconcile_notification_status_counts')
+    mock_delete = mocker.patch(
+        'app.celery.reporting_tasks.delete_notification_status_counts_older_than', return_value=0
+    )
+
+    reconcile_notification_status_counts_task()
+
+    assert mock_reconcile.call_args_list == [
+        mocker.call(date(2021, 1, 25)),
+        mocker.call(date(2021, 1, 26)),
+    ]
+    mock_delete.assert_called_once_with(date(2021, 1, 25))
+
+
+def test_fold_notification_status_count_deltas_task(mocker):
+    mock_fold = mocker.patch('app.celery.reporting_tasks.fold_notification_status_count_deltas', return_value=3)
+
+    fold_notification_status_count_deltas_task()
+
+    mock_fold.assert_called_once_with()
@@ -1,5 +1,5 @@
 from datetime import datetime, timedelta
-from unittest.mock import call
+from unittest.mock import ANY, call
 
 import pytest
 from freezegun import freeze_time
@@ -7,8 +7,11 @@ from freezegun import freeze_time
 from app import db
 from app.celery import scheduled_tasks
 from app.celery.scheduled_tasks import (
+    adjust_sms_provider_weights,
+    check_callback_circuit_breakers,
     check_job_status,
     delete_invitations,
+    delete_unused_ses_templates_task,
     delete_verify_codes,
     run_scheduled_jobs,
     send_scheduled_notifications,
@@ -19,7 +22,7 @@ from app.celery.scheduled_tasks import (
 )
 from app.config import QueueNames, TaskNames
 from app.dao.jobs_dao import dao_get_job_by_id
-from app.dao.notifications_dao import dao_get_scheduled_notifications
+from app.dao.notifications_dao import dao_claim_scheduled_notifications
 from app.dao.provider_details_dao import (
     dao_update_provider_details,
     get_current_provider
@@ -33,8 +36,10 @@ from app.models import (
 )
 from app.v2.errors import JobIncompleteError
 
+from tests.conftest import set_config
 from tests.app.db import (
     create_notification,
+    create_service,
     create_template,
     create_job,
 )
@@ -125,6 +130,25 @@ def test_should_update_all_scheduled_jobs_and_put_on_queue(notify_db, notify_db_
     ])
 
 
+def test_run_scheduled_jobs_claims_jobs_in_batches(notify_api, sample_template, mocker):
+    mocked = mocker.patch('app.celery.tasks.process_job.apply_async')
+    mock_set_pending = mocker.patch(
+        'app.celery.scheduled_tasks.dao_set_scheduled_jobs_to_pending',
+        wraps=scheduled_tasks.dao_set_scheduled_jobs_to_pending
+    )
+    jobs = [
+        create_job(sample_template, scheduled_for=datetime.utcnow() - timedelta(minutes=3 - i), job_status='scheduled')
+        for i in range(3)
+    ]
+
+    with set_config(notify_api, 'SCHEDULED_JOBS_BATCH_SIZE', 2):
+        run_scheduled_jobs()
+
+    assert mock_set_pending.call_args_list == [call(limit=2), call(limit=2)]
+    assert mocked.call_args_list == [call([str(job.id)], queue="job-tasks") for job in jobs]
+    assert all(dao_get_job_by_id(job.id).job_status == 'pending' for job in jobs)
+
+
 def test_switch_providers_on_slow_delivery_switches_once_then_does_not_switch_if_already_switched(
         notify_api,
         mocker,
@@ -152,22 +176,74 @@ def test_switch_providers_on_slow_delivery_switches_once_then_does_not_switch_if
     assert final_provider.identifier == new_provider.identifier
 
 
+def test_switch_providers_on_slow_delivery_does_nothing_when_sms_is_load_balanced(notify_api, mocker):
+    mock_is_slow = mocker.patch('app.celery.scheduled_tasks.is_delivery_slow_for_provider')
+    mock_toggle = mocker.patch('app.celery.scheduled_tasks.dao_toggle_sms_provider')
+
+    with set_config(notify_api, 'SMS_PROVIDER_WEIGHTS', {'sns': 1}):
+        switch_current_sms_provider_on_slow_delivery()
+
+    assert not mock_is_slow.called
+    assert not mock_toggle.called
+
+
+@pytest.mark.parametrize('weights, expected_calls', [({}, 0), ({'sns': 1}, 1)])
+def test_adjust_sms_provider_weights_only_runs_when_sms_is_load_balanced(notify_api, mocker, weights, expected_calls):
+    mock_adjust = mocker.patch('app.celery.scheduled_tasks.load_balancing.adjust_sms_provider_weights')
+
+    with set_config(notify_api, 'SMS_PROVIDER_WEIGHTS', weights):
+        adjust_sms_provider_weights()
+
+    assert mock_adjust.call_count == expected_calls
+
+
+def test_delete_unused_ses_templates_task(notify_api, mocker):
+    mock_delete = mocker.patch('app.celery.scheduled_tasks.delete_unused_ses_templates', return_value=['notify-a'])
+
+    delete_unused_ses_templates_task()
+
+    mock_delete.assert_called_once_with(scheduled_tasks.aws_ses_client)
+
+
 @freeze_time("2017-05-01 14:00:00")
 def test_should_send_all_scheduled_notifications_to_deliver_queue(sample_template, mocker):
+    mocker.patch('app.notifications.process_notifications.notify_celery.producer_or_acquire')
     mocked = mocker.patch('app.celery.provider_tasks.deliver_sms')
     message_to_deliver = create_notification(template=sample_template, scheduled_for="2017-05-01 13:15")
     create_notification(template=sample_template, scheduled_for="2017-05-01 10:15", status='delivered')
     create_notification(template=sample_template)
     create_notification(template=sample_template, scheduled_for="2017-05-01 14:15")
 
-    scheduled_notifications = dao_get_scheduled_notifications()
-    assert len(scheduled_notifications) == 1
+    assert [row.id for row in dao_claim_scheduled_notifications(batch_size=10)] == [message_to_deliver.id]
 
     send_scheduled_notifications()
 
-    mocked.apply_async.assert_called_once_with([str(message_to_deliver.id)], queue='send-sms-tasks')
-    scheduled_notifications = dao_get_scheduled_notifications()
-    assert not scheduled_notifications
+    mocked.apply_async.assert_called_once_with([str(message_to_deliver.id)], queue='send-sms-tasks', producer=ANY)
+    assert not dao_claim_scheduled_notifications(batch_size=10)
+
+
+@freeze_time("2017-05-01 14:00:00")
+def test_send_scheduled_notifications_processes_notifications_in_pages(notify_api, sample_template, mocker):
+    mocker.patch('app.notifications.process_notifications.notify_celery.producer_or_acquire')
+    mocked = mocker.patch('app.celery.provider_tasks.deliver_sms.apply_async')
+    mock_set_processed = mocker.patch(
+        'app.celery.scheduled_tasks.set_scheduled_notifications_to_processed',
+        wraps=scheduled_tasks.set_scheduled_notifications_to_processed
+    )
+    notifications = [
+        create_notification(template=sample_template, scheduled_for="2017-05-01 13:1{}".format(i))
+        for i in range(3)
+    ]
+
+    with set_config(notify_api, 'BULK_REQUEUE_PAGE_SIZE', 2):
+        send_scheduled_notifications()
+
+    assert [c[0][0] for c in mocked.call_args_list] == [[str(n.id)] for n in notifications]
+    assert mock_set_processed.call_args_list == [
+        call([notifications[0].id, notifications[1].id]),
+        call([notifications[2].id]),
+    ]
+    assert not dao_claim_scheduled_notifications(batch_size=10)
 
 
 def test_check_job_status_task_raises_job_incomplete_error(mocker, sample_template):
@@ -293,6 +369,7 @@ def test_check_job_status_task_sets_jobs_to_error(mocker, sample_template):
 
 
 def test_replay_created_notifications(notify_db_session, sample_service, mocker):
+    mocker.patch('app.notifications.process_notifications.notify_celery.producer_or_acquire')
     email_delivery_queue = mocker.patch('app.celery.provider_tasks.deliver_email.apply_async')
     sms_delivery_queue = mocker.patch('app.celery.provider_tasks.deliver_sms.apply_async')
 
@@ -317,9 +394,29 @@ def test_replay_created_notifications(notify_db_session, sample_service, mocker)
 
     replay_created_notifications()
     email_delivery_queue.assert_called_once_with([str(old_email.id)],
-                                                 queue='send-email-tasks')
+                                                 queue='send-email-tasks',
+                                                 producer=ANY)
     sms_delivery_queue.assert_called_once_with([str(old_sms.id)],
-                                               queue="send-sms-tasks")
+                                               queue="send-sms-tasks",
+                                               producer=ANY)
+
+
+def test_replay_created_notifications_sends_research_mode_notifications_to_research_queue(
+    notify_db_session, mocker
+):
+    mocker.patch('app.notifications.process_notifications.notify_celery.producer_or_acquire')
+    sms_delivery_queue = mocker.patch('app.celery.provider_tasks.deliver_sms.apply_async')
+    service = create_service(research_mode=True)
+    template = create_template(service=service, template_type='sms')
+    notification = create_notification(
+        template=template,
+        created_at=datetime.utcnow() - timedelta(hours=5),
+        status='created'
+    )
+
+    replay_created_notifications()
+
+    sms_delivery_queue.assert_called_once_with([str(notification.id)], queue='research-mode-tasks', producer=ANY)
 
 
 def test_check_job_status_task_does_not_raise_error(sample_template):
@@ -421,3 +518,40 @@ def test_check_templated_letter_state_during_utc(mocker, sample_letter_template)
         subject="[test] Letters still in 'created' status",
         ticket_type='incident'
     )
+
+
+@pytest.mark.parametrize('state, expected_probes, expected_drains', [
+    ('open', 0, 0),
+    ('half-open', 1, 0),
+    ('closed', 0, 1),
+])
+def test_check_callback_circuit_breakers(notify_api, mocker, state, expected_probes, expected_drains):
+    mocker.patch('app.celery.scheduled_tasks.get_tracked_hosts', return_value=['some.service.gov.uk'])
+    mocker.patch('app.celery.scheduled_tasks.get_circuit_state', return_value=state)
+    mocker.patch('app.celery.scheduled_tasks.get_services_with_backlog', return_value=['service-1', 'service-2'])
+    mocker.patch('app.celery.scheduled_tasks.callback_backlog_size', side_effect=lambda service_id: {
+        'service-1': 0, 'service-2': 5
+    }[service_id])
+    mock_forget_service = mocker.patch('app.celery.scheduled_tasks.forget_service_backlog')
+    mock_probe = mocker.patch('app.celery.scheduled_tasks.replay_parked_callbacks')
+    mock_drain = mocker.patch('app.celery.scheduled_tasks.start_callback_backlog_drains')
+
+    check_callback_circuit_breakers()
+
+    assert mock_probe.call_count == expected_probes
+    if expected_probes:
+        mock_probe.assert_called_once_with('service-2', 1)
+    assert mock_drain.call_count == expected_drains
+    if state != 'open':
+        mock_forget_service.assert_called_once_with('some.service.gov.uk', 'service-1')
+
+
+def test_check_callback_circuit_breakers_forgets_recovered_hosts_without_backlog(notify_api, mocker):
+    mocker.patch('app.celery.scheduled_tasks.get_tracked_hosts', return_value=['some.service.gov.uk'])
+    mocker.patch('app.celery.scheduled_tasks.get_circuit_state', return_value='closed')
+    mocker.patch('app.celery.scheduled_tasks.get_services_with_backlog', return_value=[])
+    mock_forget_host = mocker.patch('app.celery.scheduled_tasks.forget_host')
+
+    check_callback_circuit_breakers()
+
+    mock_forget_host.assert_called_once_with('some.service.gov.uk')
@@ -1,12 +1,18 @@
 import json
 from datetime import datetime
+from unittest.mock import call
 
 import pytest
 import requests_mock
 from freezegun import freeze_time
 
 from app import (DATETIME_FORMAT, encryption)
-from app.celery.service_callback_tasks import send_delivery_status_to_service, send_complaint_to_service
+from app.celery.service_callback_tasks import (
+    drain_callback_backlog,
+    send_complaint_to_service,
+    send_delivery_status_to_service,
+)
+from tests.conftest import set_config
 from tests.app.db import (
     create_complaint,
     create_notification,
@@ -160,6 +166,106 @@ def test_send_delivery_status_to_service_succeeds_if_sent_at_is_none(
     assert mocked.call_count == 0
 
 
+def test_send_delivery_status_to_service_parks_callback_if_circuit_breaker_open(
+        notify_db_session,
+        mocker
+):
+    callback_api, template = _set_up_test_data('email', "delivery_status")
+    notification = create_notification(template=template, status='delivered')
+    encrypted_data = _set_up_data_for_status_update(callback_api, notification)
+    mocker.patch('app.celery.service_callback_tasks.allow_callback_request', return_value=False)
+    mock_park = mocker.patch('app.celery.service_callback_tasks.park_callback')
+    mocked = mocker.patch('app.celery.service_callback_tasks.send_delivery_status_to_service.retry')
+    with requests_mock.Mocker() as request_mock:
+        send_delivery_status_to_service(notification.id, encrypted_status_update=encrypted_data)
+
+    assert request_mock.call_count == 0
+    assert mocked.call_count == 0
+    mock_park.assert_called_once_with(
+        'some.service.gov.uk',
+        str(template.service_id),
+        'send-delivery-status',
+        [str(notification.id), encrypted_data]
+    )
+
+
+def test_send_delivery_status_to_service_parks_callback_instead_of_retry_when_circuit_breaker_trips(
+        notify_db_session,
+        mocker
+):
+    callback_api, template = _set_up_test_data('sms', "delivery_status")
+    notification = create_notification(template=template, status='delivered')
+    encrypted_data = _set_up_data_for_status_update(callback_api, notification)
+    mock_failure = mocker.patch('app.celery.service_callback_tasks.record_callback_failure', return_value=True)
+    mock_park = mocker.patch('app.celery.service_callback_tasks.park_callback')
+    mocked = mocker.patch('app.celery.service_callback_tasks.send_delivery_status_to_service.retry')
+    with requests_mock.Mocker() as request_mock:
+        request_mock.post(callback_api.url,
+                          json={},
+                          status_code=503)
+        send_delivery_status_to_service(notification.id, encrypted_status_update=encrypted_data)
+
+    mock_failure.assert_called_once_with('some.service.gov.uk')
+    assert mock_park.call_count == 1
+    assert mocked.call_count == 0
+
+
+def test_send_delivery_status_to_service_starts_backlog_drains_when_circuit_breaker_closes(
+        notify_db_session,
+        mocker
+):
+    callback_api, template = _set_up_test_data('email', "delivery_status")
+    notification = create_notification(template=template, status='delivered')
+    encrypted_data = _set_up_data_for_status_update(callback_api, notification)
+    mocker.patch('app.celery.service_callback_tasks.record_callback_success', return_value=True)
+    mocker.patch('app.celery.service_callback_tasks.get_services_with_backlog', return_value=['service-1'])
+    mocker.patch('app.celery.service_callback_tasks.claim_backlog_drain', return_value=True)
+    mock_drain = mocker.patch('app.celery.service_callback_tasks.drain_callback_backlog.apply_async')
+    with requests_mock.Mocker() as request_mock:
+        request_mock.post(callback_api.url,
+                          json={},
+                          status_code=200)
+        send_delivery_status_to_service(notification.id, encrypted_status_update=encrypted_data)
+
+    mock_drain.assert_called_once_with(['service-1'], queue='service-callbacks')
+
+
+def test_drain_callback_backlog_replays_parked_callbacks_at_drain_rate(notify_api, mocker):
+    parked = [
+        {'task': 'send-delivery-status', 'args': ['id-1', 'data-1']},
+        {'task': 'send-complaint', 'args': ['data-2']},
+    ]
+    mocker.patch('app.celery.service_callback_tasks.pop_parked_callbacks', return_value=parked)
+    mocker.patch('app.celery.service_callback_tasks.callback_backlog_size', return_value=0)
+    mock_release = mocker.patch('app.celery.service_callback_tasks.release_backlog_drain')
+    mock_send_task = mocker.patch('app.celery.service_callback_tasks.notify_celery.send_task')
+    mock_reschedule = mocker.patch('app.celery.service_callback_tasks.drain_callback_backlog.apply_async')
+
+    with set_config(notify_api, 'CALLBACK_BACKLOG_DRAIN_RATE', 2):
+        drain_callback_backlog('service-1')
+
+    assert mock_send_task.call_args_list == [
+        call(name='send-delivery-status', args=['id-1', 'data-1'], queue='service-callbacks', countdown=0),
+        call(name='send-complaint', args=['data-2'], queue='service-callbacks', countdown=0.5),
+    ]
+    mock_release.assert_called_once_with('service-1')
+    assert mock_reschedule.call_count == 0
+
+
+def test_drain_callback_backlog_reschedules_itself_if_backlog_remains(notify_api, mocker):
+    parked = [{'task': 'send-complaint', 'args': ['data-{}'.format(i)]} for i in range(4)]
+    mocker.patch('app.celery.service_callback_tasks.pop_parked_callbacks', return_value=parked)
+    mocker.patch('app.celery.service_callback_tasks.callback_backlog_size', return_value=10)
+    mocker.patch('app.celery.service_callback_tasks.extend_backlog_drain')
+    mocker.patch('app.celery.service_callback_tasks.notify_celery.send_task')
+    mock_reschedule = mocker.patch('app.celery.service_callback_tasks.drain_callback_backlog.apply_async')
+
+    with set_config(notify_api, 'CALLBACK_BACKLOG_DRAIN_RATE', 2):
+        drain_callback_backlog('service-1')
+
+    mock_reschedule.assert_called_once_with(['service-1'], queue='service-callbacks', countdown=2)
+
+
 def _set_up_test_data(notification_type, callback_type):
     service = create_service(restricted=True)
     template = create_template(service=service, template_type=notification_type, subject='Hello')
@@ -179,6 +285,7 @@ def _set_up_data_for_status_update(callback_api, notification):
             DATETIME_FORMAT) if notification.updated_at else None,
         "notification_sent_at": notification.sent_at.strftime(DATETIME_FORMAT) if notification.sent_at else None,
         "notification_type": notification.notification_type,
+        "service_id": str(notification.service_id),
         "service_callback_api_url": callback_api.url,
         "service_callback_api_bearer_token": callback_api.bearer_token,
     }
@@ -23,6 +23,7 @@ from app.celery.tasks import (
     process_row,
     save_sms,
     save_email,
+    save_emails,
     save_letter,
     process_incomplete_job,
     process_incomplete_jobs,
@@ -289,6 +290,31 @@ def test_should_process_email_job(email_job_with_placeholders, mocker):
     assert job.job_status == 'finished'
 
 
+def test_should_process_email_job_in_batches_when_ses_bulk_sending_is_enabled(
+    notify_api, email_job_with_placeholders, mocker
+):
+    email_csv = "email_address,name\n" + "".join("test{0}@test.com,foo{0}\n".format(i) for i in range(5))
+    mocker.patch('app.celery.tasks.s3.get_job_from_s3', return_value=email_csv)
+    mocker.patch('app.celery.tasks.save_email.apply_async')
+    mocker.patch('app.celery.tasks.save_emails.apply_async')
+    mocker.patch('app.encryption.encrypt', return_value="something_encrypted")
+    mocker.patch('app.celery.tasks.create_uuid', return_value="uuid")
+
+    with set_config_values(notify_api, {'SES_BULK_SENDING_ENABLED': True, 'SES_BULK_BATCH_SIZE': 2}):
+        process_job(email_job_with_placeholders.id)
+
+    assert not tasks.save_email.apply_async.called
+    assert tasks.save_emails.apply_async.call_args_list == [
+        call((str(email_job_with_placeholders.service_id), [["uuid", "something_encrypted"]] * 2), {},
+             queue="database-tasks"),
+        call((str(email_job_with_placeholders.service_id), [["uuid", "something_encrypted"]] * 2), {},
+             queue="database-tasks"),
+        call((str(email_job_with_placeholders.service_id), [["uuid", "something_encrypted"]]), {},
+             queue="database-tasks"),
+    ]
+    assert jobs_dao.dao_get_job_by_id(email_job_with_placeholders.id).job_status == 'finished'
+
+
 def test_should_process_email_job_with_sender_id(email_job_with_placeholders, mocker, fake_uuid):
     email_csv = """email_address,name
     test@test.com,foo
@@ -879,6 +905,41 @@ def test_save_sms_should_go_to_retry_queue_if_database_errors(sample_template, m
     assert Notification.query.count() == 0
 
 
+def test_save_emails_persists_the_batch_and_delivers_it_together(sample_email_template_with_placeholders, mocker):
+    mocker.patch('app.celery.provider_tasks.deliver_email_batch.apply_async')
+    notification_ids = [uuid.uuid4(), uuid.uuid4()]
+    encrypted_notifications = [
+        [str(notification_id), encryption.encrypt(_notification_json(
+            sample_email_template_with_placeholders, 'test{}@example.com'.format(row), {"name": "Jo"}, row_number=row
+        ))] for row, notification_id in enumerate(notification_ids)
+    ]
+
+    save_emails(sample_email_template_with_placeholders.service_id, encrypted_notifications)
+
+    persisted_notifications = Notification.query.order_by(Notification.job_row_number).all()
+    assert [notification.id for notification in persisted_notifications] == notification_ids
+    assert [notification.to for notification in persisted_notifications] == ['test0@example.com', 'test1@example.com']
+    assert all(notification.status == 'created' for notification in persisted_notifications)
+    provider_tasks.deliver_email_batch.apply_async.assert_called_once_with(
+        [[str(notification_id) for notification_id in notification_ids]], queue='send-email-tasks'
+    )
+
+
+def test_save_emails_saves_rows_on_their_own_if_database_errors(sample_email_template, mocker):
+    mocker.patch('app.celery.provider_tasks.deliver_email_batch.apply_async')
+    mocker.patch('app.celery.tasks.save_email.apply_async')
+    mocker.patch('app.notifications.process_notifications.dao_create_notification', side_effect=SQLAlchemyError())
+    encrypted_notification = encryption.encrypt(_notification_json(sample_email_template, "test@example.gov.uk"))
+    notification_id = str(uuid.uuid4())
+
+    save_emails(str(sample_email_template.service_id), [[notification_id, encrypted_notification]])
+
+    tasks.save_email.apply_async.assert_called_once_with(
+        (str(sample_email_template.service_id), notification_id, encrypted_notification), {}, queue="retry-tasks"
+    )
+    assert not provider_tasks.deliver_email_batch.apply_async.called
+
+
 def test_save_email_should_go_to_retry_queue_if_database_errors(sample_email_template, mocker):
     notification = _notification_json(sample_email_template, "test@example.gov.uk")
 
@@ -131,3 +131,90 @@ def test_send_email_raises_other_errs_as_AwsSesClientException(mocker):
         )
 
     assert 'some error message from amazon' in str(excinfo.value)
+
+
+def test_send_bulk_templated_email_returns_a_message_id_per_destination(notify_api, mocker):
+    boto_mock = mocker.patch.object(aws_ses_client, '_client', create=True)
+    mocker.patch.object(aws_ses_client, 'statsd_client', create=True)
+    boto_mock.send_bulk_templated_email.side_effect = lambda **kwargs: {'Status': [
+        {'Status': 'Success', 'MessageId': destination['Destination']['ToAddresses'][0]}
+        if destination['Destination']['ToAddresses'][0] != 'rejected@address.com'
+        else {'Status': 'MessageRejected', 'Error': 'rejected'}
+        for destination in kwargs['Destinations']
+    ]}
+    destinations = [('{}@address.com'.format(i), {'t0': str(i)}) for i in range(60)]
+    destinations[55] = ('rejected@address.com', {'t0': '55'})
+
+    with notify_api.app_context():
+        message_ids = aws_ses_client.send_bulk_templated_email(
+            'from@address.com', 'address.com', 'notify-template', destinations, reply_to_address='føøøø@bååååår.com'
+        )
+
+    assert boto_mock.send_bulk_templated_email.call_count == 2
+    first_call = boto_mock.send_bulk_templated_email.call_args_list[0][1]
+    assert len(first_call['Destinations']) == 50
+    assert first_call['Template'] == 'notify-template'
+    assert first_call['ReplyToAddresses'] == ['føøøø@xn--br-yiaaaaa.com']
+    assert first_call['Destinations'][1]['ReplacementTemplateData'] == '{"t0": "1"}'
+    assert len(boto_mock.send_bulk_templated_email.call_args_list[1][1]['Destinations']) == 10
+    assert message_ids[:2] == ['0@address.com', '1@address.com']
+    assert message_ids[55] is None
+    assert len(message_ids) == 60
+
+
+def test_send_bulk_templated_email_raises_aws_exception(notify_api, mocker):
+    boto_mock = mocker.patch.object(aws_ses_client, '_client', create=True)
+    mocker.patch.object(aws_ses_client, 'statsd_client', create=True)
+    mocker.patch.object(aws_ses_client, '_templates', {'notify-template'})
+    error_response = {'Error': {'Code': 'TemplateDoesNotExist', 'Message': 'Template does not exist'}}
+    boto_mock.send_bulk_templated_email.side_effect = botocore.exceptions.ClientError(
+        error_response, 'SendBulkTemplatedEmail'
+    )
+
+    with notify_api.app_context(), pytest.raises(AwsSesClientException):
+        aws_ses_client.send_bulk_templated_email(
+            'from@address.com', 'address.com', 'notify-template', [('to@address.com', {})]
+        )
+
+    # it no longer exists, so it is created again before the next batch
+    assert aws_ses_client._templates == set()
+
+
+def test_create_template_only_creates_a_template_once(notify_api, mocker):
+    boto_mock = mocker.patch.object(aws_ses_client, '_client', create=True)
+    mocker.patch.object(aws_ses_client, 'statsd_client', create=True)
+    mocker.patch.object(aws_ses_client, '_templates', set())
+    boto_mock.create_template.side_effect = botocore.exceptions.ClientError(
+        {'Error': {'Code': 'AlreadyExists', 'Message': 'Template exists'}}, 'CreateTemplate'
+    )
+    template = {'TemplateName': 'notify-template', 'SubjectPart': 'Subject', 'HtmlPart': 'Html', 'TextPart': 'Text'}
+
+    aws_ses_client.create_template(template)
+    aws_ses_client.create_template(template)
+
+    boto_mock.create_template.assert_called_once_with(Template=template)
+
+
+def test_delete_template_ignores_templates_that_no_longer_exist(notify_api, mocker):
+    boto_mock = mocker.patch.object(aws_ses_client, '_client', create=True)
+    mocker.patch.object(aws_ses_client, 'statsd_client', create=True)
+    mocker.patch.object(aws_ses_client, '_templates', {'notify-template'})
+    boto_mock.delete_template.side_effect = botocore.exceptions.ClientError(
+        {'Error': {'Code': 'TemplateDoesNotExist', 'Message': 'Template does not exist'}}, 'DeleteTemplate'
+    )
+
+    aws_ses_client.delete_template('notify-template')
+
+    boto_mock.delete_template.assert_called_once_with(TemplateName='notify-template')
+    assert aws_ses_client._templates == set()
+
+
+def test_list_templates_follows_pages(notify_api, mocker):
+    boto_mock = mocker.patch.object(aws_ses_client, '_client', create=True)
+    boto_mock.list_templates.side_effect = [
+        {'TemplatesMetadata': [{'Name': 'first', 'CreatedTimestamp': 1}], 'NextToken': 'next'},
+        {'TemplatesMetadata': [{'Name': 'second', 'CreatedTimestamp': 2}]},
+    ]
+
+    assert list(aws_ses_client.list_templates()) == [('first', 1), ('second', 2)]
+    assert boto_mock.list_templates.call_args_list[1][1] == {'MaxItems': 100, 'NextToken': 'next'}
@@ -0,0 +1,117 @@
+import json
+
+import pytest
+from freezegun import freeze_time
+
+from app.clients.mlwr import mlwr
+from app.clients.mlwr.mlwr import (
+    check_mlwr_score,
+    get_pending_mlwr_sids,
+    is_completed,
+    is_malware,
+    mlwr_verdict_key,
+    pop_notifications_waiting_for_mlwr_scan,
+    wait_for_mlwr_scan,
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_mlwr_caches():
+    mlwr.verdict_cache.clear()
+    mlwr._client = None
+    yield
+    mlwr.verdict_cache.clear()
+    mlwr._client = None
+
+
+def test_get_mlwr_client_is_created_once(notify_api, mocker):
+    mock_client = mocker.patch('app.clients.mlwr.mlwr.Client')
+
+    assert mlwr.get_mlwr_client() is mlwr.get_mlwr_client()
+    assert mock_client.call_count == 1
+
+
+def test_check_mlwr_score_caches_completed_verdicts(notify_api, mocker):
+    client = mocker.patch('app.clients.mlwr.mlwr.Client').return_value
+    client.submission.return_value = {"state": "completed", "submission": {"max_score": 10, "sid": "foo"}}
+    mock_redis_set = mocker.patch('app.clients.mlwr.mlwr.redis_store.set')
+
+    first = check_mlwr_score("foo")
+    second = check_mlwr_score("foo")
+
+    assert first["submission"]["max_score"] == 10
+    assert second == {"state": "completed", "submission": {"max_score": 10}}
+    assert client.submission.call_count == 1
+    mock_redis_set.assert_called_once_with(
+        mlwr_verdict_key("foo"), json.dumps(second), ex=notify_api.config['EXPIRE_CACHE_EIGHT_DAYS']
+    )
+
+
+def test_check_mlwr_score_does_not_cache_pending_scans(notify_api, mocker):
+    client = mocker.patch('app.clients.mlwr.mlwr.Client').return_value
+    client.submission.return_value = {"state": "submitted"}
+
+    check_mlwr_score("foo")
+    check_mlwr_score("foo")
+
+    assert client.submission.call_count == 2
+
+
+def test_check_mlwr_score_reads_verdicts_cached_by_other_processes(notify_api, mocker):
+    mock_client = mocker.patch('app.clients.mlwr.mlwr.Client')
+    mocker.patch(
+        'app.clients.mlwr.mlwr.redis_store.get',
+        return_value=json.dumps({"state": "completed", "submission": {"max_score": 600}}).encode()
+    )
+
+    assert is_malware(check_mlwr_score("foo"))
+    assert not mock_client.called
+
+
+@pytest.mark.parametrize('submission, completed, malware', [
+    ({}, False, False),
+    ({"state": "submitted"}, False, False),
+    ({"state": "completed", "submission": {"max_score": 499}}, True, False),
+    ({"state": "completed", "submission": {"max_score": 500}}, True, True),
+])
+def test_is_completed_and_is_malware(submission, completed, malware):
+    assert is_completed(submission) is completed
+    assert is_malware(submission) is malware
+
+
+@freeze_time('2020-09-13 12:26:40')
+def test_wait_for_mlwr_scan_registers_sid_and_notification(notify_api, mocker):
+    mocker.patch('app.clients.mlwr.mlwr.redis_store.active', True)
+    pipe = mocker.patch('app.clients.mlwr.mlwr.redis_store.redis_store').pipeline.return_value
+
+    wait_for_mlwr_scan("foo", "1234")
+
+    pipe.sadd.assert_called_once_with('mlwr-waiting-foo', '1234')
+    pipe.zadd.assert_called_once_with(mlwr.MLWR_PENDING_SIDS_KEY, {'foo': 1600000000.0})
+    assert pipe.execute.called
+
+
+@freeze_time('2020-09-13 12:26:40')
+def test_get_pending_mlwr_sids_drops_sids_no_email_waited_on_for_eight_days(notify_api, mocker):
+    mocker.patch('app.clients.mlwr.mlwr.redis_store.active', True)
+    redis = mocker.patch('app.clients.mlwr.mlwr.redis_store.redis_store')
+    redis.zrangebyscore.return_value = [b'expired']
+    redis.zrange.return_value = [b'foo', b'bar']
+
+    assert get_pending_mlwr_sids() == ['foo', 'bar']
+
+    redis.zrangebyscore.assert_called_once_with(mlwr.MLWR_PENDING_SIDS_KEY, '-inf', 1600000000.0 - 8 * 24 * 60 * 60)
+    redis.pipeline.return_value.zrem.assert_called_once_with(mlwr.MLWR_PENDING_SIDS_KEY, 'expired')
+    redis.pipeline.return_value.delete.assert_called_once_with('mlwr-waiting-expired')
+    redis.pipeline.return_value.hdel.assert_called_once_with(mlwr.MLWR_CHECK_FAILURES_KEY, 'expired')
+
+
+def test_pop_notifications_waiting_for_mlwr_scan_forgets_the_sid(notify_api, mocker):
+    pipe = mocker.patch('app.clients.mlwr.mlwr.redis_store.redis_store').pipeline.return_value
+    pipe.execute.return_value = [{b'2', b'1'}, 1, 1, 0]
+
+    assert pop_notifications_waiting_for_mlwr_scan('foo') == ['1', '2']
+
+    pipe.delete.assert_called_once_with('mlwr-waiting-foo')
+    pipe.zrem.assert_called_once_with(mlwr.MLWR_PENDING_SIDS_KEY, 'foo')
+    pipe.hdel.assert_called_once_with(mlwr.MLWR_CHECK_FAILURES_KEY, 'foo')
@@ -0,0 +1,111 @@
+import email
+import re
+import unicodedata
+from email.header import Header, decode_header
+from email.mime.application import MIMEApplication
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+import pytest
+
+from app.clients.email import raw_email
+from app.clients.email.raw_email import build_raw_email
+
+
+def _as_string(to_addresses, subject, body, html_body, attachments, aws_ses_arn):
+    msg = MIMEMultipart('alternative' if html_body else 'mixed')
+    msg['Subject'] = subject
+    friendly_name = unicodedata.normalize('NFKD', 'Sérvice ')
+    msg['From'] = '{} <noreply@example.com>'.format(Header(friendly_name, 'utf-8').encode())
+    msg['To'] = ",".join(to_addresses)
+    if aws_ses_arn:
+        msg.add_header('X-SES-SOURCE-ARN', aws_ses_arn)
+        msg.add_header('X-SES-FROM-ARN', aws_ses_arn)
+    msg.attach(MIMEText(body.encode('utf-8'), 'plain', 'utf-8'))
+    if html_body:
+        msg.attach(MIMEText(html_body.encode('utf-8'), 'html', 'utf-8'))
+    for attachment in attachments:
+        part = MIMEApplication(attachment["data"])
+        part.add_header('Content-Disposition', 'attachment', filename=attachment["name"])
+        msg.attach(part)
+    return msg.as_string()
+
+
+@pytest.mark.parametrize('html_body, attachments, aws_ses_arn', [
+    ('', [], None),
+    ('<p>Bödy</p>', [], 'arn:aws:ses:ca-central-1:123:identity/example.com'),
+    ('<p>Bödy</p>', [{'name': 'pièce.pdf', 'data': b'%PDF-1.4' * 100}], None),
+])
+def test_build_raw_email_is_the_same_as_mime_multipart_as_string(html_body, attachments, aws_ses_arn):
+    args = (['to@example.com'], 'Sujet accentué ' * 10, 'Bödy\n' * 100, html_body, attachments, aws_ses_arn)
+
+    expected = _as_string(*args)
+    raw = build_raw_email(
+        '"Sérvice" <noreply@example.com>',
+        *args[:3],
+        html_body=html_body,
+        attachments=attachments,
+        aws_ses_arn=aws_ses_arn
+    )
+
+    boundary = re.search(r'boundary="([^"]+)"', raw).group(1)
+    expected_boundary = re.search(r'boundary="([^"]+)"', expected).group(1)
+    assert raw == expected.replace(expected_boundary, boundary)
+
+
+def test_build_raw_email_sets_recipient_headers():
+    raw = build_raw_email(
+        'noreply@example.com',
+        ['føøøø@bååååår.com'],
+        'Subject',
+        'Body',
+        reply_to_addresses=['reply@example.com'],
+        cc_addresses=['cc@example.com'],
+        importance='high',
+    )
+
+    message = email.message_from_string(raw)
+    [(to_address, charset)] = decode_header(message['To'])
+    assert to_address.decode(charset) == 'føøøø@xn--br-yiaaaaa.com'
+    assert message['CC'] == 'cc@example.com'
+    assert message['reply-to'] == 'reply@example.com'
+    assert message['importance'] == 'high'
+    assert message.get_payload()[0].get_payload(decode=True) == b'Body'
+
+
+def test_build_raw_email_encodes_each_attachment_once():
+    raw_email.attachment_parts.clear()
+    attachments = [{'name': 'document.pdf', 'data': b'%PDF-1.4 document'}]
+
+    first = build_raw_email('noreply@example.com', ['one@example.com'], 'Subject', 'Body', attachments=attachments)
+    second = build_raw_email(
+        'noreply@example.com', ['two@example.com'], 'Subject', 'Body', attachments=[dict(attachments[0])]
+    )
+
+    assert raw_email.attachment_parts.misses == 1
+    assert raw_email.attachment_parts.hits == 1
+    for raw in (first, second):
+        part = email.message_from_string(raw).get_payload()[1]
+        assert part.get_filename() == 'document.pdf'
+        assert part.get_payload(decode=True) == b'%PDF-1.4 document'
+
+
+def test_encoded_part_cache_is_bounded_by_the_size_of_the_parts():
+    cache = raw_email.EncodedPartCache(max_size=10)
+
+    cache.get_or_encode('first', lambda: '12345')
+    cache.get_or_encode('second', lambda: '12345')
+    cache.get_or_encode('first', lambda: 'unused')
+    cache.get_or_encode('third', lambda: '12345')
+    assert cache.get_or_encode('too large', lambda: '12345678901') == '12345678901'
+
+    assert list(cache._parts) == ['first', 'third']
+    assert cache.size == 10
+    assert (cache.hits, cache.misses) == (1, 4)
+
+
+def test_build_raw_email_uses_a_new_boundary_for_each_message():
+    first = build_raw_email('noreply@example.com', ['one@example.com'], 'Subject', 'Body')
+    second = build_raw_email('noreply@example.com', ['one@example.com'], 'Subject', 'Body')
+
+    assert re.search(r'boundary="([^"]+)"', first).group(1) != re.search(r'boundary="([^"]+)"', second).group(1)
@@ -8,6 +8,7 @@ from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from sqlalchemy.orm.exc import NoResultFound
 
 
+from app.dao.dao_utils import approximate_count
 from app.dao.notifications_dao import (
     dao_create_notification,
     dao_created_scheduled_notification,
@@ -15,8 +16,9 @@ from app.dao.notifications_dao import (
     dao_get_last_notification_added_for_job_id,
     dao_get_last_template_usage,
     dao_get_notifications_by_to_field,
-    dao_get_scheduled_notifications,
-    dao_timeout_notifications,
+    dao_claim_scheduled_notifications,
+    dao_stream_notifications_for_service_for_csv,
+    dao_timeout_notifications_in_chunks,
     dao_update_notification,
     dao_update_notifications_by_reference,
     delete_notifications_older_than_retention_by_type,
@@ -26,13 +28,15 @@ from app.dao.notifications_dao import (
     get_notifications_for_job,
     get_notifications_for_service,
     is_delivery_slow_for_provider,
-    set_scheduled_notification_to_processed,
+    set_scheduled_notifications_to_processed,
     update_notification_status_by_id,
     update_notification_status_by_reference,
     dao_get_notification_by_reference,
     dao_get_notifications_by_references,
+    dao_get_notification_for_delivery,
+    dao_get_notifications_for_delivery,
     dao_get_notification_history_by_reference,
-    notifications_not_yet_sent,
+    notifications_not_yet_sent_in_pages,
 )
 from app.models import (
     Job,
@@ -52,12 +56,14 @@ from app.models import (
     JOB_STATUS_IN_PROGRESS
 )
 from tests.app.db import (
+    create_email_branding,
     create_job,
     create_notification,
     create_service,
     create_template,
     create_notification_history
 )
+from tests.conftest import set_config
 
 
 def test_should_have_decorated_notifications_dao_functions():
@@ -655,7 +661,14 @@ def _notification_json(sample_template, job_id=None, id=None, status=None):
     return data
 
 
-def test_dao_timeout_notifications(sample_template):
+def _timeout_notifications(timeout_period_in_seconds, chunk_size=10000):
+    timed_out = {'technical-failure': [], 'temporary-failure': []}
+    for new_status, rows in dao_timeout_notifications_in_chunks(timeout_period_in_seconds, chunk_size):
+        timed_out[new_status].extend(rows)
+    return timed_out['technical-failure'], timed_out['temporary-failure']
+
+
+def test_dao_timeout_notifications_in_chunks(sample_template):
     with freeze_time(datetime.utcnow() - timedelta(minutes=2)):
         created = create_notification(sample_template, status='created')
         sending = create_notification(sample_template, status='sending')
@@ -666,7 +679,7 @@ def test_dao_timeout_notifications(sample_template):
     assert Notification.query.get(sending.id).status == 'sending'
     assert Notification.query.get(pending.id).status == 'pending'
     assert Notification.query.get(delivered.id).status == 'delivered'
-    technical_failure_notifications, temporary_failure_notifications = dao_timeout_notifications(1)
+    technical_failure_notifications, temporary_failure_notifications = _timeout_notifications(1)
     assert Notification.query.get(created.id).status == 'technical-failure'
     assert Notification.query.get(sending.id).status == 'temporary-failure'
     assert Notification.query.get(pending.id).status == 'temporary-failure'
@@ -674,7 +687,7 @@ def test_dao_timeout_notifications(sample_template):
     assert len(technical_failure_notifications + temporary_failure_notifications) == 3
 
 
-def test_dao_timeout_notifications_only_updates_for_older_notifications(sample_template):
+def test_dao_timeout_notifications_in_chunks_only_updates_for_older_notifications(sample_template):
     with freeze_time(datetime.utcnow() + timedelta(minutes=10)):
         created = create_notification(sample_template, status='created')
         sending = create_notification(sample_template, status='sending')
@@ -685,11 +698,11 @@ def test_dao_timeout_notifications_only_updates_for_older_notifications(sample_t
     assert Notification.query.get(sending.id).status == 'sending'
     assert Notification.query.get(pending.id).status == 'pending'
     assert Notification.query.get(delivered.id).status == 'delivered'
-    technical_failure_notifications, temporary_failure_notifications = dao_timeout_notifications(1)
+    technical_failure_notifications, temporary_failure_notifications = _timeout_notifications(1)
     assert len(technical_failure_notifications + temporary_failure_notifications) == 0
 
 
-def test_dao_timeout_notifications_doesnt_affect_letters(sample_letter_template):
+def test_dao_timeout_notifications_in_chunks_doesnt_affect_letters(sample_letter_template):
     with freeze_time(datetime.utcnow() - timedelta(minutes=2)):
         created = create_notification(sample_letter_template, status='created')
         sending = create_notification(sample_letter_template, status='sending')
@@ -701,7 +714,36 @@ def test_dao_timeout_notifications_doesnt_affect_letters(sample_letter_template)
     assert Notification.query.get(pending.id).status == 'pending'
     assert Notification.query.get(delivered.id).status == 'delivered'
 
-    technical_failure_notifications, temporary_failure_notifications = dao_timeout_notifications(1)
+    technical_failure_notifications, temporary_failure_notifications = _timeout_notifications(1)
+
+
+def test_dao_timeout_notifications_in_chunks_processes_all_notifications_in_chunks(sample_template):
+    with freeze_time(datetime.utcnow() - timedelta(minutes=2)):
+        created = [create_notification(sample_template, status='created') for _ in range(3)]
+        sending = [create_notification(sample_template, status='sending') for _ in range(2)]
+
+    technical_failure_notifications, temporary_failure_notifications = _timeout_notifications(1, chunk_size=2)
+
+    assert {n.id for n in technical_failure_notifications} == {n.id for n in created}
+    assert {n.id for n in temporary_failure_notifications} == {n.id for n in sending}
+    assert {Notification.query.get(n.id).status for n in created} == {'technical-failure'}
+    assert {Notification.query.get(n.id).status for n in sending} == {'temporary-failure'}
+
+
+def test_dao_timeout_notifications_in_chunks_yields_chunks_in_created_at_order(sample_template):
+    now = datetime.utcnow()
+    notifications = [
+        create_notification(sample_template, status='sending', created_at=now - timedelta(minutes=10 - i))
+        for i in range(5)
+    ]
+
+    chunks = list(dao_timeout_notifications_in_chunks(60, chunk_size=2))
+
+    assert [len(rows) for _, rows in chunks] == [2, 2, 1]
+    assert {status for status, _ in chunks} == {'temporary-failure'}
+    assert [row.id for _, rows in chunks for row in sorted(rows, key=lambda row: row.created_at)] == [
+        n.id for n in notifications
+    ]
 
 
 def test_should_return_notifications_excluding_jobs_by_default(sample_template, sample_job, sample_api_key):
@@ -745,6 +787,82 @@ def test_should_not_count_pages_when_given_a_flag(sample_user, sample_template):
     assert pagination.items[0].id == notification.id
 
 
+def test_get_notifications_for_service_older_than_pages_through_notifications_created_at_the_same_time(
+    sample_template
+):
+    created_at = datetime(2020, 3, 1, 12)
+    notifications = [create_notification(sample_template, created_at=created_at) for _ in range(3)]
+    newest = create_notification(sample_template, created_at=created_at + timedelta(seconds=1))
+    expected = [newest] + sorted(notifications, key=lambda notification: notification.id, reverse=True)
+
+    pages = []
+    older_than = newest.id
+    while older_than:
+        pagination = get_notifications_for_service(
+            sample_template.service_id, page=3, page_size=2, older_than=older_than
+        )
+        assert pagination.total is None
+        pages.append([notification.id for notification in pagination.items])
+        older_than = pagination.items[-1].id if len(pagination.items) == 2 else None
+
+    assert pages == [[expected[1].id, expected[2].id], [expected[3].id]]
+
+
+def test_get_notifications_for_service_older_than_an_unknown_notification_is_empty(sample_template):
+    create_notification(sample_template)
+
+    assert get_notifications_for_service(sample_template.service_id, older_than=uuid.uuid4()).items == []
+
+
+def test_get_notifications_for_service_approximate_count_uses_the_query_planner_estimate(sample_template, mocker):
+    approximate_count = mocker.patch('app.dao.notifications_dao.dao_utils.approximate_count', return_value=120)
+    create_notification(sample_template)
+
+    pagination = get_notifications_for_service(sample_template.service_id, page_size=50, approximate_count=True)
+
+    assert len(pagination.items) == 1
+    assert pagination.total == 120
+    assert pagination.pages == 3
+    assert approximate_count.called
+
+
+def test_dao_stream_notifications_for_service_for_csv(sample_template, sample_user):
+    job = create_job(sample_template, original_file_name='contacts.csv')
+    from_job = create_notification(job=job, job_row_number=4, created_at=datetime(2020, 3, 1, 12))
+    one_off = create_notification(sample_template, created_by_id=sample_user.id, created_at=datetime(2020, 3, 1, 13))
+    create_notification(sample_template, key_type=KEY_TYPE_TEST)
+
+    rows = list(dao_stream_notifications_for_service_for_csv(sample_template.service_id, chunk_size=1))
+
+    assert [row.job_row_number for row in rows] == [one_off.job_row_number, from_job.job_row_number]
+    assert rows[0].recipient == one_off.to
+    assert rows[0].template_name == sample_template.name
+    assert rows[0].template_type == sample_template.template_type
+    assert rows[0].created_by_name == sample_user.name
+    assert rows[0].created_by_email_address == sample_user.email_address
+    assert rows[0].job_name is None
+    assert rows[1].job_name == 'contacts.csv'
+    assert rows[1].created_by_name is None
+
+
+def test_dao_stream_notifications_for_service_for_csv_filters_notifications(sample_template, sample_job):
+    create_notification(job=sample_job, status='delivered')
+    create_notification(sample_template, status='delivered')
+    create_notification(sample_template, status='created')
+
+    rows = list(dao_stream_notifications_for_service_for_csv(
+        sample_template.service_id, filter_dict={'status': ['delivered']}, include_jobs=False
+    ))
+
+    assert [row.status for row in rows] == ['delivered']
+
+
+def test_approximate_count_estimates_the_rows_of_a_query(sample_template):
+    create_notification(sample_template)
+
+    assert approximate_count(Notification.query.filter(Notification.service_id == sample_template.service_id)) >= 1
+
+
 def test_get_notifications_created_by_api_or_csv_are_returned_correctly_excluding_test_key_notifications(
         notify_db,
         notify_db_session,
@@ -1210,6 +1328,61 @@ def test_dao_get_notifications_by_to_field_only_searches_one_notification_type(
     assert results[0].id == email.id
 
 
+def test_dao_get_notifications_by_to_field_matches_full_recipients_exactly(sample_email_template):
+    notification = create_notification(
+        template=sample_email_template, to_field='jack@gmail.com', normalised_to='jack@gmail.com'
+    )
+    create_notification(
+        template=sample_email_template, to_field='ajack@gmail.com', normalised_to='ajack@gmail.com'
+    )
+
+    results = dao_get_notifications_by_to_field(notification.service_id, 'Jack@gmail.com', notification_type='email')
+
+    assert [result.id for result in results] == [notification.id]
+
+
+def test_dao_get_notifications_by_to_field_matches_full_phone_numbers_normalised_without_plus(sample_template):
+    notification = create_notification(
+        template=sample_template, to_field='6502532222', normalised_to='16502532222'
+    )
+
+    results = dao_get_notifications_by_to_field(notification.service_id, '+1 650 253 2222', notification_type='sms')
+
+    assert [result.id for result in results] == [notification.id]
+
+
+def test_dao_get_notifications_by_to_field_pages_through_results(sample_template):
+    notifications = [
+        create_notification(
+            template=sample_template,
+            to_field='+16502532222',
+            normalised_to='+16502532222',
+            created_at=datetime.utcnow() - timedelta(minutes=i)
+        )
+        for i in range(3)
+    ]
+
+    first_page = dao_get_notifications_by_to_field(
+        sample_template.service_id, '650253', notification_type='sms', page_size=2
+    )
+    second_page = dao_get_notifications_by_to_field(
+        sample_template.service_id, '650253', notification_type='sms', page_size=2, older_than=first_page[-1].id
+    )
+
+    assert [result.id for result in first_page] == [notifications[0].id, notifications[1].id]
+    assert [result.id for result in second_page] == [notifications[2].id]
+
+
+def test_dao_get_notifications_by_to_field_returns_a_page_by_default(notify_api, sample_template):
+    for _ in range(3):
+        create_notification(template=sample_template, to_field='+16502532222', normalised_to='+16502532222')
+
+    with set_config(notify_api, 'PAGE_SIZE', 2):
+        results = dao_get_notifications_by_to_field(sample_template.service_id, '+16502532222')
+
+    assert len(results) == 2
+
+
 def test_dao_created_scheduled_notification(sample_notification):
 
     scheduled_notification = ScheduledNotification(notification_id=sample_notification.id,
@@ -1222,28 +1395,45 @@ def test_dao_created_scheduled_notification(sample_notification):
     assert saved_notification[0].scheduled_for == datetime(2017, 1, 5, 14, 15)
 
 
-def test_dao_get_scheduled_notifications(sample_template):
+def test_dao_claim_scheduled_notifications_returns_due_notifications_earliest_first(sample_template):
     notification_1 = create_notification(template=sample_template, scheduled_for='2017-05-05 14:15',
                                          status='created')
+    notification_2 = create_notification(template=sample_template, scheduled_for='2017-05-05 14:10',
+                                         status='created')
+    create_notification(template=sample_template, scheduled_for='2017-05-05 14:20', status='created')
     create_notification(template=sample_template, scheduled_for='2017-05-04 14:15', status='delivered')
     create_notification(template=sample_template, status='created')
-    scheduled_notifications = dao_get_scheduled_notifications()
-    assert len(scheduled_notifications) == 1
-    assert scheduled_notifications[0].id == notification_1.id
-    assert scheduled_notifications[0].scheduled_notification.pending
 
+    claimed = dao_claim_scheduled_notifications(batch_size=2)
 
-def test_set_scheduled_notification_to_processed(sample_template):
+    assert [row.id for row in claimed] == [notification_2.id, notification_1.id]
+    assert claimed[0].notification_type == 'sms'
+    assert claimed[0].key_type == 'normal'
+    assert claimed[0].research_mode is False
+
+
+def test_dao_claim_scheduled_notifications_ignores_future_and_processed_notifications(sample_template):
+    with freeze_time('2017-05-05 14:00'):
+        due = create_notification(template=sample_template, scheduled_for='2017-05-05 13:15', status='created')
+        processed = create_notification(template=sample_template, scheduled_for='2017-05-05 13:15',
+                                        status='created')
+        create_notification(template=sample_template, scheduled_for='2017-05-05 14:15', status='created')
+        set_scheduled_notifications_to_processed([processed.id])
+
+        assert [row.id for row in dao_claim_scheduled_notifications(batch_size=10)] == [due.id]
+
+
+def test_set_scheduled_notifications_to_processed(sample_template):
     notification_1 = create_notification(template=sample_template, scheduled_for='2017-05-05 14:15',
                                          status='created')
-    scheduled_notifications = dao_get_scheduled_notifications()
-    assert len(scheduled_notifications) == 1
-    assert scheduled_notifications[0].id == notification_1.id
-    assert scheduled_notifications[0].scheduled_notification.pending
+    notification_2 = create_notification(template=sample_template, scheduled_for='2017-05-05 14:15',
+                                         status='created')
+    notification_3 = create_notification(template=sample_template, scheduled_for='2017-05-05 14:15',
+                                         status='created')
+
+    set_scheduled_notifications_to_processed([notification_1.id, notification_2.id])
 
-    set_scheduled_notification_to_processed(notification_1.id)
-    scheduled_notifications = dao_get_scheduled_notifications()
-    assert not scheduled_notifications
+    assert [row.id for row in dao_claim_scheduled_notifications(batch_size=10)] == [notification_3.id]
 
 
 def test_dao_get_notifications_by_to_field_filters_status(sample_template):
@@ -1503,6 +1693,14 @@ def test_dao_get_notification_history_by_reference_with_no_matches_raises_error(
         dao_get_notification_history_by_reference('REF1')
 
 
+def _not_yet_sent(should_be_sending_after_seconds, notification_type):
+    return [
+        row.id
+        for page in notifications_not_yet_sent_in_pages(should_be_sending_after_seconds, notification_type, 10)
+        for row in page
+    ]
+
+
 @pytest.mark.parametrize("notification_type",
                          ["letter", "email", "sms"]
                          )
@@ -1517,9 +1715,7 @@ def test_notifications_not_yet_sent(sample_service, notification_type):
                         status='sending')
     create_notification(template=template, created_at=datetime.utcnow(), status='created')
 
-    results = notifications_not_yet_sent(older_than, notification_type)
-    assert len(results) == 1
-    assert results[0] == old_notification
+    assert _not_yet_sent(older_than, notification_type) == [old_notification.id]
 
 
 @pytest.mark.parametrize("notification_type",
@@ -1536,5 +1732,49 @@ def test_notifications_not_yet_sent_return_no_rows(sample_service, notification_
                         status='sending')
     create_notification(template=template, created_at=datetime.utcnow(), status='delivered')
 
-    results = notifications_not_yet_sent(older_than, notification_type)
-    assert len(results) == 0
+    assert _not_yet_sent(older_than, notification_type) == []
+
+
+def test_notifications_not_yet_sent_in_pages(sample_service):
+    template = create_template(service=sample_service, template_type='sms')
+    old_notifications = [
+        create_notification(template=template,
+                            created_at=datetime.utcnow() - timedelta(seconds=10 + i),
+                            status='created')
+        for i in range(3)
+    ]
+    create_notification(template=template, created_at=datetime.utcnow() - timedelta(seconds=10), status='sending')
+    create_notification(template=template, created_at=datetime.utcnow(), status='created')
+
+    pages = list(notifications_not_yet_sent_in_pages(5, 'sms', page_size=2))
+
+    assert [len(page) for page in pages] == [2, 1]
+    assert [row.id for page in pages for row in page] == [n.id for n in reversed(old_notifications)]
+
+
+def test_dao_get_notification_for_delivery_loads_the_service_and_branding_with_it(
+    notify_db_session, sample_email_template
+):
+    sample_email_template.service.email_branding = create_email_branding()
+    notification = create_notification(template=sample_email_template)
+    notify_db_session.session.expunge_all()
+
+    notification = dao_get_notification_for_delivery(notification.id)
+
+    assert 'service' in notification.__dict__
+    assert notification.service.__dict__['email_branding'].name == 'test_org_1'
+
+
+def test_dao_get_notification_for_delivery_returns_none_if_not_found(notify_db_session):
+    assert dao_get_notification_for_delivery(uuid.uuid4()) is None
+
+
+def test_dao_get_notifications_for_delivery(notify_db_session, sample_template):
+    notifications = [create_notification(template=sample_template) for _ in range(2)]
+    create_notification(template=sample_template)
+    notify_db_session.session.expunge_all()
+
+    results = dao_get_notifications_for_delivery([notification.id for notification in notifications])
+
+    assert {result.id for result in results} == {notification.id for notification in notifications}
+    assert all('service' in result.__dict__ for result in results)
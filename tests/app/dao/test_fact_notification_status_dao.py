@@ -6,6 +6,7 @@ import mock
 
 from app.dao.fact_notification_status_dao import (
     update_fact_notification_status,
+    update_fact_notification_status_for_month,
     fetch_monthly_notification_statuses_per_service,
     fetch_notification_status_for_day,
     fetch_notification_status_for_service_by_month,
@@ -13,6 +14,7 @@ from app.dao.fact_notification_status_dao import (
     fetch_notification_status_for_service_for_today_and_7_previous_days,
     fetch_notification_status_totals_for_all_services,
     fetch_notification_statuses_for_job,
+    fetch_notification_statuses_for_jobs,
     fetch_stats_for_all_services_by_date_range, fetch_monthly_template_usage_for_service,
     get_total_sent_notifications_for_day_and_type,
     get_total_notifications_sent_for_api_key,
@@ -21,6 +23,7 @@ from app.dao.fact_notification_status_dao import (
 )
 from app.models import (
     FactNotificationStatus,
+    FactNotificationStatusMonthly,
     KEY_TYPE_NORMAL,
     KEY_TYPE_TEST,
     KEY_TYPE_TEAM,
@@ -121,6 +124,27 @@ def test__update_fact_notification_status_updates_row(notify_db_session):
     assert updated_fact_data[0].notification_count == 2
 
 
+def test_update_fact_notification_status_for_month(notify_db_session):
+    service = create_service()
+    template = create_template(service=service)
+    create_ft_notification_status(date(2018, 1, 1), template=template, count=4)
+    create_ft_notification_status(date(2018, 1, 31), template=template, count=10)
+    create_ft_notification_status(date(2018, 2, 1), template=template, count=1)
+    create_ft_notification_status(date(2018, 1, 2), template=template, notification_status='created', count=2)
+    FactNotificationStatus.query.filter(FactNotificationStatus.notification_status == 'created').delete()
+    FactNotificationStatus.query.filter(FactNotificationStatus.bst_date == date(2018, 1, 31)).update(
+        {'notification_count': 20}
+    )
+
+    update_fact_notification_status_for_month(date(2018, 1, 15))
+
+    monthly = FactNotificationStatusMonthly.query.order_by(FactNotificationStatusMonthly.month).all()
+    assert [(row.month, row.template_id, row.notification_status, row.notification_count) for row in monthly] == [
+        (date(2018, 1, 1), template.id, 'delivered', 24),
+        (date(2018, 2, 1), template.id, 'delivered', 1),
+    ]
+
+
 def test_fetch_notification_status_for_service_by_month(notify_db_session):
     service_1 = create_service(service_name='service_1')
     service_2 = create_service(service_name='service_2')
@@ -496,6 +520,22 @@ def test_fetch_notification_statuses_for_job(sample_template):
     }
 
 
+def test_fetch_notification_statuses_for_jobs(sample_template):
+    j1 = create_job(sample_template)
+    j2 = create_job(sample_template)
+    j3 = create_job(sample_template)
+
+    create_ft_notification_status(date(2018, 10, 1), job=j1, notification_status='created', count=1)
+    create_ft_notification_status(date(2018, 10, 2), job=j1, notification_status='created', count=4)
+    create_ft_notification_status(date(2018, 10, 1), job=j2, notification_status='delivered', count=8)
+    create_ft_notification_status(date(2018, 10, 1), job=j3, notification_status='created', count=16)
+
+    assert {(x.job_id, x.status): x.count for x in fetch_notification_statuses_for_jobs([j1.id, j2.id])} == {
+        (j1.id, 'created'): 5,
+        (j2.id, 'delivered'): 8,
+    }
+
+
 @freeze_time('2018-10-31 14:00')
 def test_fetch_stats_for_all_services_by_date_range(notify_db_session):
     service_1, service_2 = set_up_data()
@@ -21,10 +21,13 @@ from app.dao.fact_billing_dao import (
     fetch_sms_billing_for_all_services,
     fetch_letter_costs_for_all_services,
     fetch_letter_line_items_for_all_services,
-    fetch_usage_by_organisation)
+    fetch_usage_by_organisation,
+    update_fact_billing_sms_cumulative_for_year,
+)
 from app.dao.organisation_dao import dao_add_service_to_organisation
 from app.models import (
     FactBilling,
+    FactBillingSmsCumulative,
     Notification,
     NOTIFICATION_STATUS_TYPES,
 )
@@ -392,7 +395,7 @@ def test_fetch_monthly_billing_for_year(notify_db_session):
 
 
 @freeze_time('2018-08-01 13:30:00')
-def test_fetch_monthly_billing_for_year_adds_data_for_today(notify_db_session):
+def test_fetch_monthly_billing_for_year_only_reads_ft_billing(notify_db_session):
     service = create_service()
     template = create_template(service=service, template_type="email")
     for i in range(1, 32):
@@ -406,8 +409,8 @@ def test_fetch_monthly_billing_for_year_adds_data_for_today(notify_db_session):
     assert db.session.query(FactBilling.bst_date).count() == 31
     results = fetch_monthly_billing_for_year(service_id=service.id,
                                              year=2018)
-    assert db.session.query(FactBilling.bst_date).count() == 32
-    assert len(results) == 2
+    assert db.session.query(FactBilling.bst_date).count() == 31
+    assert len(results) == 1
 
 
 # This test assumes the local timezone is EST
@@ -521,6 +524,50 @@ def test_fetch_sms_free_allowance_remainder_with_two_services(notify_db_session)
     assert service_2_result[0] == (service_2.id, 20, 22, 0)
 
 
+def test_fetch_sms_free_allowance_remainder_uses_the_last_day_before_start_date(notify_db_session):
+    service = create_service()
+    template = create_template(service=service)
+    create_annual_billing(service_id=service.id, free_sms_fragment_limit=10, financial_year_start=2016)
+    # last financial year
+    create_ft_billing(service=service, template=template, utc_date=date(2016, 3, 31), notification_type='sms',
+                      billable_unit=4)
+    create_ft_billing(service=service, template=template, utc_date=date(2016, 4, 20), notification_type='sms',
+                      billable_unit=2, rate_multiplier=2)
+    create_ft_billing(service=service, template=template, utc_date=date(2016, 5, 1), notification_type='sms',
+                      billable_unit=3)
+
+    results = fetch_sms_free_allowance_remainder(datetime(2016, 5, 1)).all()
+
+    assert results == [(service.id, 10, 4, 6)]
+
+
+def test_update_fact_billing_sms_cumulative_for_year(notify_db_session):
+    service = create_service()
+    sms_template = create_template(service=service)
+    email_template = create_template(service=service, template_type='email')
+    for bst_date, billable_units in [(date(2019, 3, 31), 7), (date(2019, 4, 1), 1), (date(2019, 4, 3), 2)]:
+        create_ft_billing(service=service, template=sms_template, utc_date=bst_date, notification_type='sms',
+                          billable_unit=billable_units)
+    create_ft_billing(service=service, template=email_template, utc_date=date(2019, 4, 2), notification_type='email')
+    # facts added behind its back are picked up the next time the year is rebuilt
+    db.session.add(FactBilling(
+        bst_date=date(2019, 4, 2), service_id=service.id, template_id=sms_template.id, notification_type='sms',
+        provider='test', rate_multiplier=3, international=False, rate=0, postage='none', billable_units=1,
+        notifications_sent=1,
+    ))
+    db.session.commit()
+
+    update_fact_billing_sms_cumulative_for_year(date(2019, 6, 1))
+
+    rows = FactBillingSmsCumulative.query.order_by(FactBillingSmsCumulative.bst_date).all()
+    assert [(row.bst_date, row.financial_year_start, row.billable_units) for row in rows] == [
+        (date(2019, 3, 31), 2018, 7),
+        (date(2019, 4, 1), 2019, 1),
+        (date(2019, 4, 2), 2019, 4),
+        (date(2019, 4, 3), 2019, 6),
+    ]
+
+
 def test_fetch_sms_billing_for_all_services_for_first_quarter(notify_db_session):
     # This test is useful because the inner query resultset is empty.
     service = create_service(service_name='a - has free allowance')
@@ -14,6 +14,7 @@ from app.dao.jobs_dao import (
     dao_get_jobs_by_service_id,
     dao_get_jobs_older_than_data_retention,
     dao_get_notification_outcomes_for_job,
+    dao_get_notification_outcomes_for_jobs,
     dao_set_scheduled_jobs_to_pending,
     dao_update_job,
 )
@@ -58,6 +59,23 @@ def test_should_return_notifications_only_for_this_job(sample_template):
     assert {row.status: row.count for row in results} == {'created': 1}
 
 
+def test_dao_get_notification_outcomes_for_jobs_groups_by_job(sample_template):
+    job_1 = create_job(sample_template)
+    job_2 = create_job(sample_template)
+    job_3 = create_job(sample_template)
+
+    create_notification(sample_template, job=job_1, status='created')
+    create_notification(sample_template, job=job_1, status='created')
+    create_notification(sample_template, job=job_2, status='sent')
+    create_notification(sample_template, job=job_3, status='sent')
+
+    results = dao_get_notification_outcomes_for_jobs(sample_template.service_id, [job_1.id, job_2.id])
+    assert sorted((row.job_id == job_1.id, row.status, row.count) for row in results) == [
+        (False, 'sent', 1),
+        (True, 'created', 2),
+    ]
+
+
 def test_should_return_notifications_only_for_this_service(sample_notification_with_job):
     other_service = create_service(service_name='one')
     other_template = create_template(service=other_service)
@@ -212,6 +230,19 @@ def test_set_scheduled_jobs_to_pending_updates_rows(sample_template):
     assert jobs[1].job_status == 'pending'
 
 
+def test_set_scheduled_jobs_to_pending_only_claims_up_to_limit(sample_template):
+    one_minute_ago = datetime.utcnow() - timedelta(minutes=1)
+    one_hour_ago = datetime.utcnow() - timedelta(minutes=60)
+    job_new = create_job(sample_template, scheduled_for=one_minute_ago, job_status='scheduled')
+    job_old = create_job(sample_template, scheduled_for=one_hour_ago, job_status='scheduled')
+
+    jobs = dao_set_scheduled_jobs_to_pending(limit=1)
+
+    assert [job.id for job in jobs] == [job_old.id]
+    assert Job.query.get(job_new.id).job_status == 'scheduled'
+    assert [job.id for job in dao_set_scheduled_jobs_to_pending(limit=1)] == [job_new.id]
+
+
 def test_get_future_scheduled_job_gets_a_job_yet_to_send(sample_scheduled_job):
     result = dao_get_future_scheduled_job_by_id_and_service_id(sample_scheduled_job.id, sample_scheduled_job.service_id)
     assert result.id == sample_scheduled_job.id
@@ -0,0 +1,191 @@
+import uuid
+from datetime import date, datetime
+
+from freezegun import freeze_time
+from sqlalchemy.orm import sessionmaker
+
+from app import db
+from app.dao.notification_status_counts_dao import (
+    count_notification_statuses,
+    delete_notification_status_counts_older_than,
+    fold_notification_status_count_deltas,
+    notification_status_counts,
+    reconcile_notification_status_counts,
+    todays_notification_status_counts,
+)
+from app.models import (
+    Notification,
+    NotificationStatusCount,
+    NotificationStatusCountDelta,
+    KEY_TYPE_NORMAL,
+    KEY_TYPE_TEST,
+)
+from tests.app.db import create_service, create_template, create_notification
+
+
+def _counts():
+    return {
+        (row.bst_date, row.notification_status, row.key_type): row.notification_count
+        for row in db.session.query(notification_status_counts()).all()
+    }
+
+
+def _new_notification(template):
+    return Notification(
+        id=uuid.uuid4(),
+        to='+16502532222',
+        service_id=template.service_id,
+        template_id=template.id,
+        template_version=template.version,
+        key_type=KEY_TYPE_NORMAL,
+        notification_type=template.template_type,
+        created_at=datetime.utcnow(),
+        status='created',
+        billable_units=1,
+    )
+
+
+@freeze_time('2021-01-26T15:00:00')
+def test_creating_notifications_counts_them(notify_db_session):
+    template = create_template(service=create_service())
+    create_notification(template=template)
+    create_notification(template=template)
+    create_notification(template=template, status='delivered', key_type=KEY_TYPE_TEST)
+
+    assert _counts() == {
+        (date(2021, 1, 26), 'created', 'normal'): 2,
+        (date(2021, 1, 26), 'delivered', 'test'): 1,
+    }
+
+
+def test_concurrent_sends_of_a_template_do_not_wait_for_each_other(notify_db_session):
+    template = create_template(service=create_service())
+    Session = sessionmaker(bind=db.engine)
+    count_notification_statuses(Session)
+    first, second = Session(), Session()
+    try:
+        first.add(_new_notification(template))
+        first.flush()
+
+        # the first transaction is still open, the second would time out if it had to wait for it
+        second.execute("SET LOCAL lock_timeout = '1s'")
+        second.add(_new_notification(template))
+        second.flush()
+
+        assert second.query(NotificationStatusCountDelta).count() == 1
+    finally:
+        first.rollback()
+        second.rollback()
+        first.close()
+        second.close()
+
+
+@freeze_time('2021-01-26T15:00:00')
+def test_fold_notification_status_count_deltas(notify_db_session):
+    template = create_template(service=create_service())
+    create_notification(template=template)
+    assert fold_notification_status_count_deltas() == 1
+    create_notification(template=template)
+    create_notification(template=template, status='delivered')
+
+    assert fold_notification_status_count_deltas() == 2
+
+    assert NotificationStatusCountDelta.query.count() == 0
+    assert {
+        (row.notification_status, row.notification_count) for row in NotificationStatusCount.query.all()
+    } == {('created', 2), ('delivered', 1)}
+    assert _counts() == {
+        (date(2021, 1, 26), 'created', 'normal'): 2,
+        (date(2021, 1, 26), 'delivered', 'normal'): 1,
+    }
+
+
+@freeze_time('2021-01-26T15:00:00')
+def test_counts_add_the_deltas_not_yet_folded(notify_db_session):
+    template = create_template(service=create_service())
+    create_notification(template=template)
+    fold_notification_status_count_deltas()
+    create_notification(template=template)
+
+    assert _counts() == {(date(2021, 1, 26), 'created', 'normal'): 2}
+
+
+@freeze_time('2021-01-26T15:00:00')
+def test_changing_status_moves_the_count(notify_db_session):
+    template = create_template(service=create_service())
+    notification = create_notification(template=template)
+    create_notification(template=template)
+
+    notification.status = 'sending'
+    db.session.commit()
+
+    assert _counts() == {
+        (date(2021, 1, 26), 'created', 'normal'): 1,
+        (date(2021, 1, 26), 'sending', 'normal'): 1,
+    }
+
+
+@freeze_time('2021-01-26T15:00:00')
+def test_deleting_a_notification_removes_its_count(notify_db_session):
+    template = create_template(service=create_service())
+    notification = create_notification(template=template)
+
+    db.session.delete(notification)
+    db.session.commit()
+
+    assert _counts() == {(date(2021, 1, 26), 'created', 'normal'): 0}
+
+
+# This test assumes the local timezone is EST
+def test_counts_use_the_local_day(notify_db_session):
+    template = create_template(service=create_service())
+    create_notification(template=template, created_at=datetime(2021, 1, 26, 4, 59))
+    create_notification(template=template, created_at=datetime(2021, 1, 26, 5, 1))
+
+    assert _counts() == {
+        (date(2021, 1, 25), 'created', 'normal'): 1,
+        (date(2021, 1, 26), 'created', 'normal'): 1,
+    }
+
+
+@freeze_time('2021-01-26T15:00:00')
+def test_reconcile_notification_status_counts_recounts_the_day(notify_db_session):
+    template = create_template(service=create_service())
+    create_notification(template=template)
+    create_notification(template=template)
+    create_notification(template=template, created_at=datetime(2021, 1, 25, 15, 0))
+    # bulk updates do not go through the session and are not counted
+    Notification.query.update({'status': 'delivered'}, synchronize_session=False)
+    db.session.commit()
+
+    reconcile_notification_status_counts(date(2021, 1, 26))
+
+    assert _counts() == {
+        (date(2021, 1, 25), 'created', 'normal'): 1,
+        (date(2021, 1, 26), 'delivered', 'normal'): 2,
+    }
+
+
+def test_delete_notification_status_counts_older_than(notify_db_session):
+    template = create_template(service=create_service())
+    create_notification(template=template, created_at=datetime(2021, 1, 24, 15, 0))
+    create_notification(template=template, created_at=datetime(2021, 1, 25, 15, 0))
+
+    fold_notification_status_count_deltas()
+    create_notification(template=template, created_at=datetime(2021, 1, 24, 16, 0))
+
+    assert delete_notification_status_counts_older_than(date(2021, 1, 25)) == 2
+
+    assert _counts() == {(date(2021, 1, 25), 'created', 'normal'): 1}
+
+
+@freeze_time('2021-01-26T15:00:00')
+def test_todays_notification_status_counts(notify_db_session):
+    template = create_template(service=create_service())
+    create_notification(template=template, created_at=datetime(2021, 1, 25, 15, 0))
+    create_notification(template=template, status='delivered')
+
+    [today] = todays_notification_status_counts().all()
+
+    assert today.notification_status == 'delivered'
+    assert today.notification_count == 1
@@ -0,0 +1,187 @@
+"""
+The hottest DAO queries must be answered from an index: each test runs a DAO function against a few seeded rows,
+then EXPLAINs every statement it ran with sequential scans disabled. On tables this small the planner would scan
+them whatever indexes there are, but with enable_seqscan off it only falls back to a sequential scan when no index
+can serve the query.
+"""
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.sql import Delete, Select, Update
+
+from app import db
+from app.dao.dao_utils import Explain
+from app.dao.fact_billing_dao import fetch_billing_data_for_day, fetch_sms_free_allowance_remainder
+from app.dao.notifications_dao import (
+    dao_get_last_notification_added_for_job_id,
+    dao_get_notification_history_by_reference,
+    dao_get_notifications_by_references,
+    dao_get_notifications_by_to_field,
+    dao_timeout_notifications_in_chunks,
+    get_notifications_for_service,
+    notifications_not_yet_sent_in_pages,
+)
+from app.models import Notification
+from tests.app.db import (
+    create_annual_billing,
+    create_ft_billing,
+    create_notification,
+    create_notification_history,
+)
+
+
+@contextmanager
+def executed_statements():
+    statements = []
+
+    def before_execute(conn, clauseelement, multiparams, params):
+        if isinstance(clauseelement, (Select, Update, Delete)):
+            statements.append((clauseelement, params))
+
+    event.listen(db.engine, 'before_execute', before_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_execute', before_execute)
+
+
+def _plan_nodes(node):
+    yield node
+    for child in node.get('Plans', []):
+        yield from _plan_nodes(child)
+
+
+def sequential_scans(statements):
+    scanned = set()
+    for statement, params in statements:
+        db.session.execute('SET LOCAL enable_seqscan = off')
+        plan = db.session.execute(Explain(statement), params).scalar()
+        db.session.rollback()
+        scanned.update(
+            node['Relation Name'] for node in _plan_nodes(plan[0]['Plan']) if node['Node Type'] == 'Seq Scan'
+        )
+    return scanned
+
+
+def test_get_notifications_for_service_uses_an_index(sample_template):
+    for days_ago in range(3):
+        create_notification(template=sample_template, created_at=datetime.utcnow() - timedelta(days=days_ago))
+
+    with executed_statements() as statements:
+        get_notifications_for_service(sample_template.service_id, limit_days=7, count_pages=False)
+
+    assert statements
+    assert 'notifications' not in sequential_scans(statements)
+
+
+def test_dao_get_last_notification_added_for_job_id_uses_an_index(sample_job):
+    for job_row_number in range(3):
+        create_notification(template=sample_job.template, job=sample_job, job_row_number=job_row_number)
+
+    with executed_statements() as statements:
+        dao_get_last_notification_added_for_job_id(sample_job.id)
+
+    assert 'notifications' not in sequential_scans(statements)
+
+
+def test_dao_get_notification_history_by_reference_uses_indexes(sample_template):
+    create_notification(template=sample_template, reference='in-notifications')
+    create_notification_history(template=sample_template, reference='only-in-history')
+
+    with executed_statements() as statements:
+        dao_get_notification_history_by_reference('only-in-history')
+
+    assert len(statements) == 2
+    assert sequential_scans(statements).isdisjoint({'notifications', 'notification_history'})
+
+
+def test_dao_get_notifications_by_references_uses_an_index(sample_template):
+    create_notification(template=sample_template, reference='ref-1')
+    create_notification(template=sample_template, reference='ref-2')
+
+    with executed_statements() as statements:
+        dao_get_notifications_by_references(['ref-1', 'ref-2'])
+
+    assert 'notifications' not in sequential_scans(statements)
+
+
+@pytest.mark.parametrize('status', ['created', 'sending', 'pending'])
+def test_dao_timeout_notifications_in_chunks_uses_an_index(sample_template, status):
+    create_notification(template=sample_template, status=status, created_at=datetime.utcnow() - timedelta(days=4))
+    create_notification(template=sample_template, status='delivered', created_at=datetime.utcnow() - timedelta(days=4))
+
+    with executed_statements() as statements:
+        list(dao_timeout_notifications_in_chunks(60 * 60 * 24 * 3, chunk_size=10))
+
+    assert statements
+    assert 'notifications' not in sequential_scans(statements)
+
+
+def test_notifications_not_yet_sent_in_pages_uses_an_index(sample_template):
+    for minutes_ago in range(10, 13):
+        create_notification(template=sample_template, created_at=datetime.utcnow() - timedelta(minutes=minutes_ago))
+    create_notification(template=sample_template, status='delivered')
+
+    with executed_statements() as statements:
+        # two pages, the second one starts after the last notification of the first
+        assert len(list(notifications_not_yet_sent_in_pages(60, 'sms', page_size=2))) == 2
+
+    assert len(statements) == 2
+    assert 'notifications' not in sequential_scans(statements)
+
+
+@pytest.mark.parametrize('search_term', [
+    # a full phone number, matched exactly
+    '+16502532222',
+    # part of a phone number, matched with the trigram index
+    '502532',
+])
+def test_dao_get_notifications_by_to_field_uses_indexes(sample_template, search_term):
+    for minutes_ago in range(3):
+        create_notification(
+            template=sample_template,
+            to_field='+16502532222',
+            normalised_to='+16502532222',
+            created_at=datetime.utcnow() - timedelta(minutes=minutes_ago)
+        )
+
+    with executed_statements() as statements:
+        [first] = dao_get_notifications_by_to_field(sample_template.service_id, search_term, page_size=1)
+        assert dao_get_notifications_by_to_field(
+            sample_template.service_id, search_term, page_size=1, older_than=first.id
+        )
+
+    assert 'notifications' not in sequential_scans(statements)
+
+
+def test_fetch_billing_data_for_day_uses_indexes(sample_template):
+    # not in notifications, so it is looked up in notification_history as well
+    create_notification_history(template=sample_template, status='delivered', created_at=datetime(2021, 1, 26, 15))
+
+    with executed_statements() as statements:
+        fetch_billing_data_for_day(date(2021, 1, 26), service_id=sample_template.service_id)
+
+    assert sequential_scans(statements).isdisjoint({'notifications', 'notification_history'})
+
+
+def test_fetch_sms_free_allowance_remainder_uses_an_index(sample_template):
+    create_annual_billing(service_id=sample_template.service_id, free_sms_fragment_limit=10, financial_year_start=2020)
+    create_ft_billing(utc_date=date(2020, 5, 1), notification_type='sms', template=sample_template,
+                      service=sample_template.service)
+
+    with executed_statements() as statements:
+        fetch_sms_free_allowance_remainder(date(2020, 6, 1)).all()
+
+    assert 'ft_billing_sms_cumulative' not in sequential_scans(statements)
+
+
+def test_sequential_scans_are_reported(sample_template):
+    create_notification(template=sample_template, to_field='+16502532222')
+
+    with executed_statements() as statements:
+        # nothing indexes the recipient
+        Notification.query.filter(Notification.to == '+16502532222').all()
+
+    assert 'notifications' in sequential_scans(statements)
@@ -840,14 +840,15 @@ def test_fetch_stats_counts_should_ignore_team_key(notify_db_session):
     assert stats[0].count == 3
 
 
+# This test assumes the local timezone is EST
 def test_fetch_stats_for_today_only_includes_today(notify_db_session):
     template = create_template(service=create_service())
     # two created email, one failed email, and one created sms
-    with freeze_time('2001-01-01T23:59:00'):
+    with freeze_time('2001-01-02T04:59:00'):
         # just_before_midnight_yesterday
         create_notification(template=template, to_field='1', status='delivered')
 
-    with freeze_time('2001-01-02T00:01:00'):
+    with freeze_time('2001-01-02T05:01:00'):
         # just_after_midnight_today
         create_notification(template=template, to_field='2', status='failed')
 
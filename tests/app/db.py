@@ -5,6 +5,8 @@ from datetime import datetime, date, timedelta
 
 from app import db
 from app.dao.email_branding_dao import dao_create_email_branding
+from app.dao.fact_billing_dao import update_fact_billing_sms_cumulative_for_year
+from app.dao.fact_notification_status_dao import update_fact_notification_status_for_month
 from app.dao.inbound_sms_dao import dao_create_inbound_sms
 from app.dao.inbound_sms_keyword_dao import dao_create_inbound_sms_keyword
 from app.dao.invited_org_user_dao import save_invited_org_user
@@ -753,6 +755,7 @@ def create_ft_billing(utc_date,
                        postage=postage)
     db.session.add(data)
     db.session.commit()
+    update_fact_billing_sms_cumulative_for_year(utc_date)
     return data
 
 
@@ -788,6 +791,8 @@ def create_ft_notification_status(
     )
     db.session.add(data)
     db.session.commit()
+    # as the nightly task does once it has written the facts for a day
+    update_fact_notification_status_for_month(utc_date)
     return data
 
 
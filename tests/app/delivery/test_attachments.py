@@ -0,0 +1,99 @@
+import os
+import stat
+from time import time
+
+import pytest
+
+from app.delivery.attachments import (
+    AttachmentCache,
+    AttachmentDownloadError,
+    download_pdf,
+    get_pdf_attachment,
+)
+
+from tests.conftest import set_config_values
+
+PDF = b'%PDF-1.4\n' + b'0' * 4096
+
+
+@pytest.fixture
+def attachment_config(notify_api, tmp_path):
+    with set_config_values(notify_api, {
+        'ATTACHMENT_CACHE_DIR': str(tmp_path),
+        'ATTACHMENT_CACHE_MAX_SIZE': 10 * 1024,
+        'ATTACHMENT_DOWNLOAD_TIMEOUT': 30,
+        'ATTACHMENT_MAX_SIZE': 8 * 1024,
+    }):
+        yield tmp_path
+
+
+def test_get_pdf_attachment_downloads_once_and_then_reads_from_cache(attachment_config, rmock):
+    rmock.get('http://foo.bar/document', content=PDF)
+
+    assert get_pdf_attachment('http://foo.bar/document') == PDF
+    assert get_pdf_attachment('http://foo.bar/document') == PDF
+
+    assert rmock.call_count == 1
+    assert len(os.listdir(attachment_config)) == 1
+
+
+def test_get_pdf_attachment_returns_none_and_does_not_cache_other_documents(attachment_config, rmock):
+    rmock.get('http://foo.bar/document', content=b'just some text\n' * 500)
+
+    assert get_pdf_attachment('http://foo.bar/document') is None
+    assert os.listdir(attachment_config) == []
+
+
+def test_download_pdf_raises_if_document_is_too_large(attachment_config, rmock):
+    rmock.get('http://foo.bar/document', content=b'%PDF-1.4\n' + b'0' * 16 * 1024)
+
+    with pytest.raises(AttachmentDownloadError):
+        download_pdf('http://foo.bar/document')
+
+
+def test_attachment_cache_evicts_least_recently_used(tmp_path):
+    cache = AttachmentCache(str(tmp_path), max_size=10, ttl=60)
+    cache.set('http://first', b'12345')
+    cache.set('http://second', b'12345')
+    now = time()
+    os.utime(cache.path('http://first'), (now - 20, now))
+    os.utime(cache.path('http://second'), (now - 10, now))
+
+    assert cache.get('http://first') == b'12345'
+    cache.set('http://third', b'12345')
+
+    assert cache.get('http://first') == b'12345'
+    assert cache.get('http://second') is None
+    assert cache.get('http://third') == b'12345'
+
+
+def test_attachment_cache_does_not_store_files_larger_than_the_cache(tmp_path):
+    cache = AttachmentCache(str(tmp_path), max_size=4, ttl=60)
+    cache.set('http://first', b'12345')
+
+    assert cache.get('http://first') is None
+
+
+def test_attachment_cache_drops_documents_older_than_the_ttl(tmp_path):
+    cache = AttachmentCache(str(tmp_path), max_size=100, ttl=60)
+    cache.set('http://first', b'12345')
+    cache.set('http://second', b'12345')
+    now = time()
+    os.utime(cache.path('http://first'), (now, now - 61))
+    os.utime(cache.path('http://second'), (now, now - 61))
+
+    assert cache.get('http://first') is None
+    assert not os.path.exists(cache.path('http://first'))
+
+    cache.set('http://third', b'12345')
+
+    assert sorted(os.listdir(tmp_path)) == [os.path.basename(cache.path('http://third'))]
+
+
+def test_attachment_cache_is_only_readable_by_its_owner(tmp_path):
+    directory = tmp_path / 'attachments'
+    cache = AttachmentCache(str(directory), max_size=100, ttl=60)
+    cache.set('http://first', b'12345')
+
+    assert stat.S_IMODE(os.stat(directory).st_mode) == 0o700
+    assert stat.S_IMODE(os.stat(cache.path('http://first')).st_mode) == 0o600
@@ -0,0 +1,57 @@
+import pytest
+
+from app.delivery.pii import (
+    PII_DETECTORS,
+    PiiDetector,
+    luhn,
+    register_pii_detector,
+    scan_for_pii,
+)
+
+ALL_DETECTORS = ['sin', 'credit_card', 'health_card']
+
+
+@pytest.mark.parametrize('number, expected', [
+    ('046454286', True),
+    ('123456789', False),
+    ('4111111111111111', True),
+    ('4111111111111112', False),
+    ('378282246310005', True),
+])
+def test_luhn(number, expected):
+    assert luhn(number) is expected
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('Your number is 046-454-286 thanks', 'Social Insurance Number'),
+    ('Numbers 123-456-789 046-454-286 on file', 'Social Insurance Number'),
+    ('Your number is 123-456-789 thanks', None),
+    ('Call us at 123-456-7890', None),
+    ('Card 4111 1111 1111 1111 was charged', 'Credit Card Number'),
+    ('Card 4111-1111-1111-1111 was charged', 'Credit Card Number'),
+    ('Card 4111111111111112 was charged', None),
+    # passes luhn but is not a card number we know of
+    ('Order 0000000000000000 shipped', None),
+    ('RAMQ ABCD 8562 3112', 'Health Card Number'),
+    ('RAMQ ABCD85123112', 'Health Card Number'),
+    ('Reference ABCD 8513 3112', None),
+    ('Sent on 2020-01-01 12:00:00', None),
+])
+def test_scan_for_pii(text, expected):
+    assert scan_for_pii(text, ALL_DETECTORS) == expected
+
+
+def test_scan_for_pii_only_uses_enabled_detectors():
+    text = 'Card 4111 1111 1111 1111 was charged'
+
+    assert scan_for_pii(text, ['sin']) is None
+    assert scan_for_pii(text, ['sin', 'credit_card']) == 'Credit Card Number'
+    assert scan_for_pii(text, []) is None
+
+
+def test_register_pii_detector():
+    register_pii_detector(PiiDetector('passport', 'Passport Number', r'\b[A-Z]{2}\d{6}\b', lambda candidate: True))
+    try:
+        assert scan_for_pii('Passport AB123456', ['sin', 'passport']) == 'Passport Number'
+    finally:
+        del PII_DETECTORS['passport']
@@ -627,6 +627,64 @@ def test_should_set_notification_billable_units_if_sending_to_provider_fails(
     assert mock_toggle_provider.called
 
 
+def test_should_not_toggle_provider_if_sending_fails_and_sms_is_load_balanced(
+    notify_api,
+    sample_notification,
+    mocker,
+):
+    mocker.patch('app.sinch_sms_client.send_sms', side_effect=Exception())
+    mocker.patch('app.delivery.send_to_providers.provider_to_use', return_value=sinch_sms_client)
+    mock_toggle_provider = mocker.patch('app.delivery.send_to_providers.dao_toggle_sms_provider')
+    mock_record = mocker.patch('app.delivery.send_to_providers.record_sms_provider_response')
+
+    with set_config_values(notify_api, {'SMS_PROVIDER_WEIGHTS': {'sinch': 1}}):
+        with pytest.raises(Exception):
+            send_to_providers.send_sms_to_provider(sample_notification)
+
+    assert not mock_toggle_provider.called
+    mock_record.assert_called_once_with('sinch', ANY, success=False)
+
+
+def test_provider_to_use_splits_sms_by_weight_when_load_balanced(notify_api, restore_provider_details, mocker):
+    mock_choices = mocker.patch('app.provider_details.load_balancing.random.choices', return_value=['sns'])
+
+    with set_config_values(notify_api, {'SMS_PROVIDER_WEIGHTS': {'sns': 70, 'sinch': 30}}):
+        provider = send_to_providers.provider_to_use('sms', '1234')
+
+    assert provider.name == 'sns'
+    identifiers, = mock_choices.call_args[0]
+    assert sorted(zip(identifiers, mock_choices.call_args[1]['weights'])) == [('sinch', 30), ('sns', 70)]
+
+
+def test_provider_to_use_honours_sender_providers_when_load_balanced(notify_api, restore_provider_details, mocker):
+    mock_choices = mocker.patch('app.provider_details.load_balancing.random.choices', return_value=['sinch'])
+
+    with set_config_values(notify_api, {
+        'SMS_PROVIDER_WEIGHTS': {'sns': 70, 'sinch': 30},
+        'SMS_SENDER_PROVIDERS': {'+15146000000': ['sinch']},
+    }):
+        provider = send_to_providers.provider_to_use('sms', '1234', sender='+15146000000')
+
+    assert provider.name == 'sinch'
+    mock_choices.assert_called_once_with(['sinch'], weights=[30])
+
+
+def test_provider_to_use_raises_if_none_of_the_sender_providers_are_active(
+    notify_api, restore_provider_details, mocker
+):
+    mock_choices = mocker.patch('app.provider_details.load_balancing.random.choices')
+
+    with set_config_values(notify_api, {
+        'SMS_PROVIDER_WEIGHTS': {'sns': 70, 'sinch': 30},
+        'SMS_SENDER_PROVIDERS': {'+15146000000': ['pinpoint']},
+    }):
+        with pytest.raises(Exception) as e:
+            send_to_providers.provider_to_use('sms', '1234', sender='+15146000000')
+
+    assert str(e.value) == 'No active sms providers for sender +15146000000'
+    assert not mock_choices.called
+
+
 @pytest.mark.skip(reason="Currently not supporting international providers")
 def test_should_send_sms_to_international_providers(
     restore_provider_details,
@@ -819,6 +877,20 @@ def test_notification_can_have_document_attachment_without_mlwr_sid(sample_email
     mlwr_mock.assert_not_called()
 
 
+def test_notification_document_is_attached_if_it_is_a_pdf(sample_email_template, mocker):
+    send_mock = mocker.patch('app.aws_ses_client.send_email', return_value='reference')
+    get_attachment_mock = mocker.patch('app.delivery.send_to_providers.get_pdf_attachment', return_value=b'%PDF-1.4')
+    personalisation = {
+        "file": {"document": {"id": "foo", "direct_file_url": "http://foo.bar/direct", "url": "http://foo.bar"}}}
+
+    db_notification = create_notification(template=sample_email_template, personalisation=personalisation)
+
+    send_to_providers.send_email_to_provider(db_notification)
+
+    get_attachment_mock.assert_called_once_with('http://foo.bar/direct')
+    assert send_mock.call_args[1]['attachments'] == [{"name": "file.pdf", "data": b'%PDF-1.4'}]
+
+
 def test_notification_can_have_document_attachment_if_mlwr_sid_is_false(sample_email_template, mocker):
     send_mock = mocker.patch('app.aws_ses_client.send_email', return_value='reference')
     mlwr_mock = mocker.patch('app.delivery.send_to_providers.check_mlwr')
@@ -867,6 +939,21 @@ def test_notification_raises_a_retry_exception_if_mlwr_state_is_not_complete(sam
         )
 
 
+def test_notification_waits_for_mlwr_scan_if_mlwr_state_is_not_complete(sample_email_template, mocker):
+    mocker.patch('app.aws_ses_client.send_email', return_value='reference')
+    mocker.patch('app.delivery.send_to_providers.check_mlwr', return_value={"state": "foo"})
+    mock_wait = mocker.patch('app.delivery.send_to_providers.wait_for_mlwr_scan')
+    personalisation = {
+        "file": {"document": {"mlwr_sid": "foo", "direct_file_url": "http://foo.bar", "url": "http://foo.bar"}}}
+
+    db_notification = create_notification(template=sample_email_template, personalisation=personalisation)
+
+    with pytest.raises(MalwarePendingException):
+        send_to_providers.send_email_to_provider(db_notification)
+
+    mock_wait.assert_called_once_with("foo", db_notification.id)
+
+
 def test_notification_raises_sets_notification_to_virus_found_if_mlwr_score_is_500(sample_email_template, mocker):
     send_mock = mocker.patch("app.aws_ses_client.send_email", return_value='reference')
     mocker.patch(
@@ -927,6 +1014,30 @@ def test_notification_raises_error_if_message_contains_sin_pii_that_passes_luhn(
     assert Notification.query.get(db_notification.id).status == 'pii-check-failed'
 
 
+def test_notification_raises_error_if_message_contains_enabled_credit_card_pii(
+        sample_email_template_with_html,
+        mocker,
+        notify_api):
+    send_mock = mocker.patch("app.aws_ses_client.send_email", return_value='reference')
+
+    db_notification = create_notification(
+        template=sample_email_template_with_html,
+        to_field="jo.smith@example.com",
+        personalisation={'name': '4111 1111 1111 1111'}
+    )
+
+    with set_config_values(notify_api, {
+        'SCAN_FOR_PII': "True",
+        'PII_DETECTORS': ['sin', 'credit_card'],
+    }):
+        with pytest.raises(NotificationTechnicalFailureException) as e:
+            send_to_providers.send_email_to_provider(db_notification)
+    assert 'Credit Card Number' in str(e.value)
+
+    send_mock.assert_not_called()
+    assert Notification.query.get(db_notification.id).status == 'pii-check-failed'
+
+
 def test_notification_passes_if_message_contains_sin_pii_that_fails_luhn(
         sample_email_template_with_html,
         mocker,
@@ -960,3 +1071,71 @@ def test_notification_passes_if_message_contains_phone_number(sample_email_templ
     send_mock.assert_called()
 
     assert Notification.query.get(db_notification.id).status == 'sending'
+
+
+def test_send_emails_to_provider_sends_emails_of_the_same_template_in_bulk(
+    sample_email_template_with_placeholders, mocker
+):
+    create_template_mock = mocker.patch('app.aws_ses_client.create_template')
+    record_use_mock = mocker.patch('app.delivery.send_to_providers.record_ses_template_use')
+    send_mock = mocker.patch('app.aws_ses_client.send_bulk_templated_email', return_value=['ref-1', 'ref-2'])
+    notifications = [
+        create_notification(
+            template=sample_email_template_with_placeholders,
+            to_field=to_field,
+            personalisation={'name': name}
+        ) for to_field, name in [('jo@example.com', 'Jo'), ('sam@example.com', 'Sam & Alex')]
+    ]
+
+    singles = send_to_providers.send_emails_to_provider(notifications)
+
+    assert singles == []
+    template = create_template_mock.call_args[0][0]
+    assert template['SubjectPart'] == '{{{t0}}}'
+    record_use_mock.assert_called_once_with(template['TemplateName'])
+    send_mock.assert_called_once_with(
+        '"Sample service" <sample.service@{}>'.format(current_app.config['NOTIFY_EMAIL_DOMAIN']),
+        current_app.config['NOTIFY_EMAIL_DOMAIN'],
+        template['TemplateName'],
+        [
+            ('jo@example.com', {'t0': 'Jo', 'h0': 'Jo'}),
+            ('sam@example.com', {'t0': 'Sam & Alex', 'h0': 'Sam &amp; Alex'}),
+        ],
+        reply_to_address=None
+    )
+    for notification, reference in zip(notifications, ['ref-1', 'ref-2']):
+        persisted_notification = Notification.query.get(notification.id)
+        assert persisted_notification.status == 'sending'
+        assert persisted_notification.reference == reference
+        assert persisted_notification.sent_by == 'ses'
+
+
+def test_send_emails_to_provider_returns_emails_that_cannot_be_sent_in_bulk(sample_email_template, mocker):
+    mocker.patch('app.aws_ses_client.create_template')
+    send_mock = mocker.patch('app.aws_ses_client.send_bulk_templated_email', return_value=['ref-1', None])
+    bulk, rejected = [create_notification(template=sample_email_template) for _ in range(2)]
+    with_document = create_notification(
+        template=sample_email_template, personalisation={'file': {'document': {'url': 'https://example.com'}}}
+    )
+    with_parameters = create_notification(template=sample_email_template)
+    with_parameters.additional_email_parameters = {'importance': 'high'}
+    research_mode = create_notification(template=sample_email_template, key_type=KEY_TYPE_TEST)
+
+    singles = send_to_providers.send_emails_to_provider(
+        [bulk, rejected, with_document, with_parameters, research_mode]
+    )
+
+    assert singles == [with_document, with_parameters, research_mode, rejected]
+    assert len(send_mock.call_args[0][3]) == 2
+    assert Notification.query.get(bulk.id).reference == 'ref-1'
+    assert Notification.query.get(rejected.id).status == 'created'
+
+
+def test_send_emails_to_provider_returns_the_batch_if_bulk_sending_fails(sample_email_template, mocker):
+    mocker.patch('app.aws_ses_client.create_template', side_effect=Exception('SES is down'))
+    send_mock = mocker.patch('app.aws_ses_client.send_bulk_templated_email')
+    notifications = [create_notification(template=sample_email_template) for _ in range(2)]
+
+    assert send_to_providers.send_emails_to_provider(notifications) == notifications
+    send_mock.assert_not_called()
+    assert all(notification.status == 'created' for notification in notifications)
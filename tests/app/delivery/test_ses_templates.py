@@ -0,0 +1,91 @@
+from datetime import datetime, timezone
+from html import escape
+
+from freezegun import freeze_time
+
+from app.delivery.ses_templates import compile_ses_template, delete_unused_ses_templates
+from tests.conftest import set_config_values
+
+PLACEHOLDERS = ['name', 'reference']
+
+
+def render(values):
+    return (
+        'Demande {}'.format(values['reference']),
+        '<p>Bonjour {}, votre demande {} est reçue.</p>'.format(escape(values['name'], quote=False),
+                                                                values['reference']),
+        'Bonjour {}, votre demande {} est reçue.'.format(values['name'], values['reference']),
+    )
+
+
+def test_compile_ses_template_replaces_placeholders_with_tags():
+    compiled = compile_ses_template(PLACEHOLDERS, render)
+
+    template = compiled.ses_template()
+    assert template['TemplateName'] == compiled.name
+    assert len(compiled.name) <= 64
+    assert template['SubjectPart'] == 'Demande {{{t1}}}'
+    assert template['HtmlPart'] == '<p>Bonjour {{{h0}}}, votre demande {{{h1}}} est reçue.</p>'
+    assert template['TextPart'] == 'Bonjour {{{t0}}}, votre demande {{{t1}}} est reçue.'
+
+
+def test_compiled_template_names_depend_on_content():
+    assert compile_ses_template(PLACEHOLDERS, render).name == compile_ses_template(PLACEHOLDERS, render).name
+    assert compile_ses_template(PLACEHOLDERS, render).name != compile_ses_template(
+        PLACEHOLDERS, lambda values: [part + '!' for part in render(values)]
+    ).name
+
+
+def test_replacement_data_escapes_html_values():
+    compiled = compile_ses_template(PLACEHOLDERS, render)
+
+    data = compiled.replacement_data({'Name': 'Jean & Marie', 'reference': 123})
+
+    assert data == {'t0': 'Jean & Marie', 'h0': 'Jean &amp; Marie', 't1': '123', 'h1': '123'}
+    assert compiled.matches(data, *render({'name': 'Jean & Marie', 'reference': '123'}))
+
+
+def test_matches_is_false_when_a_value_changes_the_rest_of_the_email():
+    def render_with_condition(values):
+        subject, html_body, body = render(values)
+        return subject, html_body, body + (' Merci.' if values['name'] else '')
+
+    compiled = compile_ses_template(PLACEHOLDERS, render_with_condition)
+    values = {'name': '', 'reference': '123'}
+
+    assert not compiled.matches(compiled.replacement_data(values), *render_with_condition(values))
+
+
+def test_compile_ses_template_refuses_handlebars_in_content():
+    assert compile_ses_template(PLACEHOLDERS, lambda values: [part + ' {{x}}' for part in render(values)]) is None
+    assert compile_ses_template(PLACEHOLDERS, lambda values: ('{' + values['name'], 'Html', 'Text')) is None
+
+
+@freeze_time('2021-02-01T12:00:00')
+def test_delete_unused_ses_templates(notify_api, mocker):
+    mocker.patch('app.delivery.ses_templates.redis_store.active', True)
+    mock_redis = mocker.patch('app.delivery.ses_templates.redis_store.redis_store')
+    now = datetime(2021, 2, 1, 12, tzinfo=timezone.utc).timestamp()
+    mock_redis.zrange.return_value = [
+        (b'notify-used-yesterday', now - 25 * 60 * 60),
+        (b'notify-used-recently', now - 60),
+        (b'notify-used-before', now - 120),
+        (b'notify-used-earlier', now - 180),
+    ]
+    ses_client = mocker.Mock()
+    ses_client.list_templates.return_value = [
+        ('notify-used-yesterday', datetime(2021, 1, 1, tzinfo=timezone.utc)),
+        ('notify-used-recently', datetime(2021, 1, 1, tzinfo=timezone.utc)),
+        ('notify-used-before', datetime(2021, 1, 1, tzinfo=timezone.utc)),
+        ('notify-used-earlier', datetime(2021, 1, 1, tzinfo=timezone.utc)),
+        ('notify-never-recorded', datetime(2021, 1, 1, tzinfo=timezone.utc)),
+        ('notify-just-created', datetime(2021, 2, 1, 11, 59, 30, tzinfo=timezone.utc)),
+        ('not-ours', datetime(2021, 1, 1, tzinfo=timezone.utc)),
+    ]
+
+    with set_config_values(notify_api, {'SES_TEMPLATE_TTL': 24 * 60 * 60, 'SES_TEMPLATES_MAX': 3}):
+        deleted = delete_unused_ses_templates(ses_client)
+
+    assert sorted(deleted) == ['notify-never-recorded', 'notify-used-earlier', 'notify-used-yesterday']
+    assert sorted(call[0][0] for call in ses_client.delete_template.call_args_list) == sorted(deleted)
+    mock_redis.zrem.assert_called_once_with('ses-templates-last-used', *deleted)
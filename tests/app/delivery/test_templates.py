@@ -0,0 +1,48 @@
+from app.dao.templates_dao import dao_update_template
+from app.delivery import templates
+from app.delivery.templates import TemplateVersionCache, get_template_version
+
+
+def test_get_template_version_loads_a_version_once(sample_email_template, mocker):
+    load = mocker.spy(templates, 'dao_get_template_by_id')
+
+    first = get_template_version(sample_email_template.id, sample_email_template.version)
+    second = get_template_version(str(sample_email_template.id), sample_email_template.version)
+
+    load.assert_called_once_with(sample_email_template.id, sample_email_template.version)
+    assert first == second
+    assert first['content'] == sample_email_template.content
+    assert first['subject'] == sample_email_template.subject
+    assert first['template_type'] == 'email'
+    assert '_sa_instance_state' not in first
+
+
+def test_get_template_version_returns_the_requested_version(sample_template):
+    version = sample_template.version
+    content = sample_template.content
+    get_template_version(sample_template.id, version)
+
+    sample_template.content = 'New content'
+    dao_update_template(sample_template)
+
+    assert get_template_version(sample_template.id, version)['content'] == content
+    assert get_template_version(sample_template.id, version + 1)['content'] == 'New content'
+
+
+def test_get_template_version_returns_a_copy(sample_template):
+    get_template_version(sample_template.id, sample_template.version)['content'] = 'Changed'
+
+    assert get_template_version(sample_template.id, sample_template.version)['content'] == sample_template.content
+
+
+def test_template_version_cache_evicts_least_recently_used(mocker):
+    mocker.patch.object(templates, 'dao_get_template_by_id')
+    mocker.patch.object(templates, 'inspect')
+    cache = TemplateVersionCache(max_size=2)
+
+    cache.get('a', 1)
+    cache.get('b', 1)
+    cache.get('a', 1)
+    cache.get('c', 1)
+
+    assert list(cache.templates) == [('a', 1), ('c', 1)]
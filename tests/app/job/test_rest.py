@@ -7,6 +7,8 @@ import pytest
 import pytz
 
 import app.celery.tasks
+from app.dao.fact_notification_status_dao import fetch_notification_statuses_for_jobs
+from app.dao.jobs_dao import dao_get_notification_outcomes_for_jobs
 from app.dao.templates_dao import dao_update_template
 from app.models import JOB_STATUS_TYPES, JOB_STATUS_PENDING
 
@@ -645,6 +647,35 @@ def test_get_jobs_should_return_statistics(admin_request, sample_template):
     assert {'status': 'created', 'count': 3} in resp_json['data'][1]['statistics']
 
 
+def test_get_jobs_should_fetch_statistics_for_all_jobs_on_the_page_at_once(admin_request, sample_template, mocker):
+    now = datetime.utcnow()
+    job_1 = create_job(sample_template, processing_started=now - timedelta(days=5))
+    job_2 = create_job(sample_template, processing_started=now - timedelta(days=4))
+    job_3 = create_job(sample_template, processing_started=now)
+    job_4 = create_job(sample_template, processing_started=now - timedelta(hours=1))
+    create_ft_notification_status(now.date() - timedelta(days=5), job=job_1, notification_status='delivered')
+    create_ft_notification_status(now.date() - timedelta(days=4), job=job_2, notification_status='delivered')
+    create_notification(job=job_3, status='sending')
+    create_notification(job=job_4, status='created')
+    fetch_old = mocker.patch(
+        'app.job.rest.fetch_notification_statuses_for_jobs', wraps=fetch_notification_statuses_for_jobs
+    )
+    fetch_recent = mocker.patch(
+        'app.job.rest.dao_get_notification_outcomes_for_jobs', wraps=dao_get_notification_outcomes_for_jobs
+    )
+
+    resp_json = admin_request.get('job.get_jobs_by_service', service_id=sample_template.service_id)
+
+    assert [job['statistics'] for job in resp_json['data']] == [
+        [{'status': 'sending', 'count': 1}],
+        [{'status': 'created', 'count': 1}],
+        [{'status': 'delivered', 'count': 1}],
+        [{'status': 'delivered', 'count': 1}],
+    ]
+    fetch_old.assert_called_once_with([job_2.id, job_1.id])
+    fetch_recent.assert_called_once_with(sample_template.service_id, [job_3.id, job_4.id])
+
+
 def test_get_jobs_should_return_no_stats_if_no_rows_in_notifications(admin_request, sample_template):
     now = datetime.utcnow()
     earlier = datetime.utcnow() - timedelta(days=1)
@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta
+from time import monotonic
+
+import pytest
+from flask import g
+from freezegun import freeze_time
+
+from app.models import PRIORITY
+from app.notifications.latency import (
+    record_accept_stage,
+    record_dequeue,
+    record_receipt,
+    record_stage,
+    timed_stage,
+)
+from app.notifications.process_notifications import send_notification_to_queue
+from tests.app.db import create_notification, create_template
+
+
+def test_record_stage_sends_a_timer_with_the_notification_type_provider_and_priority(mocker):
+    timing = mocker.patch('app.notifications.latency.statsd_client.timing')
+
+    record_stage('provider', 'email', 0.25, provider='ses', priority=PRIORITY)
+
+    timing.assert_called_once_with('latency.provider.email.ses.priority', 250)
+
+
+def test_record_stage_defaults_to_no_provider_and_normal_priority(mocker):
+    timing = mocker.patch('app.notifications.latency.statsd_client.timing')
+
+    record_stage('accept', 'sms', 1)
+
+    timing.assert_called_once_with('latency.accept.sms.none.normal', 1000)
+
+
+def test_timed_stage_does_not_record_failures(mocker):
+    timing = mocker.patch('app.notifications.latency.statsd_client.timing')
+
+    with pytest.raises(ValueError):
+        with timed_stage('provider', 'sms', 'sns'):
+            raise ValueError()
+
+    timing.assert_not_called()
+
+
+def test_record_accept_stage_times_the_api_request(notify_api, mocker):
+    timing = mocker.patch('app.notifications.latency.statsd_client.timing')
+
+    with notify_api.test_request_context():
+        g.start = monotonic() - 2
+        record_accept_stage('sms')
+
+    stat, elapsed_milliseconds = timing.call_args[0]
+    assert stat == 'latency.accept.sms.none.normal'
+    assert 2000 <= elapsed_milliseconds < 3000
+
+
+def test_record_accept_stage_does_nothing_outside_of_a_request(notify_api, mocker):
+    timing = mocker.patch('app.notifications.latency.statsd_client.timing')
+
+    record_accept_stage('sms')
+
+    timing.assert_not_called()
+
+
+@freeze_time('2020-03-01 12:00:10')
+def test_record_dequeue_times_the_notification_since_it_was_created(sample_service, mocker):
+    timing = mocker.patch('app.notifications.latency.statsd_client.timing')
+    template = create_template(sample_service, process_type=PRIORITY)
+    notification = create_notification(template, created_at=datetime(2020, 3, 1, 12))
+
+    record_dequeue(notification)
+
+    timing.assert_called_once_with('latency.dequeue.sms.none.priority', 10000)
+
+
+@freeze_time('2020-03-01 12:01:00')
+def test_record_receipt_times_the_notification_since_it_was_sent(sample_email_template, mocker):
+    timing = mocker.patch('app.notifications.latency.statsd_client.timing')
+    notification = create_notification(
+        sample_email_template, status='sending', sent_at=datetime(2020, 3, 1, 12), sent_by='ses'
+    )
+
+    record_receipt(notification)
+
+    timing.assert_called_once_with('latency.receipt.email.ses.normal', 60000)
+
+
+def test_record_receipt_does_nothing_for_notifications_not_sent(sample_template, mocker):
+    timing = mocker.patch('app.notifications.latency.statsd_client.timing')
+
+    record_receipt(create_notification(sample_template))
+
+    timing.assert_not_called()
+
+
+def test_send_notification_to_queue_records_the_accept_and_enqueue_stages(notify_api, sample_template, mocker):
+    mocker.patch('app.celery.provider_tasks.deliver_sms.apply_async')
+    timing = mocker.patch('app.notifications.latency.statsd_client.timing')
+    notification = create_notification(sample_template, created_at=datetime.utcnow() - timedelta(seconds=1))
+
+    with notify_api.test_request_context():
+        g.start = monotonic()
+        send_notification_to_queue(notification, research_mode=False, queue='priority-tasks')
+
+    assert [call[0][0] for call in timing.call_args_list] == [
+        'latency.accept.sms.none.priority',
+        'latency.enqueue.sms.none.priority',
+    ]
@@ -6,7 +6,9 @@ from boto3.exceptions import Boto3Error
 from sqlalchemy.exc import SQLAlchemyError
 from freezegun import freeze_time
 from collections import namedtuple
+from unittest.mock import call
 
+from app.celery.provider_tasks import deliver_email, deliver_sms
 from app.models import (
     Notification,
     NotificationHistory,
@@ -19,6 +21,7 @@ from app.notifications.process_notifications import (
     persist_notification,
     persist_scheduled_notification,
     send_notification_to_queue,
+    send_notifications_to_queue_in_bulk,
     simulated_recipient
 )
 from notifications_utils.recipients import validate_and_format_phone_number, validate_and_format_email_address
@@ -293,6 +296,39 @@ def test_send_notification_to_queue_throws_exception_deletes_notification(sample
     assert NotificationHistory.query.count() == 0
 
 
+def test_send_notifications_to_queue_in_bulk_publishes_one_batch_per_queue(notify_api, mocker):
+    mock_apply_async_many = mocker.patch('app.notifications.process_notifications.notify_celery.apply_async_many')
+    Notification = namedtuple('Notification', ['id', 'key_type', 'notification_type', 'research_mode'])
+    sms_1, sms_2, email, test_key_sms = notifications = [
+        Notification(id=uuid.uuid4(), key_type='normal', notification_type='sms', research_mode=False),
+        Notification(id=uuid.uuid4(), key_type='normal', notification_type='sms', research_mode=False),
+        Notification(id=uuid.uuid4(), key_type='normal', notification_type='email', research_mode=False),
+        Notification(id=uuid.uuid4(), key_type='test', notification_type='sms', research_mode=False),
+    ]
+
+    send_notifications_to_queue_in_bulk(notifications)
+
+    assert sorted(mock_apply_async_many.call_args_list, key=lambda c: c[1]['queue']) == [
+        call(deliver_sms, [[str(test_key_sms.id)]], queue='research-mode-tasks'),
+        call(deliver_email, [[str(email.id)]], queue='send-email-tasks'),
+        call(deliver_sms, [[str(sms_1.id)], [str(sms_2.id)]], queue='send-sms-tasks'),
+    ]
+
+
+def test_send_notifications_to_queue_in_bulk_does_not_delete_notifications_if_publishing_fails(
+    sample_notification, mocker
+):
+    mocker.patch(
+        'app.notifications.process_notifications.notify_celery.apply_async_many', side_effect=Boto3Error("EXPECTED")
+    )
+    Row = namedtuple('Row', ['id', 'key_type', 'notification_type', 'research_mode'])
+
+    with pytest.raises(Boto3Error):
+        send_notifications_to_queue_in_bulk([Row(sample_notification.id, 'normal', 'sms', False)])
+
+    assert Notification.query.count() == 1
+
+
 @pytest.mark.parametrize("to_address, notification_type, expected", [
     ("+16132532222", "sms", True),
     ("+16132532223", "sms", True),
@@ -154,3 +154,13 @@ def test_get_usage_for_all_services(notify_db_session, admin_request):
     assert response[3]["sms_fragments"] == 0
     assert response[3]["letter_cost"] == 8.25
     assert response[3]["letter_breakdown"] == "15 second class letters at 55p\n"
+
+
+def test_get_platform_stats_returns_cached_report(admin_request, mocker):
+    mocker.patch('app.reporting_cache.redis_store.get', return_value=b'{"email": {}}')
+    dao_mock = mocker.patch('app.platform_stats.rest.fetch_notification_status_totals_for_all_services')
+
+    response = admin_request.get('platform_stats.get_platform_stats')
+
+    assert response == {'email': {}}
+    dao_mock.assert_not_called()
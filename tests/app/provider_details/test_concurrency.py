@@ -0,0 +1,47 @@
+import threading
+import time
+
+from app.provider_details.concurrency import get_provider_semaphore, provider_request_slot
+
+from tests.conftest import set_config
+
+
+def test_provider_request_slot_limits_requests_in_flight(notify_api):
+    in_flight = []
+    most_in_flight = []
+    lock = threading.Lock()
+
+    def request():
+        with notify_api.app_context(), provider_request_slot('ses'):
+            with lock:
+                in_flight.append(1)
+                most_in_flight.append(len(in_flight))
+            time.sleep(0.01)
+            with lock:
+                in_flight.pop()
+
+    with set_config(notify_api, 'PROVIDER_CONCURRENCY_LIMITS', {'ses': 2}):
+        threads = [threading.Thread(target=request) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert len(most_in_flight) == 8
+    assert max(most_in_flight) <= 2
+
+
+def test_provider_request_slot_does_not_limit_providers_without_a_limit(notify_api, mocker):
+    mock_get_semaphore = mocker.patch('app.provider_details.concurrency.get_provider_semaphore')
+
+    with set_config(notify_api, 'PROVIDER_CONCURRENCY_LIMITS', {'ses': 2}):
+        with provider_request_slot('sns'):
+            pass
+
+    mock_get_semaphore.assert_not_called()
+
+
+def test_get_provider_semaphore_is_shared_by_requests_to_a_provider():
+    assert get_provider_semaphore('sns', 5) is get_provider_semaphore('sns', 5)
+    assert get_provider_semaphore('sns', 5) is not get_provider_semaphore('sns', 10)
+    assert get_provider_semaphore('sns', 5) is not get_provider_semaphore('pinpoint', 5)
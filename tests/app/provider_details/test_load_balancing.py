@@ -0,0 +1,97 @@
+import json
+from unittest.mock import call
+
+import pytest
+
+from app.provider_details.load_balancing import (
+    adjust_sms_provider_weights,
+    choose_weighted_provider,
+    effective_weight,
+    providers_allowed_for_sender,
+    record_sms_provider_response,
+)
+from app.provider_details.routing import SMS_PROVIDER_WEIGHTS_KEY
+
+from tests.conftest import set_config, set_config_values
+
+
+def test_choose_weighted_provider_picks_in_proportion_to_weights(mocker):
+    mock_choices = mocker.patch('app.provider_details.load_balancing.random.choices', return_value=['sinch'])
+
+    assert choose_weighted_provider(['sns', 'sinch', 'pinpoint'], {'sns': 70, 'sinch': 30}) == 'sinch'
+    mock_choices.assert_called_once_with(['sns', 'sinch'], weights=[70, 30])
+
+
+def test_choose_weighted_provider_falls_back_to_first_provider_without_weights():
+    assert choose_weighted_provider(['sns', 'sinch'], {'pinpoint': 10}) == 'sns'
+
+
+@pytest.mark.parametrize('sender, expected', [
+    (None, ['sns', 'sinch']),
+    ('+15146000000', ['sinch']),
+    # pinpoint isn't active
+    ('+15147000000', []),
+])
+def test_providers_allowed_for_sender(notify_api, sender, expected):
+    sender_providers = {'+15146000000': ['sinch', 'pinpoint'], '+15147000000': ['pinpoint']}
+    with set_config(notify_api, 'SMS_SENDER_PROVIDERS', sender_providers):
+        assert providers_allowed_for_sender(sender, ['sns', 'sinch']) == expected
+
+
+@pytest.mark.parametrize('health, expected', [
+    # not enough traffic to judge
+    ({'requests': 5, 'errors': 5, 'elapsed_ms': 0}, 100),
+    ({'requests': 100, 'errors': 0, 'elapsed_ms': 50000}, 100),
+    ({'requests': 100, 'errors': 25, 'elapsed_ms': 37500}, 75),
+    # twice as slow as the target
+    ({'requests': 100, 'errors': 0, 'elapsed_ms': 200000}, 50),
+    # never below the minimum share
+    ({'requests': 100, 'errors': 100, 'elapsed_ms': 0}, 5),
+])
+def test_effective_weight(notify_api, health, expected):
+    with set_config_values(notify_api, {
+        'SMS_LOAD_BALANCING_MIN_REQUESTS': 20,
+        'SMS_LOAD_BALANCING_TARGET_LATENCY': 1000,
+        'SMS_LOAD_BALANCING_MIN_SHARE': 0.05,
+    }):
+        assert effective_weight(100, health) == expected
+
+
+def test_record_sms_provider_response_does_nothing_if_redis_is_inactive(notify_api, mocker):
+    mock_pipeline = mocker.patch('app.provider_details.load_balancing.redis_store.redis_store')
+
+    record_sms_provider_response('sns', 100, success=True)
+
+    assert not mock_pipeline.pipeline.called
+
+
+def test_record_sms_provider_response_counts_errors(notify_api, mocker):
+    mocker.patch('app.provider_details.load_balancing.redis_store.active', True)
+    mock_redis = mocker.patch('app.provider_details.load_balancing.redis_store.redis_store')
+    pipe = mock_redis.pipeline.return_value
+
+    record_sms_provider_response('sns', 100, success=False)
+
+    key = pipe.hincrby.call_args_list[0][0][0]
+    assert key.startswith('sms-provider-health-sns-')
+    assert pipe.hincrby.call_args_list == [call(key, 'requests', 1), call(key, 'errors', 1)]
+    assert pipe.execute.called
+
+
+def test_adjust_sms_provider_weights_shares_weights_and_invalidates_routing(notify_api, mocker):
+    mocker.patch(
+        'app.provider_details.load_balancing.get_sms_provider_health',
+        side_effect=lambda identifier: {
+            'sns': {'requests': 100, 'errors': 50, 'elapsed_ms': 50000},
+            'sinch': {'requests': 0, 'errors': 0, 'elapsed_ms': 0},
+        }[identifier]
+    )
+    mock_set = mocker.patch('app.provider_details.load_balancing.redis_store.set')
+    mock_invalidate = mocker.patch('app.provider_details.load_balancing.invalidate_provider_routing')
+
+    with set_config(notify_api, 'SMS_PROVIDER_WEIGHTS', {'sns': 70, 'sinch': 30}):
+        weights = adjust_sms_provider_weights()
+
+    assert weights == {'sns': 35, 'sinch': 30}
+    mock_set.assert_called_once_with(SMS_PROVIDER_WEIGHTS_KEY, json.dumps(weights), ex=600)
+    mock_invalidate.assert_called_once_with()
@@ -51,6 +51,18 @@ def test_get_provider_details_by_id(client, notify_db):
     assert provider['identifier'] == json_resp[0]['identifier']
 
 
+def test_get_provider_routing(client, restore_provider_details):
+    response = client.get(
+        '/provider-details/routing',
+        headers=[create_authorization_header()]
+    )
+
+    assert response.status_code == 200
+    json_resp = json.loads(response.get_data(as_text=True))
+    assert json_resp['routing']['email']['domestic'] == ['ses']
+    assert json_resp['refresh_interval'] == 0
+
+
 @freeze_time('2018-06-28 12:00')
 def test_get_provider_contains_correct_fields(client, sample_service, sample_template):
     create_ft_billing('2018-06-01', 'sms', sample_template, sample_service, provider='mmg', billable_unit=1)
@@ -0,0 +1,95 @@
+import pytest
+
+from app.dao.provider_details_dao import (
+    dao_update_provider_details,
+    get_provider_details_by_identifier,
+    get_provider_details_by_notification_type,
+)
+from app.provider_details import routing
+from app.provider_details.routing import (
+    get_active_providers,
+    get_provider_routing_status,
+    invalidate_provider_routing,
+    provider_routing,
+)
+
+from tests.conftest import set_config
+
+
+@pytest.fixture
+def cached_routing(notify_api):
+    provider_routing.invalidate()
+    with set_config(notify_api, 'PROVIDER_ROUTING_REFRESH_INTERVAL', 60):
+        yield
+    provider_routing.invalidate()
+
+
+def test_get_active_providers_returns_active_providers_in_priority_order(restore_provider_details):
+    expected = [p.identifier for p in get_provider_details_by_notification_type('sms') if p.active]
+
+    assert get_active_providers('sms') == expected
+
+
+def test_get_active_providers_for_international_only_returns_international_providers(restore_provider_details):
+    expected = [p.identifier for p in get_provider_details_by_notification_type('sms', True) if p.active]
+
+    assert get_active_providers('sms', international=True) == expected
+
+
+def test_get_active_providers_ignores_inactive_providers(restore_provider_details):
+    ses = get_provider_details_by_identifier('ses')
+    ses.active = False
+    dao_update_provider_details(ses)
+
+    assert get_active_providers('email') == []
+
+
+def test_get_active_providers_reuses_routing_until_refresh_interval(restore_provider_details, cached_routing, mocker):
+    refresh = mocker.patch.object(provider_routing, 'refresh', wraps=provider_routing.refresh)
+
+    get_active_providers('sms')
+    get_active_providers('sms')
+    get_active_providers('email')
+
+    assert refresh.call_count == 1
+
+
+def test_dao_update_provider_details_invalidates_routing(restore_provider_details, cached_routing):
+    providers = get_provider_details_by_notification_type('sms')
+    first, second = providers[0], providers[1]
+    assert get_active_providers('sms')[0] == first.identifier
+
+    first.priority, second.priority = second.priority, first.priority
+    dao_update_provider_details(first)
+    dao_update_provider_details(second)
+
+    assert get_active_providers('sms')[0] == second.identifier
+
+
+def test_get_active_providers_reloads_when_version_changes_in_redis(restore_provider_details, cached_routing, mocker):
+    mocker.patch('app.provider_details.routing.redis_store.get', side_effect=[None, None, b'1'])
+    refresh = mocker.patch.object(provider_routing, 'refresh', wraps=provider_routing.refresh)
+
+    get_active_providers('sms')
+    get_active_providers('sms')
+    get_active_providers('sms')
+
+    assert refresh.call_count == 2
+
+
+def test_invalidate_provider_routing_bumps_version_in_redis(notify_api, mocker):
+    mock_incr = mocker.patch('app.provider_details.routing.redis_store.incr')
+
+    invalidate_provider_routing()
+
+    mock_incr.assert_called_once_with(routing.PROVIDER_ROUTING_VERSION_KEY)
+    assert provider_routing.routes is None
+
+
+def test_get_provider_routing_status(restore_provider_details):
+    status = get_provider_routing_status()
+
+    assert status['routing']['email'] == {'domestic': ['ses'], 'international': []}
+    assert status['routing']['sms']['domestic'] == get_active_providers('sms')
+    assert status['loaded_at'] is not None
+    assert status['refresh_interval'] == 0
@@ -204,3 +204,44 @@ def test_delete_service_callback_api(admin_request, sample_service):
 
     assert response is None
     assert ServiceCallbackApi.query.count() == 0
+
+
+def test_fetch_service_callback_api_includes_circuit_breaker_status(admin_request, sample_service):
+    service_callback_api = create_service_callback_api(service=sample_service, url='https://some.service.gov.uk/cb')
+
+    response = admin_request.get(
+        'service_callback.fetch_service_callback_api',
+        service_id=sample_service.id,
+        callback_api_id=service_callback_api.id,
+    )
+
+    assert response["circuit_breaker"] == {
+        'host': 'some.service.gov.uk',
+        'state': 'closed',
+        'recent_failures': 0,
+        'parked_callbacks': 0,
+    }
+
+
+def test_fetch_service_callback_api_circuit_breaker(admin_request, sample_service, mocker):
+    service_callback_api = create_service_callback_api(service=sample_service, url='https://some.service.gov.uk/cb')
+    mocker.patch('app.callback_circuit_breaker.get_circuit_state', return_value='open')
+    mocker.patch('app.callback_circuit_breaker.callback_backlog_size', return_value=12)
+
+    response = admin_request.get(
+        'service_callback.fetch_service_callback_api_circuit_breaker',
+        service_id=sample_service.id,
+        callback_api_id=service_callback_api.id,
+    )
+
+    assert response["data"]["state"] == 'open'
+    assert response["data"]["parked_callbacks"] == 12
+
+
+def test_fetch_service_callback_api_circuit_breaker_404s_for_unknown_callback(admin_request, sample_service):
+    admin_request.get(
+        'service_callback.fetch_service_callback_api_circuit_breaker',
+        service_id=sample_service.id,
+        callback_api_id=uuid.uuid4(),
+        _expected_status=404
+    )
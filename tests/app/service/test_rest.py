@@ -3,6 +3,7 @@ import uuid
 from datetime import datetime, timedelta, date
 from functools import partial
 from unittest.mock import ANY
+from urllib.parse import parse_qs, urlparse
 
 import pytest
 from flask import url_for, current_app
@@ -1602,6 +1603,29 @@ def test_get_all_notifications_for_service_in_order(notify_api, notify_db, notif
         assert response.status_code == 200
 
 
+def test_get_all_notifications_for_service_older_than_returns_a_keyset_page(client, sample_template):
+    notifications = [
+        create_notification(sample_template, created_at=datetime.utcnow() - timedelta(minutes=i)) for i in range(4)
+    ]
+
+    response = client.get(
+        path='/service/{}/notifications?older_than={}&page_size=2'.format(
+            sample_template.service_id, notifications[0].id
+        ),
+        headers=[create_authorization_header()])
+
+    assert response.status_code == 200
+    resp = json.loads(response.get_data(as_text=True))
+    assert [notification['id'] for notification in resp['notifications']] == [
+        str(notifications[1].id), str(notifications[2].id)
+    ]
+    assert resp['total'] is None
+    assert list(resp['links']) == ['next']
+    next_url = urlparse(resp['links']['next'])
+    assert next_url.path == '/service/{}/notifications'.format(sample_template.service_id)
+    assert parse_qs(next_url.query) == {'older_than': [str(notifications[2].id)], 'page_size': ['2']}
+
+
 def test_get_all_notifications_for_service_formatted_for_csv(client, sample_template):
     notification = create_notification(template=sample_template)
     auth_header = create_authorization_header()
@@ -1620,6 +1644,40 @@ def test_get_all_notifications_for_service_formatted_for_csv(client, sample_temp
     assert resp['notifications'][0]['status'] == 'Sending'
 
 
+@freeze_time('2020-03-01T17:00:00')
+def test_get_notifications_for_service_as_csv(client, sample_template, sample_job):
+    create_notification(job=sample_job, job_row_number=2, status='delivered', created_at=datetime(2020, 3, 1, 16))
+    create_notification(template=sample_template, status='created')
+
+    response = client.get(
+        path='/service/{}/notifications.csv'.format(sample_template.service_id),
+        headers=[create_authorization_header()])
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    # This test assumes the local timezone is EST
+    assert response.get_data(as_text=True).splitlines() == [
+        'Row number,Recipient,Template,Type,Sent by,Sent by email,Job,Status,Time',
+        ',+16502532222,{},sms,,,,Sending,2020-03-01 12:00:00'.format(sample_template.name),
+        '3,+16502532222,{},sms,,,{},Delivered,2020-03-01 11:00:00'.format(
+            sample_job.template.name, sample_job.original_file_name
+        ),
+    ]
+
+
+def test_get_notifications_for_service_as_csv_filters_by_status(client, sample_template):
+    create_notification(template=sample_template, status='delivered')
+    create_notification(template=sample_template, status='created')
+
+    response = client.get(
+        path='/service/{}/notifications.csv?status=delivered'.format(sample_template.service_id),
+        headers=[create_authorization_header()])
+
+    rows = response.get_data(as_text=True).splitlines()
+    assert len(rows) == 2
+    assert ',Delivered,' in rows[1]
+
+
 def test_get_notification_for_service_without_uuid(client, notify_db, notify_db_session):
     service_1 = create_service(service_name="1", email_from='1')
     response = client.get(
@@ -2444,6 +2502,35 @@ def test_search_for_notification_by_to_field_returns_notifications_by_type(
     assert notifications[0]['id'] == str(sms_notification.id)
 
 
+def test_search_for_notification_by_to_field_returns_a_page_and_a_link_to_the_next_one(client, sample_template):
+    notifications = [
+        create_notification(
+            sample_template,
+            to_field='+16502532222',
+            normalised_to='+16502532222',
+            created_at=datetime.utcnow() - timedelta(minutes=i)
+        )
+        for i in range(3)
+    ]
+
+    response = client.get(
+        '/service/{}/notifications?to={}&template_type=sms&page_size=2'.format(
+            sample_template.service_id, '%2B16502532222'
+        ),
+        headers=[create_authorization_header()]
+    )
+
+    assert response.status_code == 200
+    resp = json.loads(response.get_data(as_text=True))
+    assert [notification['id'] for notification in resp['notifications']] == [
+        str(notifications[0].id), str(notifications[1].id)
+    ]
+    next_url = urlparse(resp['links']['next'])
+    assert parse_qs(next_url.query) == {
+        'to': ['+16502532222'], 'template_type': ['sms'], 'page_size': ['2'], 'older_than': [str(notifications[1].id)]
+    }
+
+
 def test_is_service_name_unique_returns_200_if_unique(admin_request, notify_db, notify_db_session):
     service = create_service(service_name='unique', email_from='unique')
 
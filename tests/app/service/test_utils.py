@@ -1,4 +1,8 @@
+from collections import namedtuple
+from datetime import datetime
+
 from app.dao.date_util import get_current_financial_year_start_year
+from app.service.utils import notifications_csv
 from freezegun import freeze_time
 
 
@@ -14,3 +18,24 @@ def test_get_current_financial_year_start_year_before_march():
 def test_get_current_financial_year_start_year_after_april():
     current_fy = get_current_financial_year_start_year()
     assert current_fy == 2017
+
+
+def test_notifications_csv_yields_chunks_of_rows():
+    row = namedtuple('row', [
+        'job_row_number', 'recipient', 'template_name', 'template_type', 'job_name', 'status', 'created_at',
+        'created_by_name', 'created_by_email_address'
+    ])
+    rows = [
+        row(None, 'test@example.com', 'Template', 'email', None, 'permanent-failure', datetime(2020, 3, 1, 17),
+            'Test User', 'user@example.com')
+    ] * 3
+
+    chunks = list(notifications_csv(iter(rows), rows_per_chunk=2))
+
+    # This test assumes the local timezone is EST
+    assert chunks == [
+        'Row number,Recipient,Template,Type,Sent by,Sent by email,Job,Status,Time\r\n'
+        + ',test@example.com,Template,email,Test User,user@example.com,,Email address doesn’t exist,2020-03-01 12:00:00\r\n'
+        * 2,
+        ',test@example.com,Template,email,Test User,user@example.com,,Email address doesn’t exist,2020-03-01 12:00:00\r\n',
+    ]
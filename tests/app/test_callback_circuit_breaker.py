@@ -0,0 +1,121 @@
+import json
+
+import pytest
+
+from app.callback_circuit_breaker import (
+    CIRCUIT_CLOSED,
+    CIRCUIT_HALF_OPEN,
+    CIRCUIT_OPEN,
+    allow_callback_request,
+    callback_host,
+    get_circuit_state,
+    park_callback,
+    record_callback_failure,
+    record_callback_success,
+)
+
+from tests.conftest import set_config
+
+
+@pytest.fixture
+def mock_redis(mocker):
+    mocker.patch('app.callback_circuit_breaker.redis_store.active', True)
+    return mocker.patch('app.callback_circuit_breaker.redis_store')
+
+
+@pytest.mark.parametrize('url, host', [
+    ('https://some.service.gov.uk/callback', 'some.service.gov.uk'),
+    ('https://SOME.service.gov.uk:8443/callback?x=1', 'some.service.gov.uk'),
+    ('not a url', ''),
+])
+def test_callback_host(url, host):
+    assert callback_host(url) == host
+
+
+def test_get_circuit_state_is_closed_when_redis_disabled(notify_api, mocker):
+    mocker.patch('app.callback_circuit_breaker.redis_store.active', False)
+    assert get_circuit_state('some.service.gov.uk') == CIRCUIT_CLOSED
+    assert allow_callback_request('some.service.gov.uk')
+    assert not record_callback_failure('some.service.gov.uk')
+
+
+@pytest.mark.parametrize('open_value, tripped_value, expected_state', [
+    (None, None, CIRCUIT_CLOSED),
+    (b'1', b'1', CIRCUIT_OPEN),
+    (None, b'1', CIRCUIT_HALF_OPEN),
+])
+def test_get_circuit_state(notify_api, mock_redis, open_value, tripped_value, expected_state):
+    mock_redis.get.side_effect = lambda key: open_value if key.endswith('-open') else tripped_value
+    assert get_circuit_state('some.service.gov.uk') == expected_state
+
+
+def test_allow_callback_request_only_lets_one_probe_through_when_half_open(notify_api, mock_redis):
+    mock_redis.get.side_effect = lambda key: None if key.endswith('-open') else b'1'
+    mock_redis.set.side_effect = [True, None]
+
+    assert allow_callback_request('some.service.gov.uk')
+    assert not allow_callback_request('some.service.gov.uk')
+    mock_redis.set.assert_called_with(
+        'callback-circuit-breaker-some.service.gov.uk-probe', 1, ex=300, nx=True
+    )
+
+
+def test_record_callback_failure_opens_circuit_once_threshold_reached(notify_api, mock_redis):
+    mock_redis.get.return_value = None
+    mock_redis.incr.side_effect = [1, 2]
+
+    with set_config(notify_api, 'CALLBACK_CIRCUIT_BREAKER_THRESHOLD', 2):
+        assert not record_callback_failure('some.service.gov.uk')
+        assert record_callback_failure('some.service.gov.uk')
+
+    mock_redis.expire.assert_called_once_with('callback-circuit-breaker-some.service.gov.uk-failures', 60)
+    mock_redis.set.assert_any_call('callback-circuit-breaker-some.service.gov.uk-open', 1, ex=300)
+    mock_redis.redis_store.sadd.assert_called_once_with('callback-circuit-breaker-hosts', 'some.service.gov.uk')
+
+
+def test_record_callback_failure_reopens_circuit_if_probe_fails(notify_api, mock_redis):
+    mock_redis.get.side_effect = lambda key: None if key.endswith('-open') else b'1'
+    mock_redis.incr.return_value = 1
+
+    assert record_callback_failure('some.service.gov.uk')
+    mock_redis.set.assert_any_call('callback-circuit-breaker-some.service.gov.uk-open', 1, ex=300)
+
+
+def test_record_callback_success_closes_tripped_circuit(notify_api, mock_redis):
+    mock_redis.get.return_value = b'1'
+
+    assert record_callback_success('some.service.gov.uk')
+    mock_redis.delete.assert_called_once_with(
+        'callback-circuit-breaker-some.service.gov.uk-open',
+        'callback-circuit-breaker-some.service.gov.uk-tripped',
+        'callback-circuit-breaker-some.service.gov.uk-probe',
+        'callback-circuit-breaker-some.service.gov.uk-failures',
+    )
+
+
+def test_record_callback_success_does_nothing_if_circuit_not_tripped(notify_api, mock_redis):
+    mock_redis.get.return_value = None
+
+    assert not record_callback_success('some.service.gov.uk')
+    assert not mock_redis.delete.called
+
+
+def test_park_callback_adds_callback_to_service_backlog(notify_api, mock_redis):
+    mock_redis.redis_store.rpush.return_value = 1
+
+    park_callback('some.service.gov.uk', 'service-1', 'send-complaint', ['data'])
+
+    mock_redis.redis_store.rpush.assert_called_once_with(
+        'callback-backlog-service-1', json.dumps({'task': 'send-complaint', 'args': ['data']})
+    )
+    mock_redis.redis_store.sadd.assert_any_call('callback-circuit-breaker-some.service.gov.uk-services', 'service-1')
+    assert not mock_redis.redis_store.ltrim.called
+
+
+def test_park_callback_drops_oldest_callbacks_when_backlog_is_full(notify_api, mock_redis):
+    mock_redis.redis_store.rpush.return_value = 3
+
+    with set_config(notify_api, 'CALLBACK_BACKLOG_MAX_SIZE', 2):
+        park_callback('some.service.gov.uk', 'service-1', 'send-complaint', ['data'])
+
+    mock_redis.redis_store.ltrim.assert_called_once_with('callback-backlog-service-1', -2, -1)
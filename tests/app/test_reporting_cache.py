@@ -0,0 +1,78 @@
+from flask import jsonify, Response
+from freezegun import freeze_time
+import pytest
+
+from app.reporting_cache import (
+    REPORTING_CACHE_GENERATION_KEY,
+    get_cached_report,
+    includes_today,
+    invalidate_reporting_cache,
+    reporting_cache_key,
+)
+
+
+@pytest.fixture
+def mock_redis(mocker):
+    return mocker.patch('app.reporting_cache.redis_store')
+
+
+@pytest.mark.parametrize('generation, expected_key', [
+    (None, 'reporting-0-platform-stats-end_date=2021-01-31&start_date=2021-01-01'),
+    (b'3', 'reporting-3-platform-stats-end_date=2021-01-31&start_date=2021-01-01'),
+])
+def test_reporting_cache_key_sorts_params_and_includes_generation(mock_redis, generation, expected_key):
+    mock_redis.get.return_value = generation
+    key = reporting_cache_key('platform-stats', {'start_date': '2021-01-01', 'end_date': '2021-01-31'})
+    assert key == expected_key
+
+
+def test_invalidate_reporting_cache_increments_generation(mock_redis):
+    invalidate_reporting_cache()
+    mock_redis.incr.assert_called_once_with(REPORTING_CACHE_GENERATION_KEY)
+
+
+@freeze_time('2021-01-26T15:00:00')
+@pytest.mark.parametrize('params, expected', [
+    ({}, True),
+    ({'start_date': '2021-01-01', 'end_date': '2021-01-31'}, True),
+    ({'start_date': '2021-01-01', 'end_date': '2021-01-25'}, False),
+    ({'start_date': '2021-01-27', 'end_date': '2021-01-31'}, False),
+])
+def test_includes_today(params, expected):
+    assert includes_today(params) == expected
+
+
+def test_get_cached_report_returns_cached_response(notify_api, mock_redis, mocker):
+    mock_redis.get.side_effect = [None, b'{"cached": true}']
+    build_report = mocker.Mock()
+
+    response = get_cached_report('platform-stats', {}, build_report)
+
+    assert response.get_json() == {'cached': True}
+    build_report.assert_not_called()
+
+
+@freeze_time('2021-01-26T15:00:00')
+@pytest.mark.parametrize('params, ttl', [
+    ({}, 60),
+    ({'start_date': '2021-01-01', 'end_date': '2021-01-25'}, 3600),
+])
+def test_get_cached_report_caches_built_response(notify_api, mock_redis, params, ttl):
+    mock_redis.get.return_value = None
+
+    with notify_api.test_request_context():
+        response = get_cached_report('platform-stats', params, lambda: jsonify(built=True))
+
+    assert response.get_json() == {'built': True}
+    mock_redis.set.assert_called_once_with(
+        reporting_cache_key('platform-stats', params), response.get_data(), ex=ttl
+    )
+
+
+def test_get_cached_report_does_not_cache_errors(notify_api, mock_redis):
+    mock_redis.get.return_value = None
+
+    with notify_api.test_request_context():
+        get_cached_report('platform-stats', {}, lambda: Response(status=400))
+
+    mock_redis.set.assert_not_called()
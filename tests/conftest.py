@@ -8,6 +8,7 @@ import pytest
 import sqlalchemy
 
 from app import create_app, db
+from app.delivery.templates import template_versions
 
 
 @pytest.fixture(scope='session')
@@ -109,6 +110,8 @@ def notify_db_session(notify_db):
                             "service_callback_type"]:
             notify_db.engine.execute(tbl.delete())
     notify_db.session.commit()
+    # the template ids of a test can be reused with other content by the next one
+    template_versions.clear()
 
 
 @pytest.fixture